@@ -21,6 +21,18 @@ MISTRAL_API_KEY=config('MISTRAL_API_KEY')
 DEFAULT_MODEL=config('DEFAULT_MODEL')
 TEMPERATURE=config('TEMPERATURE')
 
+# Mistral API clients (blogs.llm): one keep-alive pool per process/event loop.
+# At most LLM_MAX_CONNECTIONS requests in flight per pool; others queue up to
+# LLM_POOL_TIMEOUT seconds for a connection. The queue wait matches the read
+# timeout so requests behind a slow generation wait rather than fail; lower it
+# to shed load quickly instead. Timeouts are in seconds.
+LLM_MAX_CONNECTIONS = config('LLM_MAX_CONNECTIONS', default=100, cast=int)
+LLM_CONNECT_TIMEOUT = 10
+LLM_READ_TIMEOUT = config('LLM_READ_TIMEOUT', default=120, cast=float)
+LLM_POOL_TIMEOUT = config('LLM_POOL_TIMEOUT', default=LLM_READ_TIMEOUT, cast=float)
+LLM_KEEPALIVE_EXPIRY = 60
+LLM_MAX_RETRIES = 2
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
 
@@ -210,3 +222,83 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Custom User Model
 AUTH_USER_MODEL = 'blogs.User'
+
+# Semantic search
+# Seconds before a worker reloads its in-process blog vector index from the DB
+BLOG_VECTOR_INDEX_TTL = 300
+
+# Embedding backend used for blog vectors. Set EMBEDDING_BACKEND to
+# "blogs.embeddings.HashingEmbeddingProvider" for offline/test environments.
+# Semantic search only counts blogs scoring at least the backend's
+# min_similarity (a per-backend default; set EMBEDDING_MIN_SIMILARITY to tune it).
+EMBEDDING_PROVIDER = {
+    "BACKEND": config('EMBEDDING_BACKEND', default='blogs.embeddings.MistralEmbeddingProvider'),
+    "OPTIONS": {
+        "batch_size": config('EMBEDDING_BATCH_SIZE', default=64, cast=int),
+    },
+}
+EMBEDDING_MIN_SIMILARITY = config('EMBEDDING_MIN_SIMILARITY', default='')
+if EMBEDDING_MIN_SIMILARITY:
+    EMBEDDING_PROVIDER["OPTIONS"]["min_similarity"] = float(EMBEDDING_MIN_SIMILARITY)
+
+# Blog saves enqueue an EmbeddingJob processed by `manage.py run_embedding_worker`.
+# Set EMBEDDING_QUEUE_ENABLED=False to embed synchronously inside the save.
+EMBEDDING_QUEUE_ENABLED = config('EMBEDDING_QUEUE_ENABLED', default=True, cast=bool)
+EMBEDDING_JOB_MAX_ATTEMPTS = 5
+EMBEDDING_JOB_BACKOFF_SECONDS = 30
+
+# On-disk format for VectorField values: "float32", "float16" or "int8" (quantised)
+VECTOR_FIELD_DTYPE = config('VECTOR_FIELD_DTYPE', default='float32')
+
+# Related posts: nearest neighbours stored per blog by `manage.py build_related_blogs`
+# (kept above the 5 shown so unpublished neighbours can be skipped at read time)
+RELATED_BLOGS_STORED = 10
+
+# Write-behind counters (blogs.counters): buffered increments are flushed after
+# COUNTER_FLUSH_INTERVAL seconds or once COUNTER_FLUSH_MAX_PENDING rows are dirty
+COUNTER_FLUSH_INTERVAL = 10
+COUNTER_FLUSH_MAX_PENDING = 500
+# A visitor's repeated hits on one blog within this window count as one view
+# (remembered in the default cache, so only across workers with REDIS_URL)
+VIEW_DEDUPE_SECONDS = 30 * 60
+
+# Cache shared by every worker process: view de-duplication and fragment cache
+# versions only work across processes with it. Without REDIS_URL each process
+# gets its own LocMemCache, which is only right for a single development server.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Blog lists: use keyset (?cursor=) pagination instead of ?page=N with OFFSET.
+# The approximate total shown alongside is cached for BLOG_LIST_COUNT_CACHE_SECONDS.
+BLOG_CURSOR_PAGINATION = config('BLOG_CURSOR_PAGINATION', default=False, cast=bool)
+BLOG_LIST_COUNT_CACHE_SECONDS = 300
+
+# Versioned fragment cache (blogs.caching): entries are invalidated by model
+# signals, this is only the upper bound on how long an unused entry lives
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
+# Blog generation chat sessions (blogs.Views.chatapp.sessions): "database",
+# "cache" (needs a cache shared by all workers) or "memory" (single process)
+CHAT_SESSION_BACKEND = config('CHAT_SESSION_BACKEND', default='database')
+CHAT_SESSION_CACHE = 'default'
+# Sessions idle this long expire; at most CHAT_SESSION_MAX are kept (LRU)
+CHAT_SESSION_TTL = 60 * 60 * 24
+CHAT_SESSION_MAX = 1000
+# Period of the in-process sweeper of the memory and database backends
+# (0 disables it, e.g. when `manage.py sweep_chat_sessions` runs instead)
+CHAT_SESSION_SWEEP_INTERVAL = 60
+# Messages kept per session: the last N turns, older ones fold into a summary
+CHAT_HISTORY_TURNS = 10
+CHAT_SUMMARY_MAX_CHARS = 2000
@@ -1,64 +1,106 @@
 from django.views.generic import ListView, CreateView, DetailView, UpdateView, DeleteView
-from django.db.models import Q, Sum, F
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy, reverse
 from django.shortcuts import redirect, get_object_or_404
 from django.contrib import messages
 from django.core.cache import cache
-from django.views.decorators.cache import cache_page
-from django.utils.decorators import method_decorator
 from django.http import Http404
+from django.conf import settings
 
 from blogs.models import Blog, Category, Playlist, BlogLike
 from blogs.forms import BlogCreateForm
+from blogs.fulltext import highlight_snippet
+from blogs.counters import counter_versions, live_likes, record_blog_view
+from blogs.pagination import InvalidCursor, KeysetPaginator
+from blogs.caching import attach_card_versions, cached, fragment_timeout
+from blogs.stats import author_categories, author_stats, top_playlists
+
+def highlight_search_snippets(blogs):
+    """Render the raw FTS snippets BlogQuerySet.search annotates (rendered outside the card cache)"""
+    for blog in blogs:
+        if getattr(blog, 'search_snippet', None):
+            blog.search_snippet = highlight_snippet(blog.search_snippet)
+
+
+class BlogCursorPaginationMixin:
+    """
+    Opt-in keyset pagination for blog lists (``settings.BLOG_CURSOR_PAGINATION``).
+
+    Pages are addressed by ``?cursor=`` instead of ``?page=N`` so deep pages
+    cost the same as page 1; the total shown is a cached approximate count.
+    """
+    keyset_ordering = ('-publishedDate', '-created_at', '-id')
+
+    def cursor_pagination_enabled(self):
+        # Search results are ordered by relevance, which has no keyset
+        if self.request.GET.get('q', '').strip():
+            return False
+        return getattr(settings, 'BLOG_CURSOR_PAGINATION', False)
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.cursor_pagination_enabled():
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(
+            queryset, self.keyset_ordering, page_size,
+            count_timeout=getattr(settings, 'BLOG_LIST_COUNT_CACHE_SECONDS', 300),
+        )
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404("Invalid page cursor")
+        return (paginator, page, page.object_list, page.has_other_pages())
 
-# Cache the public blog list for 15 minutes
-@method_decorator(cache_page(60 * 15), name='dispatch')
-class BlogListView(ListView):
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['cursor_pagination'] = self.cursor_pagination_enabled()
+        return context
+
+
+class BlogListView(BlogCursorPaginationMixin, ListView):
     model = Blog
     template_name = 'blog_list.html'
     context_object_name = 'blogs'
     paginate_by = 6 
 
     def get_queryset(self):
-        queryset = Blog.objects.filter(isPublished=True).select_related('category', 'author')
-        queryset = queryset.order_by('-publishedDate', '-created_at')
+        # Card projection: list pages never render sections or the embedding
+        queryset = Blog.objects.published().cards()
+        queryset = queryset.order_by(*self.keyset_ordering)
 
         # Search filter
         search = self.request.GET.get('q', '').strip()
         category_slug = self.request.GET.get('category', '').strip()
 
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(subtitle__icontains=search) |
-                Q(excerpt__icontains=search)
-            )
-
         if category_slug:
             queryset = queryset.filter(category__slug=category_slug)
 
-        return queryset.distinct()
+        if search:
+            # FTS5 index over title/subtitle/excerpt/body, most relevant first
+            queryset = queryset.search(search)
+
+        return queryset
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
+        # Shared fragments come from the versioned cache (see blogs.caching);
+        # cards are cached per blog, with live view/like counts rendered outside
+        attach_card_versions(context['blogs'])
+        context['card_timeout'] = fragment_timeout()
+        highlight_search_snippets(context['blogs'])
+
         # Categories for filter bar (optimally fetched)
-        context['categories'] = Category.objects.all().order_by('name')
+        context['categories'] = cached(
+            'category_list', ['categories'], lambda: list(Category.objects.all().order_by('name'))
+        )
         context['selected_category'] = self.request.GET.get('category', '')
         context['search_query'] = self.request.GET.get('q', '')
-
-        # Total count for info
-        context['total_count'] = self.get_queryset().count()
         
-        # Top 3 Playlists by Views - Optimized
-        # Annotate playlists with sum of views of their blogs, order by that sum
-        top_playlists = Playlist.objects.filter(is_public=True).annotate(
-            total_views=Sum('blogs__views')
-        ).order_by('-total_views')[:3]
-        
-        context['top_playlists'] = top_playlists
+        # Top 3 Playlists by Views: stored ranking read off a partial index,
+        # owners joined in (see blogs.stats)
+        context['top_playlists'] = top_playlists(3)
 
         return context
 
@@ -85,7 +127,7 @@ class BlogCreateView(LoginRequiredMixin, CreateView):
 # -------------------------
 # User Blog List Mixin (Shared Logic)
 # -------------------------
-class UserBlogListMixin(ListView):
+class UserBlogListMixin(BlogCursorPaginationMixin, ListView):
     model = Blog
     template_name = 'blog_list_by_user.html'
     context_object_name = 'blogs'
@@ -97,68 +139,61 @@ class UserBlogListMixin(ListView):
     def get_base_queryset(self):
         # To be overridden by subclasses or handled here with logic
         username = self.get_user_username()
-        return Blog.objects.filter(author__username=username).select_related('category', 'author')
+        return Blog.objects.filter(author__username=username).cards()
 
     def get_queryset(self):
         queryset = self.get_base_queryset()
         
         # Apply sorting
-        if hasattr(self, 'ordering_field'):
-             queryset = queryset.order_by(self.ordering_field, '-created_at')
-        else:
-             queryset = queryset.order_by('-publishedDate', '-created_at')
+        queryset = queryset.order_by(*self.keyset_ordering)
 
         # Filters
         search = self.request.GET.get('q', '').strip()
         category_slug = self.request.GET.get('category', '').strip()
 
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(subtitle__icontains=search) |
-                Q(excerpt__icontains=search)
-            )
-
         if category_slug:
             queryset = queryset.filter(category__slug=category_slug)
 
-        return queryset.distinct()
+        if search:
+            # FTS5 index over title/subtitle/excerpt/body, most relevant first
+            queryset = queryset.search(search)
+
+        return queryset
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
         username = self.get_user_username()
         User = get_user_model()
-        author = get_object_or_404(User, username=username)
+        # The AuthorStats rollup rides along with the user row (see blogs.stats)
+        author = get_object_or_404(User.objects.select_related('author_stats'), username=username)
 
         context['filter_author'] = author
 
-        # We want stats for PUBLISHED blogs only, almost always
-        published_blogs = Blog.objects.filter(author=author, isPublished=True)
-        stats = published_blogs.aggregate(
-            total_views=Sum('views'),
-            total_likes=Sum('likes')
-        )
-        
+        # Per-blog card fragments (see blogs.caching)
+        attach_card_versions(context['blogs'])
+        context['card_timeout'] = fragment_timeout()
+        highlight_search_snippets(context['blogs'])
+
+        # Stats cover PUBLISHED blogs only
+        stats = author_stats(author)
         context['user_stats'] = {
-            'blog_count': published_blogs.count(),
-            'total_views': stats['total_views'] or 0,
-            'total_likes': stats['total_likes'] or 0,
+            'blog_count': stats.blog_count,
+            'total_views': stats.total_views,
+            'total_likes': stats.total_likes,
             'member_since': author.date_joined,
         }
 
         # Categories used by this author
-        author_categories = Category.objects.filter(
-            blogs__author=author,
-            blogs__isPublished=True
-        ).distinct().order_by('name')
-        context['categories'] = author_categories
-        context['category_names'] = list(author_categories.values_list('name', flat=True))
+        author_category_list = list(author_categories(author))
+        context['categories'] = author_category_list
+        context['category_names'] = [category.name for category in author_category_list]
 
         # Filters
         context['selected_category'] = self.request.GET.get('category', '')
         context['search_query'] = self.request.GET.get('q', '')
-        context['total_count'] = self.get_queryset().count()
+        # The paginator already counted the filtered list; don't COUNT it again
+        context['total_count'] = context['paginator'].count
         
         return context
 
@@ -175,11 +210,11 @@ class UserBlogListView(UserBlogListMixin):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Real Playlists - Public only
+        # Real Playlists - Public only (cards read the stored blog_count)
         playlists = Playlist.objects.filter(
             owner=context['filter_author'], 
             is_public=True
-        ).prefetch_related('blogs')
+        ).select_related('owner')
         
         context['playlists'] = playlists
         context['edit_mode'] = False
@@ -191,7 +226,7 @@ class UserBlogListView(UserBlogListMixin):
 # User Blog Manage View (Edit Mode)
 # -------------------------
 class UserBlogManageView(LoginRequiredMixin, UserPassesTestMixin, UserBlogListMixin):
-    ordering_field = '-created_at' # Manage view shows newest created first (including drafts)
+    keyset_ordering = ('-created_at', '-id') # Manage view shows newest created first (including drafts)
 
     def test_func(self):
         """Ensure only the profile owner can access this view."""
@@ -216,7 +251,7 @@ class UserBlogManageView(LoginRequiredMixin, UserPassesTestMixin, UserBlogListMi
         # In MANAGE view, show ALL playlists (public and private)
         playlists = Playlist.objects.filter(
             owner=context['filter_author']
-        ).prefetch_related('blogs')
+        ).select_related('owner')
         
         context['playlists'] = playlists
         
@@ -231,13 +266,15 @@ class BlogDetailView(DetailView):
     model = Blog
     template_name = 'blog_detail.html'
     context_object_name = 'blog'
+    related_count = 5
 
     def get_object(self, queryset=None):
         username = self.kwargs.get('username')
         slug = self.kwargs.get('slug')
         
-        # Get the blog first
-        
+        # Counter buffer versions, taken before the row is read (see blogs.counters)
+        views_version, likes_version = counter_versions()
+
         blog = get_object_or_404(
             Blog.objects.select_related('category', 'author'),
             author__username=username,
@@ -250,11 +287,10 @@ class BlogDetailView(DetailView):
             if self.request.user != blog.author:
                 raise Http404("Blog not found or not published.")
         
-        # Increment view count
-        Blog.objects.filter(pk=blog.pk).update(views=F('views') + 1)
-        
-        # Refresh to get updated value (optional, but good for display)
-        blog.refresh_from_db()
+        # Buffered, de-duplicated view count (flushed in batches, see blogs.counters);
+        # display the stored value plus this process's pending increments
+        blog.views = record_blog_view(self.request, blog, views_version)
+        blog.likes = live_likes(blog, likes_version)
 
         return blog
 
@@ -264,6 +300,13 @@ class BlogDetailView(DetailView):
             context['user_has_liked'] = BlogLike.objects.filter(user=self.request.user, blog=self.object).exists()
         else:
             context['user_has_liked'] = False
+        # Precomputed neighbours (see blogs.related): one indexed query, no similarity math here
+        context['related_blogs'] = (
+            Blog.objects.published()
+            .filter(neighbour_of__blog=self.object)
+            .cards()
+            .order_by('neighbour_of__rank')[:self.related_count]
+        )
         return context
 
 
@@ -4,71 +4,27 @@ Blog Generator Service using LangGraph and Mistral
 import json
 import logging
 import re
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, AsyncIterator
 from datetime import datetime
 import asyncio
 
-from langchain_mistralai import ChatMistralAI
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langgraph.graph import StateGraph, END
+from langgraph.config import get_stream_writer
+from langchain_core.utils.json import parse_partial_json
+from pydantic import ValidationError
 from langgraph.checkpoint.memory import MemorySaver
 
-from .state import BlogState, create_empty_blog_state, update_blog_state, Message
+from .state import BlogState, create_empty_blog_state, update_blog_state, window_history, Message
+from .sessions import SessionConflict, SessionNotOwned, get_session_manager
 from .prompts import SYSTEM_PROMPT, BLOG_GENERATION_PROMPT, UPDATE_BLOG_PROMPT
 from django.conf import settings
+from blogs import llm as llm_clients
 from .schemas import BlogCreate, BlogContent, BlogContentSection
 
 logger = logging.getLogger(__name__)
 
 
-class SessionManager:
-    """
-    Manages user sessions and state.
-    Currently uses in-memory storage, but designed to be swappable with Redis.
-    """
-    def __init__(self):
-        self._sessions: Dict[str, BlogState] = {}
-
-    async def get_session(self, session_id: str) -> Optional[BlogState]:
-        """Retrieve a session by ID"""
-        return self._sessions.get(session_id)
-
-    async def create_session(self, session_id: str, user_id: Optional[str] = None, username: Optional[str] = None) -> BlogState:
-        """Create a new session"""
-        state = create_empty_blog_state(session_id, user_id, username)
-        self._sessions[session_id] = state
-        return state
-
-    async def save_session(self, session_id: str, state: BlogState) -> None:
-        """Save/Update a session"""
-        self._sessions[session_id] = state
-
-    async def clear_session_data(self, session_id: str) -> None:
-        """Clear blog data from session but keep history"""
-        if session_id in self._sessions:
-            state = self._sessions[session_id]
-            # Reset blog-specific fields
-            state.update({
-                "slug": None,
-                "title": None,
-                "subtitle": None,
-                "excerpt": None,
-                "image": None,
-                "category": None,
-                "featured": False,
-                "tags": [],
-                "content": None,
-                "pending_save": False,
-                "current_action": None
-            })
-            state["updated_at"] = datetime.now().isoformat()
-
-    async def delete_session(self, session_id: str) -> None:
-        """Delete a session completely"""
-        if session_id in self._sessions:
-            del self._sessions[session_id]
-
-
 class BlogGeneratorService:
     """AI-powered blog generation and management service (Async)"""
     
@@ -78,8 +34,8 @@ class BlogGeneratorService:
         self.blog_schema = BlogCreate.model_json_schema()
         self.blog_schema_str = json.dumps(self.blog_schema, indent=2)
         
-        # Session Manager
-        self.session_manager = SessionManager()
+        # Session storage is shared by all workers (settings.CHAT_SESSION_BACKEND)
+        self.session_manager = get_session_manager()
         
         # Initialize LangGraph
         self.graph = self._create_graph()
@@ -87,17 +43,12 @@ class BlogGeneratorService:
         logger.info("✓ BlogGeneratorService initialized (Async)")
 
     def _get_llm(self):
-        """Get a fresh instance of Mistral LLM"""
-        return ChatMistralAI(
-            model=getattr(settings, "DEFAULT_MODEL", "mistral-large-latest"),
-            temperature=getattr(settings, "TEMPERATURE", 0.7),
-            api_key=settings.MISTRAL_API_KEY
-        )
+        """Get the shared Mistral LLM (pooled keep-alive connections)"""
+        return llm_clients.chat_model()
 
     def _get_structured_llm(self):
-        """Get a fresh instance of Structured LLM"""
-        llm = self._get_llm()
-        return llm.with_structured_output(
+        """Get the shared Structured LLM"""
+        return llm_clients.structured_chat_model(
             BlogCreate,
             method="json_schema",
             include_raw=False
@@ -157,6 +108,8 @@ class BlogGeneratorService:
             state["current_action"] = "chat"
         
         logger.info(f"Intent detected: {state['current_action']}")
+        # Streamed to the client when the graph runs under stream_message
+        get_stream_writer()({"event": "intent", "action": state["current_action"]})
         return state
     
     def _route_action(self, state: BlogState) -> str:
@@ -190,8 +143,8 @@ class BlogGeneratorService:
                 prompt += previous_blog_context
             
             # Use structured output LLM asynchronously
-            structured_llm = self._get_structured_llm()
-            blog_create: BlogCreate = await structured_llm.ainvoke(prompt)
+            # Sections are streamed out as soon as each one validates
+            blog_create: BlogCreate = await self._generate_structured(prompt)
             
             # Convert BlogCreate to the format needed for state
             blog_data = self._convert_blog_create_to_dict(blog_create)
@@ -259,7 +212,7 @@ class BlogGeneratorService:
             ]
             
             # Call LLM asynchronously
-            response = await self.llm.ainvoke(messages)
+            response = await self._get_llm().ainvoke(messages)
             response_text = response.content
             
             # Parse updated blog data
@@ -297,6 +250,59 @@ class BlogGeneratorService:
             state["messages"].append(error_message)
             return state
     
+    async def _stream_text(self, messages: List[Any]) -> str:
+        """Call the LLM and emit each text delta as a ``token`` event"""
+        writer = get_stream_writer()
+        text = ""
+        async for chunk in self._get_llm().astream(messages):
+            delta = chunk.content if isinstance(chunk.content, str) else ""
+            if delta:
+                text += delta
+                writer({"event": "token", "text": delta})
+        return text
+
+    async def _generate_structured(self, prompt: str) -> BlogCreate:
+        """
+        Run the structured LLM while watching its raw JSON stream: every
+        section that is complete and validates is emitted as a ``section``
+        event long before the whole blog has been generated.
+        """
+        writer = get_stream_writer()
+        raw, emitted, blog_create, root_run = "", 0, None, None
+        async for event in self._get_structured_llm().astream_events(prompt, version="v2"):
+            if root_run is None:
+                # The first event is the start of the LLM | parser chain itself
+                root_run = event["run_id"]
+            if event["event"] == "on_chat_model_stream":
+                content = event["data"]["chunk"].content
+                raw += content if isinstance(content, str) else ""
+                emitted = self._emit_sections(writer, parse_partial_json(raw) if raw else None, emitted)
+            elif event["event"] == "on_chain_end" and event["run_id"] == root_run:
+                blog_create = event["data"]["output"]
+
+        if blog_create is None:
+            raise ValueError("The model returned no blog")
+        # Whatever the partial parse couldn't confirm
+        for index, section in enumerate(blog_create.sections[emitted:], start=emitted):
+            writer({"event": "section", "index": index, "section": section.model_dump(exclude_none=True)})
+        return blog_create
+
+    def _emit_sections(self, writer, partial: Optional[Dict[str, Any]], emitted: int) -> int:
+        """Emit sections of the partial JSON that are complete; returns how many are out"""
+        if not isinstance(partial, dict) or not isinstance(partial.get("sections"), list):
+            return emitted
+        sections = partial["sections"]
+        # The last section may still be streaming until the next key starts
+        complete = len(sections) if "conclusion" in partial else len(sections) - 1
+        for index in range(emitted, complete):
+            try:
+                section = BlogContentSection.model_validate(sections[index])
+            except ValidationError:
+                # Left for the final, validated blog to emit
+                return index
+            writer({"event": "section", "index": index, "section": section.model_dump(exclude_none=True)})
+        return max(emitted, complete)
+
     def _convert_blog_create_to_dict(self, blog_create: BlogCreate) -> Dict[str, Any]:
         """Convert BlogCreate Pydantic model to dict format with content field"""
         # Convert BlogCreate to dict
@@ -377,6 +383,8 @@ class BlogGeneratorService:
             blog_context = ""
             if state.get("title"):
                 blog_context = f"\n\nCurrent blog in progress:\nTitle: {state.get('title')}\nCategory: {state.get('category')}"
+            if state.get("summary"):
+                blog_context += f"\n\nEarlier in this conversation:\n{state['summary']}"
             
             chat_system_prompt = """You are a helpful blog content assistant. Help users create, update, and manage blog posts.
             
@@ -393,11 +401,11 @@ class BlogGeneratorService:
                 HumanMessage(content=user_message)
             ]
             
-            # Call LLM asynchronously
-            response = await self.llm.ainvoke(messages)
+            # Call LLM asynchronously, streaming the reply as it is written
+            response_text = await self._stream_text(messages)
             
             # Extract plain text from response
-            response_text = self._extract_plain_text(response.content)
+            response_text = self._extract_plain_text(response_text)
             
             # Add assistant message
             assistant_message: Message = {
@@ -500,6 +508,83 @@ class BlogGeneratorService:
                 }
         return None
     
+    async def _start_turn(self, message: str, session_id: str, user_id: Optional[str], username: Optional[str]) -> BlogState:
+        """Load (or create) the session and append the user's message"""
+        state = await self.session_manager.get_session(session_id)
+        if not state:
+            state = await self.session_manager.create_session(session_id, user_id, username)
+        elif str(state.get("user_id")) != str(user_id):
+            # Session ids come from the client; never continue someone else's chat
+            raise SessionNotOwned(session_id)
+
+        user_msg: Message = {
+            "role": "user",
+            "content": message,
+            "timestamp": datetime.now().isoformat()
+        }
+        state["messages"].append(user_msg)
+        return state
+
+    async def _finish_turn(self, session_id: str, result: BlogState) -> Dict[str, Any]:
+        """Save the graph's result and build the client response"""
+        # Bound the stored history: last N turns plus a rolling summary
+        window_history(
+            result,
+            max_turns=getattr(settings, "CHAT_HISTORY_TURNS", 10),
+            summary_chars=getattr(settings, "CHAT_SUMMARY_MAX_CHARS", 2000),
+        )
+
+        # Update session state
+        await self.session_manager.save_session(session_id, result)
+
+        # Prepare response
+        latest_assistant_message = next(
+            (msg["content"] for msg in reversed(result["messages"]) if msg["role"] == "assistant"),
+            "How can I help you with your blog?"
+        )
+
+        latest_assistant_message = self._extract_plain_text(latest_assistant_message)
+
+        return {
+            "message": latest_assistant_message,
+            "action": result.get("current_action"),
+            "blog_state": {
+                "slug": result.get("slug"),
+                "title": result.get("title"),
+                "subtitle": result.get("subtitle"),
+                "excerpt": result.get("excerpt"),
+                "image": result.get("image"),
+                "category": result.get("category"),
+                "featured": result.get("featured"),
+                "tags": result.get("tags"),
+                "content": result.get("content")
+            },
+            "pending_save": result.get("pending_save", False),
+            "messages": result["messages"]
+        }
+
+    def _error_response(self, error: Exception, session_id: str) -> Dict[str, Any]:
+        if isinstance(error, SessionConflict):
+            # Another request saved this chat while we were generating
+            logger.warning(f"Session {session_id} was modified concurrently; turn discarded")
+            message = "This chat was updated by another request while I was working. Please send your message again."
+            action = "conflict"
+        elif isinstance(error, SessionNotOwned):
+            logger.warning(f"Session {session_id} belongs to another user; turn rejected")
+            message = "This chat belongs to another user. Please start a new chat."
+            action = "forbidden"
+        else:
+            logger.error(f"Error processing message: {error}", exc_info=error)
+            message = f"Sorry, I encountered an error: {str(error)}"
+            action = "error"
+        return {
+            "message": message,
+            "action": action,
+            "blog_state": {},
+            "pending_save": False,
+            "messages": []
+        }
+
     async def process_message(
         self,
         message: str,
@@ -511,64 +596,45 @@ class BlogGeneratorService:
         Process user message and generate response (Async)
         """
         try:
-            # Get or create session state
-            state = await self.session_manager.get_session(session_id)
-            if not state:
-                state = await self.session_manager.create_session(session_id, user_id, username)
-            
-            # Add user message to state
-            user_msg: Message = {
-                "role": "user",
-                "content": message,
-                "timestamp": datetime.now().isoformat()
-            }
-            state["messages"].append(user_msg)
-            
+            state = await self._start_turn(message, session_id, user_id, username)
+
             # Process through graph asynchronously
             # Note: invoke() is sync, ainvoke() is async
             result = await self.graph.ainvoke(state)
-            
-            # Update session state
-            await self.session_manager.save_session(session_id, result)
-            
-            # Prepare response
-            latest_assistant_message = next(
-                (msg["content"] for msg in reversed(result["messages"]) if msg["role"] == "assistant"),
-                "How can I help you with your blog?"
-            )
-            
-            latest_assistant_message = self._extract_plain_text(latest_assistant_message)
-            
-            response = {
-                "message": latest_assistant_message,
-                "action": result.get("current_action"),
-                "blog_state": {
-                    "slug": result.get("slug"),
-                    "title": result.get("title"),
-                    "subtitle": result.get("subtitle"),
-                    "excerpt": result.get("excerpt"),
-                    "image": result.get("image"),
-                    "category": result.get("category"),
-                    "featured": result.get("featured"),
-                    "tags": result.get("tags"),
-                    "content": result.get("content")
-                },
-                "pending_save": result.get("pending_save", False),
-                "messages": result["messages"]
-            }
-            
-            return response
-            
+
+            return await self._finish_turn(session_id, result)
+
         except Exception as e:
-            logger.error(f"Error processing message: {e}", exc_info=True)
-            return {
-                "message": f"Sorry, I encountered an error: {str(e)}",
-                "action": "error",
-                "blog_state": {},
-                "pending_save": False,
-                "messages": []
-            }
-    
+            return self._error_response(e, session_id)
+
+    async def stream_message(
+        self,
+        message: str,
+        session_id: str,
+        user_id: Optional[str] = None,
+        username: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Like process_message, but yields events while the graph runs:
+        ``intent``, ``token`` (chat text deltas), ``section`` (each generated
+        section once it validates), then ``done`` with the process_message
+        payload, or ``error``.
+        """
+        try:
+            state = await self._start_turn(message, session_id, user_id, username)
+
+            result = state
+            async for mode, chunk in self.graph.astream(state, stream_mode=["custom", "values"]):
+                if mode == "custom":
+                    yield chunk
+                else:
+                    result = chunk
+
+            yield {"event": "done", **await self._finish_turn(session_id, result)}
+
+        except Exception as e:
+            yield {"event": "error", **self._error_response(e, session_id)}
+
     async def clear_blog_state(self, session_id: str) -> None:
         """Clear blog state but keep conversation history"""
         await self.session_manager.clear_session_data(session_id)
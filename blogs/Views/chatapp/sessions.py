@@ -0,0 +1,397 @@
+"""
+Session storage for the blog generation chat.
+
+Sessions used to live in a dict of the process that created them, so with
+several workers a follow-up message could land on one that had never seen
+the chat. ``settings.CHAT_SESSION_BACKEND`` now selects the storage:
+
+- ``database`` (default): one ``ChatSession`` row per chat
+- ``cache``: the Django cache; needs a backend shared by all workers
+  (Redis, Memcached, database cache)
+- ``memory``: per-process dict, for development and tests
+- or the dotted path of a ``SessionManager`` subclass
+
+States are stored as zlib-compressed compact JSON and only fetched when a
+request asks for them. Writes are optimistic: a state carries the
+``version`` it was loaded at and ``save_session`` raises ``SessionConflict``
+instead of overwriting a turn another worker saved in the meantime.
+
+Storage is bounded: sessions idle for ``CHAT_SESSION_TTL`` seconds expire,
+and the memory and database backends keep at most ``CHAT_SESSION_MAX``
+sessions, evicting the least recently used whenever a new one is stored.
+``sweep()`` removes what has expired: the memory and database backends run
+it from a daemon thread every ``CHAT_SESSION_SWEEP_INTERVAL`` seconds
+(``manage.py sweep_chat_sessions`` does the same out of process), and cache
+entries simply time out. ``metrics()`` reports resident sessions and bytes.
+"""
+import json
+import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, close_old_connections
+from django.db.models import Count, Sum
+from django.db.models.functions import Length
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from blogs.models import ChatSession
+
+from .state import BlogState, create_empty_blog_state
+
+logger = logging.getLogger(__name__)
+
+
+class SessionConflict(Exception):
+    """The session was saved by another request since it was loaded"""
+
+
+class SessionNotOwned(Exception):
+    """The session belongs to another user"""
+
+
+def encode_state(state: BlogState) -> bytes:
+    return zlib.compress(json.dumps(state, separators=(",", ":"), ensure_ascii=False).encode())
+
+
+def decode_state(data: bytes) -> BlogState:
+    return json.loads(zlib.decompress(bytes(data)))
+
+
+# Blog draft fields reset by clear_session_data (the history is kept)
+CLEARED_BLOG_FIELDS = {
+    "slug": None,
+    "title": None,
+    "subtitle": None,
+    "excerpt": None,
+    "image": None,
+    "category": None,
+    "featured": False,
+    "tags": [],
+    "content": None,
+    "pending_save": False,
+    "current_action": None,
+}
+
+
+class SessionManager:
+    """
+    Async session API used by BlogGeneratorService. Subclasses implement
+    ``_load``, ``_store`` (compare-and-set on the version) and ``_delete``.
+    """
+    # Attempts of read-modify-write helpers before giving up on a conflict
+    max_retries = 3
+    _sweeper = None
+
+    @property
+    def ttl(self) -> Optional[int]:
+        """Seconds a session may stay idle before it expires (None: never)"""
+        return getattr(settings, "CHAT_SESSION_TTL", 60 * 60 * 24) or None
+
+    @property
+    def max_sessions(self) -> Optional[int]:
+        """Most sessions kept before the least recently used are evicted"""
+        return getattr(settings, "CHAT_SESSION_MAX", 1000) or None
+
+    async def get_session(self, session_id: str) -> Optional[BlogState]:
+        """Retrieve a session by ID"""
+        return await self._load(session_id)
+
+    async def create_session(self, session_id: str, user_id: Optional[str] = None, username: Optional[str] = None) -> BlogState:
+        """Create a new session (stored by its first save_session)"""
+        return create_empty_blog_state(session_id, user_id, username)
+
+    async def save_session(self, session_id: str, state: BlogState) -> None:
+        """Save/Update a session; raises SessionConflict if it changed since it was loaded"""
+        expected = state.get("version", 0)
+        await self._store(session_id, {**state, "version": expected + 1}, expected)
+        state["version"] = expected + 1
+
+    async def clear_session_data(self, session_id: str) -> None:
+        """Clear blog data from session but keep history"""
+        for _ in range(self.max_retries):
+            state = await self._load(session_id)
+            if state is None:
+                return
+            state.update(CLEARED_BLOG_FIELDS)
+            state["updated_at"] = datetime.now().isoformat()
+            try:
+                await self.save_session(session_id, state)
+                return
+            except SessionConflict:
+                continue
+        raise SessionConflict(session_id)
+
+    async def delete_session(self, session_id: str) -> None:
+        """Delete a session completely"""
+        await self._delete(session_id)
+
+    def sweep(self) -> int:
+        """Drop expired (and over-cap) sessions; returns how many went"""
+        return 0
+
+    def metrics(self) -> Dict[str, Any]:
+        """Resident ``sessions`` and stored ``bytes`` (None where unknown)"""
+        return {"backend": type(self).__name__, "sessions": None, "bytes": None}
+
+    def _start_sweeper(self):
+        interval = getattr(settings, "CHAT_SESSION_SWEEP_INTERVAL", 60)
+        if not interval or self.ttl is None or self._sweeper is not None:
+            return
+        self._sweeper = threading.Thread(
+            target=self._sweep_forever, args=(interval,), name="chat-session-sweeper", daemon=True
+        )
+        self._sweeper.start()
+
+    def _sweep_forever(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                evicted = self.sweep()
+                if evicted:
+                    logger.info(f"Swept {evicted} expired chat session(s); {self.metrics()}")
+            except Exception as e:
+                logger.error(f"Error sweeping chat sessions: {e}")
+            finally:
+                # The thread's own database connection
+                close_old_connections()
+
+    async def _load(self, session_id: str) -> Optional[BlogState]:
+        raise NotImplementedError
+
+    async def _store(self, session_id: str, state: BlogState, expected_version: int) -> None:
+        raise NotImplementedError
+
+    async def _delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+
+class InMemorySessionManager(SessionManager):
+    """
+    Per-process storage: only correct with a single worker. Kept in LRU
+    order; a daemon thread sweeps expired sessions every
+    ``CHAT_SESSION_SWEEP_INTERVAL`` seconds.
+    """
+
+    def __init__(self):
+        # session_id -> (version, data, last used); least recently used first
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        # Requests run on several event loops/threads, plus the sweeper
+        self._lock = threading.Lock()
+
+    def _expired(self, last_used, now):
+        return self.ttl is not None and now - last_used > self.ttl
+
+    async def _load(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            stored = self._sessions.get(session_id)
+            if stored is None:
+                return None
+            version, data, last_used = stored
+            if self._expired(last_used, now):
+                del self._sessions[session_id]
+                return None
+            self._sessions[session_id] = (version, data, now)
+            self._sessions.move_to_end(session_id)
+        state = decode_state(data)
+        state["version"] = version
+        return state
+
+    async def _store(self, session_id, state, expected_version):
+        data = encode_state(state)
+        with self._lock:
+            stored = self._sessions.get(session_id)
+            current = stored[0] if stored is not None else 0
+            if current != expected_version:
+                raise SessionConflict(session_id)
+            self._sessions[session_id] = (expected_version + 1, data, time.monotonic())
+            self._sessions.move_to_end(session_id)
+            while self.max_sessions is not None and len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._start_sweeper()
+
+    async def _delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def sweep(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [sid for sid, (_, _, last_used) in self._sessions.items() if self._expired(last_used, now)]
+            for session_id in expired:
+                del self._sessions[session_id]
+        return len(expired)
+
+    def metrics(self):
+        with self._lock:
+            sizes = [len(data) for _, data, _ in self._sessions.values()]
+        return {"backend": type(self).__name__, "sessions": len(sizes), "bytes": sum(sizes)}
+
+
+class DatabaseSessionManager(SessionManager):
+    """
+    One ChatSession row per chat; the version check is part of the UPDATE.
+    Creating a session evicts the least recently used ones over the cap, and
+    a daemon thread deletes expired rows every ``CHAT_SESSION_SWEEP_INTERVAL``
+    seconds.
+    """
+
+    def _cutoff(self):
+        return timezone.now() - timedelta(seconds=self.ttl)
+
+    def _live(self):
+        sessions = ChatSession.objects.all()
+        if self.ttl is not None:
+            sessions = sessions.filter(updated_at__gte=self._cutoff())
+        return sessions
+
+    async def _load(self, session_id):
+        # Expired rows read as missing until the sweeper deletes them
+        row = await self._live().filter(pk=session_id).values_list("data", "version").afirst()
+        if row is None:
+            return None
+        data, version = row
+        state = decode_state(data)
+        state["version"] = version
+        return state
+
+    async def _store(self, session_id, state, expected_version):
+        data = encode_state(state)
+        if expected_version == 0:
+            await self._create(session_id, state, data)
+            return
+
+        updated = await ChatSession.objects.filter(pk=session_id, version=expected_version).aupdate(
+            data=data, version=expected_version + 1, updated_at=timezone.now()
+        )
+        if not updated:
+            raise SessionConflict(session_id)
+
+    async def _create(self, session_id, state, data):
+        now = timezone.now()
+        if self.ttl is not None:
+            # An expired row reads as missing, so this id is free: take the
+            # row over unless someone else revived it in the meantime
+            replaced = await ChatSession.objects.filter(pk=session_id, updated_at__lt=self._cutoff()).aupdate(
+                user_id=_user_pk(state), data=data, version=1, created_at=now, updated_at=now
+            )
+            if replaced:
+                return
+        try:
+            await ChatSession.objects.acreate(
+                session_id=session_id, user_id=_user_pk(state), data=data, version=1
+            )
+        except IntegrityError:
+            # Another request created this session first; anything else
+            # (e.g. the user was deleted) is not a conflict
+            if await ChatSession.objects.filter(pk=session_id).aexists():
+                raise SessionConflict(session_id)
+            raise
+        await sync_to_async(self._evict_over_cap)()
+        self._start_sweeper()
+
+    async def _delete(self, session_id):
+        await ChatSession.objects.filter(pk=session_id).adelete()
+
+    def _evict_over_cap(self):
+        if self.max_sessions is None:
+            return 0
+        # Updated-at of the oldest session that still fits under the cap
+        oldest_kept = (
+            ChatSession.objects.order_by("-updated_at")
+            .values_list("updated_at", flat=True)[self.max_sessions - 1:self.max_sessions]
+            .first()
+        )
+        if oldest_kept is None:
+            return 0
+        return ChatSession.objects.filter(updated_at__lt=oldest_kept).delete()[0]
+
+    def sweep(self):
+        evicted = 0
+        if self.ttl is not None:
+            evicted += ChatSession.objects.filter(updated_at__lt=self._cutoff()).delete()[0]
+        return evicted + self._evict_over_cap()
+
+    def metrics(self):
+        totals = ChatSession.objects.aggregate(sessions=Count("pk"), bytes=Sum(Length("data")))
+        return {"backend": type(self).__name__, "sessions": totals["sessions"], "bytes": totals["bytes"] or 0}
+
+
+class CacheSessionManager(SessionManager):
+    """
+    Sessions in ``settings.CHAT_SESSION_CACHE`` as ``(version, data)``. The
+    cache API has no compare-and-set, so a short-lived ``add()`` lock guards
+    the version check. Expiry and eviction are left to the cache.
+    """
+    lock_timeout = 10
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, "CHAT_SESSION_CACHE", "default")]
+
+    @property
+    def timeout(self):
+        # The cache's own expiry is the idle TTL; its eviction policy does the LRU part
+        return self.ttl
+
+    def _key(self, session_id):
+        return f"chat-session:{session_id}"
+
+    async def _load(self, session_id):
+        key = self._key(session_id)
+        stored = await self.cache.aget(key)
+        if stored is None:
+            return None
+        # Reading counts as activity
+        await self.cache.atouch(key, self.timeout)
+        version, data = stored
+        state = decode_state(data)
+        state["version"] = version
+        return state
+
+    async def _store(self, session_id, state, expected_version):
+        key = self._key(session_id)
+        lock = f"{key}:lock"
+        if not await self.cache.aadd(lock, 1, timeout=self.lock_timeout):
+            raise SessionConflict(session_id)
+        try:
+            stored = await self.cache.aget(key)
+            current = stored[0] if stored is not None else 0
+            if current != expected_version:
+                raise SessionConflict(session_id)
+            await self.cache.aset(key, (expected_version + 1, encode_state(state)), timeout=self.timeout)
+        finally:
+            await self.cache.adelete(lock)
+
+    async def _delete(self, session_id):
+        await self.cache.adelete(self._key(session_id))
+
+
+SESSION_BACKENDS = {
+    "database": DatabaseSessionManager,
+    "cache": CacheSessionManager,
+    "memory": InMemorySessionManager,
+}
+
+
+def get_session_manager() -> SessionManager:
+    """Instantiate the backend named by ``settings.CHAT_SESSION_BACKEND``"""
+    backend = getattr(settings, "CHAT_SESSION_BACKEND", "database")
+    try:
+        cls = SESSION_BACKENDS.get(backend) or import_string(backend)
+    except ImportError as e:
+        raise ImproperlyConfigured(f"Unknown CHAT_SESSION_BACKEND {backend!r}: {e}")
+    return cls()
+
+
+def _user_pk(state: BlogState) -> Optional[int]:
+    user_id = state.get("user_id")
+    return int(user_id) if user_id and str(user_id).isdigit() else None
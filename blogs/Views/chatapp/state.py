@@ -27,6 +27,7 @@ class BlogState(TypedDict):
     
     # Conversation state
     messages: List[Message]
+    summary: str  # Rolling digest of messages dropped from the window
     current_action: Optional[str]  # "generate", "update", "save", None
     pending_save: bool
     
@@ -36,6 +37,7 @@ class BlogState(TypedDict):
     session_id: str
     created_at: str
     updated_at: str
+    version: int  # Storage version this state was loaded at (0 = never saved)
 
 
 def create_empty_blog_state(session_id: str, user_id: Optional[str] = None, username: Optional[str] = None) -> BlogState:
@@ -52,13 +54,15 @@ def create_empty_blog_state(session_id: str, user_id: Optional[str] = None, user
         tags=[],
         content=None,
         messages=[],
+        summary="",
         current_action=None,
         pending_save=False,
         user_id=user_id,
         username=username,
         session_id=session_id,
         created_at=now,
-        updated_at=now
+        updated_at=now,
+        version=0
     )
 
 
@@ -68,3 +72,28 @@ def update_blog_state(state: BlogState, updates: Dict[str, Any]) -> BlogState:
     state["updated_at"] = datetime.now().isoformat()
     return state
 
+
+
+def window_history(state: BlogState, max_turns: int, summary_chars: int) -> BlogState:
+    """
+    Keep the last ``max_turns`` user/assistant turns in ``messages`` and fold
+    older messages into the rolling ``summary`` (oldest text falls off
+    once it exceeds ``summary_chars``).
+    """
+    overflow = len(state["messages"]) - max_turns * 2
+    if overflow <= 0:
+        return state
+    dropped = state["messages"][:overflow]
+    state["messages"] = state["messages"][overflow:]
+
+    lines = (state.get("summary") or "").splitlines()
+    for message in dropped:
+        content = " ".join(message["content"].split())
+        if len(content) > 200:
+            content = content[:197] + "..."
+        lines.append(f"{message['role']}: {content}")
+    # Drop whole lines from the oldest end until the summary fits
+    while lines and sum(len(line) + 1 for line in lines) - 1 > summary_chars:
+        lines.pop(0)
+    state["summary"] = "\n".join(lines)
+    return state
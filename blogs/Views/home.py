@@ -1,20 +1,31 @@
 from django.views.generic import TemplateView
 from blogs.models import FAQ, Testimonial
+from blogs.caching import cached
+from blogs.stats import site_stats
 
 
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-
-@method_decorator(cache_page(60 * 15), name='dispatch')
 class HomeView(TemplateView):
     template_name = "home.html"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
+        # FAQs and testimonials come from the versioned fragment cache and are
+        # invalidated by their post_save/post_delete signals (see blogs.caching)
+        context['faqs'] = cached('home_faqs', ['faqs'], self.build_faqs)
+        context['testimonials'] = cached('home_testimonials', ['testimonials', 'users'], self.build_testimonials)
+        # Totals come from the SiteStats rollup (one primary-key read), kept
+        # current by signals and recompute_site_stats (see blogs.stats)
+        stats = site_stats()
+        context['stats_active_users'] = stats.active_users
+        context['stats_blogs_published'] = stats.blogs_published
+        context['stats_total_views'] = self.format_views(stats.total_views)
+        return context
+
+    def build_faqs(self):
         # Fetch FAQs from database
         faqs = FAQ.objects.all()
-        context['faqs'] = [
+        return [
             {
                 'question': faq.question,
                 'answer': faq.answer
@@ -22,9 +33,10 @@ class HomeView(TemplateView):
             for faq in faqs
         ]
 
+    def build_testimonials(self):
         # Fetch Testimonials from database
         testimonials = Testimonial.objects.select_related('user').all()
-        context['testimonials'] = [
+        return [
             {
                 'name': testimonial.user.get_display_name() if hasattr(testimonial.user, 'get_display_name') else testimonial.user.username,
                 'message': testimonial.content,
@@ -32,31 +44,11 @@ class HomeView(TemplateView):
             }
             for testimonial in testimonials
         ]
-        
-        # --- Real Statistics ---
-        from django.contrib.auth import get_user_model
-        from blogs.models import Blog
-        from django.db.models import Sum
-        
-        User = get_user_model()
-        
-        # 1. Active Users (Total users)
-        context['stats_active_users'] = User.objects.count()
-        
-        # 2. Blogs Published
-        context['stats_blogs_published'] = Blog.objects.filter(isPublished=True).count()
-        
-        # 3. Total Views (Sum of views of all PROCESSED blogs - or published ones)
-        # We'll sum views of published blogs for accuracy
-        total_views = Blog.objects.filter(isPublished=True).aggregate(total=Sum('views'))['total'] or 0
-        
-        # Format total_views for display (e.g., 2.4M) - optional, or just pass number
-        # Let's pass the raw number and let template filter handle it, or do simple formatting here
+
+    def format_views(self, total_views):
+        # Format total_views for display (e.g., 2.4M)
         if total_views >= 1000000:
-            context['stats_total_views'] = f"{total_views/1000000:.1f}M"
+            return f"{total_views/1000000:.1f}M"
         elif total_views >= 1000:
-            context['stats_total_views'] = f"{total_views/1000:.1f}K"
-        else:
-            context['stats_total_views'] = str(total_views)
-
-        return context
+            return f"{total_views/1000:.1f}K"
+        return str(total_views)
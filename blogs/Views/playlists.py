@@ -3,6 +3,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy, reverse
 from django.shortcuts import redirect
 from django.contrib import messages
+from django.db.models import Prefetch
 from blogs.models import Playlist, Blog
 from blogs.forms import PlaylistForm
 
@@ -18,7 +19,7 @@ class PlaylistCreateView(LoginRequiredMixin, CreateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['user_blogs'] = Blog.objects.filter(author=self.request.user, isPublished=True)
+        context['user_blogs'] = Blog.objects.filter(author=self.request.user, isPublished=True).cards()
         return context
 
     def form_valid(self, form):
@@ -41,7 +42,7 @@ class PlaylistUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['user_blogs'] = Blog.objects.filter(author=self.request.user, isPublished=True)
+        context['user_blogs'] = Blog.objects.filter(author=self.request.user, isPublished=True).cards()
         context['selected_blog_ids'] = list(self.object.blogs.values_list('id', flat=True))
         return context
 
@@ -98,7 +99,10 @@ class PlaylistDetailView(DetailView):
     context_object_name = "playlist"
 
     def get_object(self, queryset=None):
-        return Playlist.objects.prefetch_related('blogs').get(
+        # Only card columns of the playlist's blogs, never sections/embeddings
+        return Playlist.objects.select_related('owner').prefetch_related(
+            Prefetch('blogs', queryset=Blog.objects.cards())
+        ).get(
             owner__username=self.kwargs.get('username'),
             slug=self.kwargs.get('slug')
         )
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from blogs.models import Blog, Category, FAQ, Testimonial,User
+from blogs.models import Blog, Category, FAQ, Testimonial, User, EmbeddingJob
 
 
 admin.site.site_header = "Blogermenia Admin"
@@ -43,8 +43,14 @@ class TestimonialAdmin(admin.ModelAdmin):
         return obj.content[:50] + "..." if len(obj.content) > 50 else obj.content
     content_preview.short_description = "Content"
 
+class EmbeddingJobAdmin(admin.ModelAdmin):
+    list_display = ("blog", "status", "attempts", "run_after", "updated_at")
+    list_filter = ("status",)
+    readonly_fields = ("created_at", "updated_at", "locked_at", "locked_by", "last_error")
+
 admin.site.register(User, UserAdmin)
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Blog, BlogAdmin)
 admin.site.register(FAQ, FAQAdmin)
 admin.site.register(Testimonial, TestimonialAdmin)
+admin.site.register(EmbeddingJob, EmbeddingJobAdmin)
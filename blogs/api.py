@@ -1,15 +1,19 @@
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views import View
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.views import redirect_to_login
 from django.shortcuts import get_object_or_404
-from django.db.models import F
+from django.db import IntegrityError, transaction
 from django.conf import settings
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
+from django.core.handlers.asgi import ASGIRequest
 import time
 import os
 import uuid
 from blogs.models import Blog, BlogLike
+from blogs.counters import blog_like_counter, live_likes
+from blogs import llm
 
 class JsonPostMixin:
     """Mixin to ensure request is POST and return JSON responses."""
@@ -18,49 +22,82 @@ class JsonPostMixin:
             return JsonResponse({'error': 'Method not allowed'}, status=405)
         return super().dispatch(request, *args, **kwargs)
 
+class AsyncJsonPostMixin:
+    """
+    JsonPostMixin (plus LoginRequiredMixin when ``login_required``) for
+    async views. The user is loaded with ``request.auser()``, so the event
+    loop never blocks on a session/user query; anonymous requests are sent
+    to the login page like LoginRequiredMixin does.
+
+    Under WSGI each request runs on an event loop of its own, whose LLM
+    connection pools are closed when the view returns (see blogs.llm).
+    """
+    login_required = False
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if request.method != 'POST':
+                return JsonResponse({'error': 'Method not allowed'}, status=405)
+            if self.login_required and not (await request.auser()).is_authenticated:
+                return redirect_to_login(request.get_full_path())
+            return await super().dispatch(request, *args, **kwargs)
+        finally:
+            if not isinstance(request, ASGIRequest):
+                await llm.aclose_loop_clients()
+
 class ToggleBlogLikeAPI(LoginRequiredMixin, JsonPostMixin, View):
     def post(self, request, slug, *args, **kwargs):
+        # Buffer version first, so live_likes can tell if the row below goes stale
+        version = blog_like_counter.version()
         # Get the blog - minimized query
         blog = get_object_or_404(Blog.objects.only('id', 'likes'), slug=slug)
         user = request.user
         
-        # Check if already liked
-        like_obj, created = BlogLike.objects.get_or_create(user=user, blog=blog)
-        
-        if not created:
-            # Already liked, so UNLIKE it
-            like_obj.delete()
+        # One write per toggle: deleting an existing like *is* the unlike;
+        # Blog.likes itself is maintained write-behind (see blogs.counters)
+        deleted, _ = BlogLike.objects.filter(user=user, blog_id=blog.pk).delete()
+        if deleted:
             liked = False
-            # Decrement count safely
-            Blog.objects.filter(pk=blog.pk).update(likes=F('likes') - 1)
-            # Calculate new likes without DB hit (approx)
-            new_likes = blog.likes - 1
+            delta = -1
         else:
-            # Just created, so it's a LIKE
             liked = True
-            # Increment count safely
-            Blog.objects.filter(pk=blog.pk).update(likes=F('likes') + 1)
-            new_likes = blog.likes + 1
-            
+            try:
+                with transaction.atomic():
+                    BlogLike.objects.create(user=user, blog_id=blog.pk)
+                delta = 1
+            except IntegrityError:
+                # A concurrent request liked it first; that one counted it
+                delta = 0
+
+        if delta:
+            blog_like_counter.increment(blog.pk, delta)
+
         return JsonResponse({
             'liked': liked,
-            'total_likes': max(0, new_likes) # Prevent negative if something weird happened
+            # Includes this toggle even when the increment flushed the buffer
+            'total_likes': max(0, live_likes(blog, version)) # Prevent negative if something weird happened
         })
 
 
+import asyncio
 import json
 import numpy as np
-from django.db.models import Q
-from asgiref.sync import async_to_sync
-from langchain_mistralai import MistralAIEmbeddings
+from asgiref.sync import sync_to_async
 from blogs.Views.chatapp.service import BlogGeneratorService
+from blogs.search import BlogSearch, reciprocal_rank_fusion
 
-# Initialize global service instance to maintain in-memory state (development only)
-# For production, SessionManager should use Redis/Database
+# One service per process; chat sessions live in shared storage
+# (settings.CHAT_SESSION_BACKEND) so any worker can continue any chat
 BLOG_SERVICE = BlogGeneratorService()
 
-class GenerateBlogAPI(LoginRequiredMixin, JsonPostMixin, View):
-    def post(self, request, *args, **kwargs):
+class GenerateBlogAPI(AsyncJsonPostMixin, View):
+    """
+    Async view: under ASGI a worker holds no thread while the LLM works, so
+    one process can serve many generations at once.
+    """
+    login_required = True
+
+    async def post(self, request, *args, **kwargs):
         try:
             data = json.loads(request.body)
             message = data.get('message')
@@ -70,12 +107,13 @@ class GenerateBlogAPI(LoginRequiredMixin, JsonPostMixin, View):
                 return JsonResponse({'error': 'Message is required'}, status=400)
 
             # Call the AI service
-            # We use the global instance to keep chat history in memory
-            response = async_to_sync(BLOG_SERVICE.process_message)(
+            # The session is loaded from (and saved back to) shared storage
+            user = await request.auser()
+            response = await BLOG_SERVICE.process_message(
                 message=message,
                 session_id=session_id,
-                user_id=str(request.user.id),
-                username=request.user.username
+                user_id=str(user.id),
+                username=user.username
             )
             
             # Add session_id to response so client can maintain conversation
@@ -85,7 +123,8 @@ class GenerateBlogAPI(LoginRequiredMixin, JsonPostMixin, View):
             if 'blog_state' in response:
                 response['blog_data'] = response['blog_state']
             
-            return JsonResponse(response)
+            # Someone else's session_id
+            return JsonResponse(response, status=403 if response.get('action') == 'forbidden' else 200)
             
         except json.JSONDecodeError:
             return JsonResponse({'error': 'Invalid JSON'}, status=400)
@@ -94,55 +133,160 @@ class GenerateBlogAPI(LoginRequiredMixin, JsonPostMixin, View):
             return JsonResponse({'error': str(e)}, status=500)
 
 
-class SearchBlogAPI(JsonPostMixin, View):
+def iterate_in_loop(agen):
     """
-    Search blogs using Vector Embeddings (Semantic Search)
+    Drive an async generator from a sync (WSGI) response one item at a time;
+    handing Django the async generator itself would make it buffer
+    everything before sending.
     """
-    def post(self, request, *args, **kwargs):
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(agen.aclose())
+        # The loop dies here: close the LLM pools it opened
+        loop.run_until_complete(llm.aclose_loop_clients())
+        loop.close()
+
+
+class GenerateBlogStreamAPI(AsyncJsonPostMixin, View):
+    """
+    GenerateBlogAPI as Server-Sent Events, so the page can show progress
+    instead of waiting for the whole blog. Events: ``session``, ``intent``,
+    ``token`` (chat text deltas), ``section`` (each generated section as soon
+    as it validates), then ``done`` (the GenerateBlogAPI payload) or ``error``.
+    """
+    login_required = True
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+
+        message = data.get('message')
+        if not message:
+            return JsonResponse({'error': 'Message is required'}, status=400)
+        session_id = data.get('session_id') or str(uuid.uuid4())
+
+        user = await request.auser()
+        events = self.stream(session_id, BLOG_SERVICE.stream_message(
+            message=message,
+            session_id=session_id,
+            user_id=str(user.id),
+            username=user.username
+        ))
+        # ASGI streams async iterators as they yield; WSGI needs a sync one
+        content = events if isinstance(request, ASGIRequest) else iterate_in_loop(events)
+        response = StreamingHttpResponse(content, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, session_id, events):
+        # First byte right away, before any model call
+        yield self.sse('session', {'session_id': session_id})
+        async for event in events:
+            name = event.pop('event')
+            if name == 'done':
+                event['session_id'] = session_id
+                # Same legacy key as GenerateBlogAPI
+                event['blog_data'] = event.get('blog_state')
+            yield self.sse(name, event)
+
+    def sse(self, name, data):
+        return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+class SearchBlogAPI(AsyncJsonPostMixin, View):
+    """
+    Hybrid blog search: BM25 keyword matches fused with embedding similarity
+    (reciprocal-rank fusion).
+
+    Body: ``query`` plus optional ``limit``, ``offset``, ``category`` (slug)
+    and ``stream``. With ``stream: true`` the response is NDJSON: a
+    ``keyword`` line as soon as the full-text phase is done, then the fused
+    ``hybrid`` line once the query has been embedded.
+
+    Async view: the query is embedded with a non-blocking API call while the
+    keyword phase runs, and database work goes through ``sync_to_async``.
+    """
+    max_limit = 50
+
+    async def post(self, request, *args, **kwargs):
         try:
             data = json.loads(request.body)
             query = data.get('query')
-            limit = data.get('limit', 5)
+            limit = min(max(int(data.get('limit', 5)), 1), self.max_limit)
+            offset = max(int(data.get('offset', 0)), 0)
             
             if not query:
                 return JsonResponse({'error': 'Query is required'}, status=400)
 
-            # Standard text-based search
-            blogs = Blog.objects.filter(isPublished=True).select_related('category', 'author')
-
-            if query:
-                blogs = blogs.filter(
-                    Q(title__icontains=query) |
-                    Q(subtitle__icontains=query) |
-                    Q(excerpt__icontains=query)
-                )
-
-            # Limit results
-            blogs = blogs.only(
-                'id', 'title', 'slug', 'thumbnail', 'publishedDate', 'excerpt', 
-                'category__name', 'author__username'
-            )[:limit]
-            
-            response_data = []
-            for blog in blogs:
-                response_data.append({
-                    'id': blog.id,
-                    'title': blog.title,
-                    'slug': blog.slug,
-                    'excerpt': blog.excerpt,
-                    'category': blog.category.name if blog.category else None,
-                    'thumbnail': blog.thumbnail.url if blog.thumbnail else None,
-                    'publishedDate': blog.publishedDate.isoformat() if blog.publishedDate else None,
-                    'author_username': blog.author.username,
-                    'score': 1.0 # Static score for text match
-                })
-                
-            return JsonResponse({'results': response_data})
+            search = BlogSearch(query, limit=limit, offset=offset, category=data.get('category') or None)
+
+            if data.get('stream'):
+                events = self.stream(search)
+                content = events if isinstance(request, ASGIRequest) else iterate_in_loop(events)
+                return StreamingHttpResponse(content, content_type='application/x-ndjson')
 
+            # Both phases at once: the embedding call overlaps the BM25 query
+            keyword, vector = await asyncio.gather(search.akeyword_ranking(), search.avector_ranking())
+            ranking = reciprocal_rank_fusion(keyword, vector)
+            return JsonResponse(await sync_to_async(self.payload)(search, ranking, 'hybrid'))
+
+        except (TypeError, ValueError) as e:
+            return JsonResponse({'error': f'Invalid parameters: {e}'}, status=400)
         except Exception as e:
             print(f"Error in SearchBlogAPI: {e}")
             return JsonResponse({'error': str(e)}, status=500)
 
+    async def stream(self, search):
+        """Yield one NDJSON line per finished phase"""
+        # Start embedding right away; it usually finishes after BM25
+        vector = asyncio.ensure_future(search.avector_ranking())
+        try:
+            keyword = await search.akeyword_ranking()
+            payload = await sync_to_async(self.payload)(search, reciprocal_rank_fusion(keyword), 'keyword')
+            yield json.dumps(payload) + '\n'
+            ranking = reciprocal_rank_fusion(keyword, await vector)
+            yield json.dumps(await sync_to_async(self.payload)(search, ranking, 'hybrid')) + '\n'
+        except Exception as e:
+            print(f"Error in SearchBlogAPI stream: {e}")
+            yield json.dumps({'phase': 'error', 'error': str(e)}) + '\n'
+        finally:
+            # Client went away before the hybrid phase
+            vector.cancel()
+
+    def payload(self, search, ranking, phase):
+        blogs, scores, has_more = search.page(ranking)
+        response_data = []
+        for blog in blogs:
+            response_data.append({
+                'id': blog.id,
+                'title': blog.title,
+                'slug': blog.slug,
+                'excerpt': blog.excerpt,
+                'category': blog.category.name if blog.category else None,
+                'thumbnail': blog.thumbnail.url if blog.thumbnail else None,
+                'publishedDate': blog.publishedDate.isoformat() if blog.publishedDate else None,
+                'author_username': blog.author.username,
+                'score': round(scores[blog.pk], 4),
+                'snippet': search.snippets.get(blog.pk),
+            })
+        return {
+            'phase': phase,
+            'results': response_data,
+            'offset': search.offset,
+            'limit': search.limit,
+            'has_more': has_more,
+        }
+
 
 class UploadImageAPI(LoginRequiredMixin, JsonPostMixin, View):
     def post(self, request, *args, **kwargs):
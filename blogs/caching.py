@@ -0,0 +1,123 @@
+"""
+Versioned fragment/object cache.
+
+Every key embeds the current version of the namespaces it depends on
+("categories", "faqs", ...). Signal receivers (blogs.signals) bump a
+namespace when its rows change, which orphans all keys built from the old
+version at once; orphans simply expire. Nothing ever has to enumerate or
+delete keys, and unrelated pages keep their hits.
+
+Rendered blog cards are versioned per blog (``attach_card_versions``) so saving
+one post only invalidates that post's card.
+
+Invalidation is only seen by every worker when the cache is shared between
+them (``REDIS_URL``); ``check_shared_cache`` warns about a per-process one.
+"""
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+
+VERSION_PREFIX = "cachever"
+_MISSING = object()
+
+
+def fragment_timeout():
+    return getattr(settings, "FRAGMENT_CACHE_TIMEOUT", 60 * 60)
+
+
+def _version_key(namespace):
+    return f"{VERSION_PREFIX}:{namespace}"
+
+
+def _fresh_version():
+    # Never restart from a small number: an evicted version key must not
+    # resurrect fragments that were built under an old version
+    return time.time_ns()
+
+
+def _versions(keys):
+    """Current values of version ``keys``; missing ones start at a fresh version"""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _fresh_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+def namespace_version(*namespaces):
+    """Combined version string of ``namespaces`` (one cache round-trip)"""
+    keys = [_version_key(ns) for ns in namespaces]
+    versions = _versions(keys)
+    return ".".join(str(versions[key]) for key in keys)
+
+
+def bump(*namespaces):
+    """Invalidate everything cached under ``namespaces``"""
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), timeout=None)
+
+
+def cached(name, depends_on, builder, timeout=None):
+    """
+    Return the cached value of ``name``, building it with ``builder()`` on a
+    miss. ``depends_on`` lists the namespaces whose bump invalidates it.
+    """
+    key = f"frag:{name}:{namespace_version(*depends_on)}"
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = builder()
+        cache.set(key, value, timeout if timeout is not None else fragment_timeout())
+    return value
+
+
+def card_namespace(blog_id):
+    return f"blog:{blog_id}"
+
+
+def attach_card_versions(blogs):
+    """
+    Set ``blog.card_version`` on each blog for ``{% cache %}`` keys of its
+    rendered card: the blog's own version plus the category namespace.
+    """
+    blogs = list(blogs)
+    if not blogs:
+        return blogs
+    keys = {blog.pk: _version_key(card_namespace(blog.pk)) for blog in blogs}
+    versions = _versions(list(keys.values()) + [_version_key("categories")])
+    categories = versions[_version_key("categories")]
+    for blog in blogs:
+        updated = blog.updated_at.timestamp() if getattr(blog, "updated_at", None) else 0
+        blog.card_version = f"{versions[keys[blog.pk]]}.{categories}.{updated}"
+    return blogs
+
+
+# Cache backends whose entries live in one process only
+PER_PROCESS_CACHES = ("django.core.cache.backends.locmem.LocMemCache",)
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Version bumps only reach the process that made them when the default
+    cache is per-process, so other workers keep serving stale fragments.
+    """
+    backend = settings.CACHES.get("default", {}).get("BACKEND")
+    if settings.DEBUG or backend not in PER_PROCESS_CACHES:
+        return []
+    return [
+        checks.Warning(
+            f"The default cache ({backend}) is not shared between worker processes.",
+            hint=(
+                "Fragment cache invalidation and view de-duplication only reach the process "
+                "that wrote them. Set REDIS_URL (or CACHES) to a shared backend."
+            ),
+            id="blogs.W001",
+        )
+    ]
@@ -0,0 +1,213 @@
+"""
+Write-behind counters.
+
+Hot counters (blog views and likes) are accumulated in process memory and flushed to
+the database in batches instead of issuing one UPDATE per hit. A flush
+groups rows by their pending delta and runs one ``F()`` update per distinct
+delta inside a single transaction, so concurrent processes never overwrite
+each other's increments (an absolute ``bulk_update`` would).
+
+Each buffer flushes from a daemon thread every ``COUNTER_FLUSH_INTERVAL``
+seconds, early once ``COUNTER_FLUSH_MAX_PENDING`` rows are dirty, and at
+exit. Increments of a process that is killed outright (SIGKILL, OOM) since
+its last flush are lost; that is the accepted trade-off for keeping reads
+off the write lock.
+
+Live values are the loaded column plus this process's pending delta. A
+flush moves deltas from the buffer into the row, so a row loaded before it
+would come up short: take ``version()`` before loading and pass it to
+``live()``, which re-reads the column only when a flush may have run since.
+Other processes' unflushed deltas are never included.
+"""
+import atexit
+import hashlib
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.dispatch import Signal
+
+from blogs.models import Blog
+
+logger = logging.getLogger(__name__)
+
+# Sent after a successful flush with ``model``, ``field`` and ``deltas`` ({pk: delta})
+counters_flushed = Signal()
+
+
+class CounterBuffer:
+    """In-process buffer of increments to one integer column of ``model``"""
+
+    def __init__(self, model, field, flush_interval=None, max_pending=None):
+        self.model = model
+        self.field = field
+        self._flush_interval = flush_interval
+        self._max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = defaultdict(int)
+        self._last_flush = time.monotonic()
+        # Bumped whenever a flush starts; True while its deltas are in flight
+        self._generation = 0
+        self._flushing = False
+        self._timer = None
+
+    @property
+    def flush_interval(self):
+        if self._flush_interval is not None:
+            return self._flush_interval
+        return getattr(settings, "COUNTER_FLUSH_INTERVAL", 10)
+
+    @property
+    def max_pending(self):
+        if self._max_pending is not None:
+            return self._max_pending
+        return getattr(settings, "COUNTER_FLUSH_MAX_PENDING", 500)
+
+    def increment(self, pk, amount=1):
+        with self._lock:
+            self._pending[pk] += amount
+            due = (
+                len(self._pending) >= self.max_pending
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        self._start_timer()
+        if due:
+            self.flush()
+
+    def pending(self, pk):
+        """Increments of ``pk`` not yet written to the database"""
+        with self._lock:
+            return self._pending.get(pk, 0)
+
+    def version(self):
+        """Token to take *before* loading a row whose counter ``live()`` will report"""
+        with self._lock:
+            return None if self._flushing else self._generation
+
+    def live(self, pk, stored, version):
+        """
+        ``stored`` (the column as loaded after ``version()``) plus the pending
+        delta of ``pk``. If a flush ran since (or there is no ``version``), the
+        column is re-read while no flush can run, so flushed deltas are
+        counted exactly once.
+        """
+        with self._lock:
+            if version is not None and version == self._generation and not self._flushing:
+                return stored + self._pending.get(pk, 0)
+        with self._flush_lock:
+            stored = self.model.objects.filter(pk=pk).values_list(self.field, flat=True).first() or 0
+            return stored + self.pending(pk)
+
+    def flush(self):
+        """Write all pending increments; returns the number of rows touched"""
+        # One flusher at a time; other threads keep buffering meanwhile
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            with self._lock:
+                deltas = {pk: delta for pk, delta in self._pending.items() if delta}
+                self._pending = defaultdict(int)
+                self._last_flush = time.monotonic()
+                if not deltas:
+                    return 0
+                self._generation += 1
+                self._flushing = True
+
+            by_delta = defaultdict(list)
+            for pk, delta in deltas.items():
+                by_delta[delta].append(pk)
+
+            try:
+                with transaction.atomic():
+                    for delta, pks in by_delta.items():
+                        self.model.objects.filter(pk__in=pks).update(**{self.field: F(self.field) + delta})
+            except Exception as e:
+                logger.error(f"Error flushing {self.model.__name__}.{self.field} counters: {e}")
+                # Put the increments back so the next flush retries them
+                with self._lock:
+                    for pk, delta in deltas.items():
+                        self._pending[pk] += delta
+                    self._flushing = False
+                return 0
+
+            with self._lock:
+                self._flushing = False
+            counters_flushed.send(sender=self.__class__, model=self.model, field=self.field, deltas=deltas)
+            return len(deltas)
+        finally:
+            self._flush_lock.release()
+
+    def _start_timer(self):
+        if self._timer is not None or not self.flush_interval:
+            return
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Thread(
+                target=self._flush_forever, name=f"{self.field}-counter-flush", daemon=True
+            )
+        self._timer.start()
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing {self.model.__name__}.{self.field} counters: {e}")
+            finally:
+                # The thread's own database connection
+                close_old_connections()
+
+
+def visitor_key(request):
+    """Stable identifier of the visitor: user id, else a hash of IP and user agent"""
+    if request.user.is_authenticated:
+        return f"u{request.user.pk}"
+    raw = f"{request.META.get('REMOTE_ADDR', '')}|{request.META.get('HTTP_USER_AGENT', '')}"
+    return "a" + hashlib.blake2b(raw.encode(), digest_size=8).hexdigest()
+
+
+def first_visit(request, namespace, pk):
+    """
+    True the first time this visitor hits ``pk`` within
+    ``settings.VIEW_DEDUPE_SECONDS`` (``cache.add`` is atomic).
+    """
+    timeout = getattr(settings, "VIEW_DEDUPE_SECONDS", 30 * 60)
+    return cache.add(f"{namespace}:{pk}:{visitor_key(request)}", 1, timeout=timeout)
+
+
+# Process-wide buffers for Blog.views and Blog.likes
+blog_view_counter = CounterBuffer(Blog, "views")
+blog_like_counter = CounterBuffer(Blog, "likes")
+atexit.register(blog_view_counter.flush)
+atexit.register(blog_like_counter.flush)
+
+
+def counter_versions():
+    """``(views, likes)`` buffer versions; take them before loading the blog"""
+    return blog_view_counter.version(), blog_like_counter.version()
+
+
+def record_blog_view(request, blog, version):
+    """
+    Count a detail-page view (once per visitor per window); returns the live
+    total including this view. ``version`` is ``counter_versions()[0]``.
+    """
+    if first_visit(request, "blogview", blog.pk):
+        blog_view_counter.increment(blog.pk)
+    return blog_view_counter.live(blog.pk, blog.views, version)
+
+
+def live_likes(blog, version=None):
+    """
+    Stored like count plus this process's unflushed like/unlike deltas
+    (without ``counter_versions()[1]`` the count is re-read)
+    """
+    return blog_like_counter.live(blog.pk, blog.likes, version)
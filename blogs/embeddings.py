@@ -0,0 +1,205 @@
+"""
+Embedding providers used for blog semantic search.
+
+The active provider is configured with the ``EMBEDDING_PROVIDER`` setting::
+
+    EMBEDDING_PROVIDER = {
+        "BACKEND": "blogs.embeddings.MistralEmbeddingProvider",
+        "OPTIONS": {"model": "mistral-embed", "batch_size": 64},
+    }
+
+``HashingEmbeddingProvider`` needs no network and is deterministic, which
+makes it suitable for tests, CI and air-gapped deployments.
+"""
+import hashlib
+import re
+import threading
+from typing import List, Sequence
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from blogs.llm import embeddings_model
+
+DEFAULT_EMBEDDING_PROVIDER = {
+    "BACKEND": "blogs.embeddings.MistralEmbeddingProvider",
+    "OPTIONS": {},
+}
+
+
+# Blog fields that feed blog_embedding_text(); saves touching none of them never re-embed
+EMBEDDED_BLOG_FIELDS = frozenset(
+    ["title", "subtitle", "category", "excerpt", "introduction", "conclusion"]
+)
+
+
+def blog_embedding_text(blog) -> str:
+    """
+    Build the text that represents a blog in the embedding space.
+    Fields used: Title, Subtitle, Category, Excerpt, Introduction, Conclusion
+    """
+    category_name = blog.category.name if blog.category_id and blog.category else ""
+    parts = [
+        blog.title or "",
+        blog.subtitle or "",
+        category_name,
+        blog.excerpt or "",
+        blog.introduction or "",
+        blog.conclusion or "",
+    ]
+    return " ".join([p for p in parts if p]).strip()
+
+
+def embedding_fingerprint(text: str) -> str:
+    """SHA-256 of the embedded text, stored in ``Blog.embedding_hash``"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingProvider:
+    """Base class for embedding backends"""
+
+    #: Identifier stored next to each vector so model changes can be detected
+    model_name = ""
+
+    #: Cosine similarity below which a blog doesn't count as a search match
+    #: (model specific; override with the ``min_similarity`` option)
+    min_similarity = 0.0
+
+    def __init__(self, batch_size: int = 64, min_similarity: float = None, **options):
+        self.batch_size = max(1, int(batch_size))
+        if min_similarity is not None:
+            self.min_similarity = float(min_similarity)
+
+    def embed_documents(self, texts: Sequence[str]) -> List[List[float]]:
+        """Embed many documents, splitting them into ``batch_size`` requests"""
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed_batch(list(texts[start:start + self.batch_size])))
+        return vectors
+
+    def embed_document(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_document(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """embed_query for async views; runs in a worker thread unless overridden"""
+        return await sync_to_async(self.embed_query, thread_sensitive=False)(text)
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+
+class MistralEmbeddingProvider(EmbeddingProvider):
+    """Mistral hosted embeddings (``mistral-embed``, 1024 dims)"""
+
+    # mistral-embed scores even unrelated texts well above zero; tune with
+    # the min_similarity option against real queries
+    min_similarity = 0.75
+
+    def __init__(self, model: str = "mistral-embed", api_key: str = None, **options):
+        super().__init__(**options)
+        self.model_name = model
+        self.api_key = api_key
+
+    @property
+    def client(self):
+        # Shared per process (and per event loop) so keep-alive connections are reused
+        return embeddings_model(self.model_name, self.api_key)
+
+    def _embed_batch(self, texts):
+        return self.client.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.client.embed_query(text)
+
+    async def aembed_query(self, text):
+        # Native async HTTP call: no thread is held while waiting on the API
+        return await self.client.aembed_query(text)
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Local, deterministic embeddings from hashed word and character n-gram features.
+
+    Not semantically as strong as a hosted model, but texts that share words
+    or word fragments end up close together, which is enough for tests,
+    development and offline nodes.
+    """
+
+    token_re = re.compile(r"\w+", re.UNICODE)
+
+    # Texts sharing no word fragments score around zero
+    min_similarity = 0.1
+
+    def __init__(self, dimensions: int = 1024, char_ngram: int = 3, **options):
+        super().__init__(**options)
+        self.dimensions = int(dimensions)
+        self.char_ngram = int(char_ngram)
+        self.model_name = f"hashing-{self.dimensions}-c{self.char_ngram}"
+
+    def _features(self, text):
+        tokens = self.token_re.findall(text.lower())
+        features = list(tokens)
+        features.extend(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        n = self.char_ngram
+        for token in tokens:
+            padded = f"<{token}>"
+            features.extend(f"#{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+        return features
+
+    def _embed_one(self, text):
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        features = self._features(text)
+        if not features:
+            return vector.tolist()
+
+        hashes = np.fromiter(
+            (
+                int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "little")
+                for f in features
+            ),
+            dtype=np.uint64,
+            count=len(features),
+        )
+        buckets = (hashes % np.uint64(self.dimensions)).astype(np.int64)
+        # Top bit picks the sign so collisions tend to cancel out
+        signs = np.where(hashes >> np.uint64(63), -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, buckets, signs)
+
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector.tolist()
+
+    def _embed_batch(self, texts):
+        return [self._embed_one(text) for text in texts]
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_embedding_provider() -> EmbeddingProvider:
+    """Return the process-wide embedding provider configured in settings"""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                config = getattr(settings, "EMBEDDING_PROVIDER", DEFAULT_EMBEDDING_PROVIDER)
+                backend = import_string(config.get("BACKEND", DEFAULT_EMBEDDING_PROVIDER["BACKEND"]))
+                _provider = backend(**config.get("OPTIONS", {}))
+    return _provider
+
+
+@receiver(setting_changed)
+def reset_embedding_provider(setting, **kwargs):
+    """Drop the cached provider when tests override EMBEDDING_PROVIDER"""
+    global _provider
+    if setting == "EMBEDDING_PROVIDER":
+        _provider = None
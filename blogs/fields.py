@@ -0,0 +1,114 @@
+"""
+Custom model fields.
+"""
+import base64
+import struct
+
+import numpy as np
+from django.conf import settings
+from django.db import models
+
+# 4-byte header: magic, dtype code, padding (keeps float32 payloads 4-byte aligned)
+VECTOR_MAGIC = b"V"
+VECTOR_HEADER = struct.Struct("<cBxx")
+VECTOR_DTYPES = {
+    "float32": 1,
+    "float16": 2,
+    "int8": 3,
+}
+VECTOR_DTYPE_CODES = {code: name for name, code in VECTOR_DTYPES.items()}
+
+
+def encode_vector(vector, dtype="float32") -> bytes:
+    """Pack a vector into the VectorField binary format"""
+    if dtype not in VECTOR_DTYPES:
+        raise ValueError(f"Unsupported vector dtype: {dtype}")
+
+    array = np.asarray(vector, dtype=np.float32).ravel()
+    header = VECTOR_HEADER.pack(VECTOR_MAGIC, VECTOR_DTYPES[dtype])
+
+    if dtype == "float32":
+        return header + array.astype("<f4", copy=False).tobytes()
+    if dtype == "float16":
+        return header + array.astype("<f2").tobytes()
+
+    # int8: symmetric linear quantisation with one float32 scale per vector
+    peak = float(np.abs(array).max()) if array.size else 0.0
+    scale = peak / 127.0 if peak else 1.0
+    quantised = np.clip(np.rint(array / scale), -127, 127).astype(np.int8)
+    return header + struct.pack("<f", scale) + quantised.tobytes()
+
+
+def decode_vector(raw) -> np.ndarray:
+    """
+    Unpack VectorField bytes into a float32 array.
+    float32 payloads are returned as a read-only view of the buffer (no copy).
+    """
+    magic, code = VECTOR_HEADER.unpack_from(raw, 0)
+    if magic != VECTOR_MAGIC or code not in VECTOR_DTYPE_CODES:
+        raise ValueError("Not a VectorField value")
+
+    dtype = VECTOR_DTYPE_CODES[code]
+    offset = VECTOR_HEADER.size
+    if dtype == "float32":
+        return np.frombuffer(raw, dtype="<f4", offset=offset)
+    if dtype == "float16":
+        return np.frombuffer(raw, dtype="<f2", offset=offset).astype(np.float32)
+
+    (scale,) = struct.unpack_from("<f", raw, offset)
+    return np.frombuffer(raw, dtype=np.int8, offset=offset + 4).astype(np.float32) * np.float32(scale)
+
+
+class VectorField(models.BinaryField):
+    """
+    Dense vector stored as packed little-endian binary instead of JSON.
+
+    Reads return a 1-D float32 ``numpy.ndarray``; writes accept any sequence
+    of numbers. ``dtype`` selects the on-disk format (``float32``, ``float16``
+    or ``int8``); when omitted ``settings.VECTOR_FIELD_DTYPE`` is used. Every
+    value records its own format, so changing it never needs a migration.
+    """
+
+    description = "Dense numeric vector (packed binary)"
+
+    def __init__(self, *args, dtype=None, **kwargs):
+        if dtype is not None and dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+        self.dtype = dtype
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.dtype is not None:
+            kwargs["dtype"] = self.dtype
+        return name, path, args, kwargs
+
+    @property
+    def storage_dtype(self):
+        return self.dtype or getattr(settings, "VECTOR_FIELD_DTYPE", "float32")
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return decode_vector(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, np.ndarray):
+            return value
+        if isinstance(value, str):
+            return decode_vector(base64.b64decode(value.encode("ascii")))
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return decode_vector(value)
+        return np.asarray(value, dtype=np.float32)
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None or isinstance(value, (bytes, bytearray, memoryview)):
+            return value
+        return encode_vector(value, self.storage_dtype)
+
+    def value_to_string(self, obj):
+        value = self.value_from_object(obj)
+        if value is None:
+            return None
+        return base64.b64encode(encode_vector(value, self.storage_dtype)).decode("ascii")
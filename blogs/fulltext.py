@@ -0,0 +1,201 @@
+"""
+SQLite FTS5 full-text indexes for blogs and notes.
+
+Each index is a separate FTS5 virtual table whose ``rowid`` is the primary key
+of the mirrored row. Rows are written from ``post_save``/``post_delete``
+signals (body text has to be flattened in Python, so triggers can't do it).
+On databases without FTS5 every helper reports ``available == False`` and
+callers fall back to ``icontains`` filters.
+"""
+import logging
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+
+logger = logging.getLogger(__name__)
+
+# Sentinels wrapped around matches by snippet(); swapped for <mark> after escaping
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+# Section keys that hold presentation data rather than searchable text
+NON_TEXT_SECTION_KEYS = {"id", "type", "imageUrl", "videoId", "language"}
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_match_expression(query):
+    """
+    Turn free user input into a safe FTS5 query: every word is quoted (so
+    operators and punctuation can't break the syntax) and the last one is a
+    prefix match to support search-as-you-type.
+    """
+    tokens = TOKEN_RE.findall(query or "")
+    if not tokens:
+        return ""
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def highlight_snippet(snippet):
+    """Escape an FTS snippet and turn the match sentinels into <mark> tags"""
+    if not snippet:
+        return ""
+    html = escape(snippet).replace(HIGHLIGHT_START, "<mark>").replace(HIGHLIGHT_END, "</mark>")
+    return mark_safe(html)
+
+
+def flatten_sections(sections):
+    """Collect the human-readable strings from a Blog.sections JSON structure"""
+    parts = []
+
+    def walk(value, key=None):
+        if key in NON_TEXT_SECTION_KEYS:
+            return
+        if isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, dict):
+            for k, v in value.items():
+                walk(v, k)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                walk(item)
+
+    walk(sections)
+    return " ".join(p for p in parts if p)
+
+
+class FullTextIndex:
+    """An FTS5 table mirroring some text columns of one model"""
+
+    def __init__(self, table, columns, weights, snippet_tokens=16):
+        self.table = table
+        self.columns = list(columns)
+        self.weights = list(weights)
+        self.snippet_tokens = snippet_tokens
+
+    def available(self, using=None):
+        conn = using or connection
+        return conn.vendor == "sqlite"
+
+    # ------------------------------------------------------------------
+    # Schema (used from migrations)
+    # ------------------------------------------------------------------
+    def create(self, schema_editor):
+        if not self.available(schema_editor.connection):
+            return
+        columns = ", ".join(self.columns)
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+            f"{columns}, tokenize = 'porter unicode61 remove_diacritics 2')"
+        )
+
+    def drop(self, schema_editor):
+        if not self.available(schema_editor.connection):
+            return
+        schema_editor.execute(f"DROP TABLE IF EXISTS {self.table}")
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def upsert(self, rowid, values, using=None):
+        conn = using or connection
+        if not self.available(conn):
+            return
+        placeholders = ", ".join(["%s"] * (len(self.columns) + 1))
+        with conn.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [rowid])
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, {', '.join(self.columns)}) VALUES ({placeholders})",
+                [rowid] + [values.get(column) or "" for column in self.columns],
+            )
+
+    def delete(self, rowid, using=None):
+        conn = using or connection
+        if not self.available(conn):
+            return
+        with conn.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [rowid])
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def matching_ids(self, query):
+        """
+        Subquery of matching rowids for ``pk__in=`` filters, or None when the
+        index can't answer (no FTS5, or nothing searchable in ``query``).
+        """
+        expression = fts_match_expression(query)
+        if not expression or not self.available():
+            return None
+        return RawSQL(f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", [expression])
+
+    def search(self, query, limit=20, offset=0, restrict=None, snippet_column=-1):
+        """
+        BM25-ranked matches as ``[(rowid, score, snippet)]``; higher score is better.
+
+        ``restrict`` is an optional ``values('pk')`` queryset limiting which rows
+        may match (e.g. only published blogs). Returns None when the index
+        can't answer the query.
+        """
+        expression = fts_match_expression(query)
+        if not expression or not self.available():
+            return None
+
+        weights = ", ".join(str(float(w)) for w in self.weights)
+        where = f"{self.table} MATCH %s"
+        where_params = [expression]
+        if restrict is not None:
+            restrict_sql, restrict_params = restrict.query.sql_with_params()
+            where += f" AND rowid IN ({restrict_sql})"
+            where_params += list(restrict_params)
+
+        sql = (
+            f"SELECT rowid, bm25({self.table}, {weights}) AS rank, "
+            f"snippet({self.table}, %s, %s, %s, '…', %s) "
+            f"FROM {self.table} WHERE {where} "
+            f"ORDER BY rank LIMIT %s OFFSET %s"
+        )
+        params = [snippet_column, HIGHLIGHT_START, HIGHLIGHT_END, self.snippet_tokens]
+        params += where_params + [limit, offset]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            # bm25() is "lower is better"; flip it so scores read naturally
+            return [(rowid, -rank, snippet) for rowid, rank, snippet in cursor.fetchall()]
+
+
+blog_fts = FullTextIndex(
+    "blogs_blog_fts",
+    columns=["title", "subtitle", "excerpt", "body"],
+    weights=[10.0, 5.0, 3.0, 1.0],
+)
+
+note_fts = FullTextIndex(
+    "notes_note_fts",
+    columns=["title", "tags", "content"],
+    weights=[10.0, 5.0, 1.0],
+)
+
+
+def blog_fts_values(blog):
+    body = " ".join(
+        p for p in [blog.introduction or "", flatten_sections(blog.sections), blog.conclusion or ""] if p
+    )
+    return {
+        "title": blog.title,
+        "subtitle": blog.subtitle,
+        "excerpt": blog.excerpt,
+        "body": body,
+    }
+
+
+def note_fts_values(note):
+    return {
+        "title": note.title,
+        "tags": note.tags,
+        "content": strip_tags(note.content or ""),
+    }
@@ -0,0 +1,155 @@
+"""
+Background embedding jobs.
+
+Blog saves only enqueue an ``EmbeddingJob``; ``manage.py run_embedding_worker``
+claims jobs in batches, embeds them with one provider call per batch and writes
+the vectors back with a queryset ``update()`` so no save signals fire again.
+Afterwards the precomputed related-posts neighbours of the batch are refreshed.
+"""
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from blogs.embeddings import blog_embedding_text, embedding_fingerprint, get_embedding_provider
+from blogs.models import Blog, EmbeddingJob
+from blogs.related import refresh_related_blogs
+
+logger = logging.getLogger(__name__)
+
+
+def embedding_queue_enabled():
+    return getattr(settings, "EMBEDDING_QUEUE_ENABLED", True)
+
+
+def enqueue_blog_embedding(blog_id):
+    """Queue an embedding job for a blog unless one is already waiting"""
+    pending = EmbeddingJob.objects.filter(blog_id=blog_id, status=EmbeddingJob.STATUS_PENDING)
+    if pending.exists():
+        return None
+    return EmbeddingJob.objects.create(blog_id=blog_id)
+
+
+def _claimable(now, lease_seconds):
+    # Pending jobs that are due, plus running jobs whose worker died mid-batch
+    return Q(status=EmbeddingJob.STATUS_PENDING, run_after__lte=now) | Q(
+        status=EmbeddingJob.STATUS_RUNNING, locked_at__lt=now - timedelta(seconds=lease_seconds)
+    )
+
+
+def claim_jobs(batch_size=32, lease_seconds=300):
+    """
+    Atomically claim up to ``batch_size`` due jobs.
+
+    The claim is a conditional UPDATE tagged with a unique token, so two
+    workers racing for the same rows can never both win them.
+    """
+    now = timezone.now()
+    claimable = _claimable(now, lease_seconds)
+    candidate_ids = list(
+        EmbeddingJob.objects.filter(claimable)
+        .order_by('run_after', 'id')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    if not candidate_ids:
+        return []
+
+    token = uuid.uuid4().hex
+    EmbeddingJob.objects.filter(claimable, id__in=candidate_ids).update(
+        status=EmbeddingJob.STATUS_RUNNING,
+        locked_at=now,
+        locked_by=token,
+    )
+    return list(EmbeddingJob.objects.filter(locked_by=token, status=EmbeddingJob.STATUS_RUNNING))
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base * 2^(attempts-1), capped"""
+    base = getattr(settings, "EMBEDDING_JOB_BACKOFF_SECONDS", 30)
+    cap = getattr(settings, "EMBEDDING_JOB_BACKOFF_MAX_SECONDS", 3600)
+    return min(cap, base * (2 ** max(0, attempts - 1)))
+
+
+def fail_jobs(jobs, error):
+    """
+    Record a failed attempt and reschedule (or give up after max attempts).
+    Jobs another worker reclaimed since are theirs now and left alone.
+    """
+    max_attempts = getattr(settings, "EMBEDDING_JOB_MAX_ATTEMPTS", 5)
+    now = timezone.now()
+    message = str(error)[:2000]
+    for job in jobs:
+        attempts = job.attempts + 1
+        gave_up = attempts >= max_attempts
+        updated = EmbeddingJob.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+            attempts=F('attempts') + 1,
+            status=EmbeddingJob.STATUS_FAILED if gave_up else EmbeddingJob.STATUS_PENDING,
+            run_after=now + timedelta(seconds=retry_delay(attempts)),
+            locked_at=None,
+            locked_by="",
+            last_error=message,
+        )
+        if updated and gave_up:
+            logger.error(f"Embedding job {job.pk} for blog {job.blog_id} failed permanently: {message}")
+
+
+def process_jobs(jobs):
+    """
+    Embed the blogs behind a batch of claimed jobs.
+    Returns the number of blogs whose embedding was written.
+    """
+    if not jobs:
+        return 0
+
+    blogs = (
+        Blog.objects.filter(pk__in={job.blog_id for job in jobs})
+        .select_related('category')
+        .only(
+            'id', 'title', 'subtitle', 'excerpt', 'introduction', 'conclusion',
+            'category__name', 'embedding_hash', 'embedding_model',
+        )
+    )
+
+    provider = get_embedding_provider()
+    to_embed = []
+    for blog in blogs:
+        text = blog_embedding_text(blog)
+        if not text:
+            continue
+        digest = embedding_fingerprint(text)
+        # Another job (or reembed run) may already have handled this content
+        if blog.embedding_hash == digest and blog.embedding_model == provider.model_name:
+            continue
+        to_embed.append((blog.pk, text, digest))
+
+    try:
+        vectors = provider.embed_documents([text for _, text, _ in to_embed]) if to_embed else []
+    except Exception as e:
+        logger.warning(f"Embedding batch of {len(to_embed)} blogs failed: {e}")
+        fail_jobs(jobs, e)
+        return 0
+
+    for (blog_id, _, digest), vector in zip(to_embed, vectors):
+        # Targeted update: no pre_save/post_save, so nothing gets re-enqueued
+        Blog.objects.filter(pk=blog_id).update(
+            embedding=vector,
+            embedding_hash=digest,
+            embedding_model=provider.model_name,
+        )
+
+    # Jobs are also queued for publish/unpublish, so refresh every blog in the batch
+    try:
+        refresh_related_blogs({job.blog_id for job in jobs})
+    except Exception as e:
+        logger.error(f"Error refreshing related blogs: {e}")
+
+    # Only the claims still held: a job whose lease expired mid-batch may have
+    # been reclaimed, and its new worker must still see it through
+    held = Q()
+    for job in jobs:
+        held |= Q(pk=job.pk, locked_by=job.locked_by)
+    EmbeddingJob.objects.filter(held).delete()
+    return len(to_embed)
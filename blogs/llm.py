@@ -0,0 +1,215 @@
+"""
+Shared Mistral API clients.
+
+A ``ChatMistralAI`` or ``MistralAIEmbeddings`` builds its own httpx clients,
+so creating one per call paid for client construction and a cold TLS
+handshake on every request. Models are now created lazily, once per
+(model, temperature), on top of keep-alive connection pools:
+
+- the sync ``httpx.Client`` is shared by every thread of the process;
+- an ``httpx.AsyncClient`` is bound to the event loop it first ran on, so
+  each running loop gets its own pool and its own copies of the models.
+  Under ASGI that is one long-lived pool per worker. Under WSGI every async
+  request runs a short-lived loop of its own: whatever starts such a loop
+  (``async_to_sync`` below, ``blogs.api.iterate_in_loop``, the async API
+  views) calls ``aclose_loop_clients()`` before it ends, so its pool is
+  closed instead of leaking its connections.
+
+``LLM_MAX_CONNECTIONS`` caps concurrent outbound requests per pool; further
+requests queue for a free connection for up to ``LLM_POOL_TIMEOUT`` seconds,
+then fail with ``httpx.PoolTimeout``. The pool wait defaults to the read
+timeout so a queued request outlasts one slow generation ahead of it: a
+higher cap serves more generations at once but puts more load on the API's
+rate limits, a lower one queues them, and a shorter pool timeout turns the
+queue into quick errors under load. The other ``LLM_*`` settings set the
+connect/read timeouts, keep-alive and retries.
+"""
+import asyncio
+import os
+import threading
+import weakref
+
+import httpx
+from asgiref.sync import AsyncToSync
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+DEFAULT_BASE_URL = "https://api.mistral.ai/v1"
+
+_lock = threading.RLock()
+# Models and clients usable outside an event loop (sync code, worker threads)
+_sync_scope = {}
+# event loop -> the same for code running on that loop; dropped with the loop
+_loop_scopes = weakref.WeakKeyDictionary()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _timeout():
+    read = float(_setting("LLM_READ_TIMEOUT", 120))
+    return httpx.Timeout(
+        read,
+        connect=float(_setting("LLM_CONNECT_TIMEOUT", 10)),
+        pool=float(_setting("LLM_POOL_TIMEOUT", read)),
+    )
+
+
+def _limits():
+    max_connections = int(_setting("LLM_MAX_CONNECTIONS", 100))
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_connections,
+        keepalive_expiry=float(_setting("LLM_KEEPALIVE_EXPIRY", 60)),
+    )
+
+
+def _client_options(api_key):
+    return {
+        "base_url": os.environ.get("MISTRAL_BASE_URL") or DEFAULT_BASE_URL,
+        "headers": {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "Authorization": f"Bearer {api_key}",
+        },
+        "timeout": _timeout(),
+        "limits": _limits(),
+    }
+
+
+def _scope():
+    """Cache of the running event loop (the process-wide one outside a loop)"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return _sync_scope
+    with _lock:
+        scope = _loop_scopes.get(loop)
+        if scope is None:
+            scope = _loop_scopes[loop] = {}
+        return scope
+
+
+def _get(scope, key, build):
+    with _lock:
+        if key not in scope:
+            scope[key] = build()
+        return scope[key]
+
+
+def http_client(api_key=None) -> httpx.Client:
+    """The process-wide sync connection pool"""
+    api_key = api_key or settings.MISTRAL_API_KEY
+    return _get(_sync_scope, ("http", api_key), lambda: httpx.Client(**_client_options(api_key)))
+
+
+def async_http_client(api_key=None) -> httpx.AsyncClient:
+    """The async connection pool of the running event loop"""
+    return _async_http_client(_scope(), api_key or settings.MISTRAL_API_KEY)
+
+
+def _async_http_client(scope, api_key):
+    return _get(scope, ("async_http", api_key), lambda: httpx.AsyncClient(**_client_options(api_key)))
+
+
+def _bind(key, api_key, build):
+    """
+    ``build(async_client)`` once per process, then a shallow copy per event
+    loop that talks through that loop's pool (copies skip validation, so
+    they are cheap).
+    """
+    base = _get(_sync_scope, key, lambda: build(_async_http_client(_sync_scope, api_key)))
+    scope = _scope()
+    if scope is _sync_scope:
+        return base
+    return _get(scope, key, lambda: base.model_copy(update={"async_client": _async_http_client(scope, api_key)}))
+
+
+def chat_model(model=None, temperature=None):
+    """Shared ``ChatMistralAI`` for (``model``, ``temperature``), defaulting to the settings"""
+    from langchain_mistralai import ChatMistralAI
+
+    model = model or _setting("DEFAULT_MODEL", "mistral-large-latest")
+    temperature = temperature if temperature is not None else _setting("TEMPERATURE", 0.7)
+    api_key = settings.MISTRAL_API_KEY
+    return _bind(
+        ("chat", model, str(temperature)),
+        api_key,
+        lambda async_client: ChatMistralAI(
+            model=model,
+            temperature=temperature,
+            api_key=api_key,
+            max_retries=_setting("LLM_MAX_RETRIES", 2),
+            client=http_client(api_key),
+            async_client=async_client,
+        ),
+    )
+
+
+def structured_chat_model(schema, model=None, temperature=None, **options):
+    """Shared ``chat_model(...).with_structured_output(schema, **options)``"""
+    llm = chat_model(model, temperature)
+    key = ("structured", id(llm), schema, tuple(sorted(options.items())))
+    return _get(_scope(), key, lambda: llm.with_structured_output(schema, **options))
+
+
+def embeddings_model(model="mistral-embed", api_key=None):
+    """Shared ``MistralAIEmbeddings`` for ``model``"""
+    from langchain_mistralai import MistralAIEmbeddings
+
+    api_key = api_key or settings.MISTRAL_API_KEY
+    return _bind(
+        ("embeddings", model, api_key),
+        api_key,
+        lambda async_client: MistralAIEmbeddings(
+            model=model,
+            api_key=api_key,
+            max_retries=_setting("LLM_MAX_RETRIES", 2),
+            client=http_client(api_key),
+            async_client=async_client,
+        ),
+    )
+
+
+async def aclose_loop_clients():
+    """
+    Close the running loop's connection pools and forget its models. Only
+    for loops that end with the call that started them: nothing else on the
+    loop may still be using its clients.
+    """
+    with _lock:
+        scope = _loop_scopes.pop(asyncio.get_running_loop(), None)
+    if not scope:
+        return
+    for key, client in scope.items():
+        if key[0] == "async_http":
+            await client.aclose()
+
+
+def async_to_sync(func):
+    """
+    ``asgiref.sync.async_to_sync`` for sync (WSGI) code calling the clients:
+    each call runs on a new loop whose pools are closed before it returns.
+    """
+    async def call(*args, **kwargs):
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            await aclose_loop_clients()
+
+    return AsyncToSync(call, force_new_loop=True)
+
+
+def reset_clients():
+    """Forget every cached client and model (the next call rebuilds them)"""
+    with _lock:
+        _sync_scope.clear()
+        _loop_scopes.clear()
+
+
+@receiver(setting_changed)
+def reset_clients_on_setting_change(setting, **kwargs):
+    if setting.startswith("LLM_") or setting in ("MISTRAL_API_KEY", "DEFAULT_MODEL", "TEMPERATURE"):
+        reset_clients()
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent requests at a running server and report throughput and latency "
+        "(used to compare the WSGI and ASGI deployments of the AI endpoints)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help="Full URL, e.g. http://127.0.0.1:8000/api/search-blog/")
+        parser.add_argument('--concurrency', type=int, default=50, help="Requests in flight at once")
+        parser.add_argument('--requests', type=int, default=200, help="Total requests to send")
+        parser.add_argument('--method', default='POST')
+        parser.add_argument('--data', default=None, help="JSON request body")
+        parser.add_argument(
+            '--header', action='append', default=[],
+            help="Extra header 'Name: value' (repeatable), e.g. Cookie and X-CSRFToken for logged-in endpoints",
+        )
+        parser.add_argument('--timeout', type=float, default=120.0, help="Per-request timeout in seconds")
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        total = max(1, options['requests'])
+        headers = {}
+        for header in options['header']:
+            name, sep, value = header.partition(':')
+            if not sep:
+                raise CommandError(f"Bad --header {header!r}, expected 'Name: value'")
+            headers[name.strip()] = value.strip()
+        body = None
+        if options['data'] is not None:
+            try:
+                body = json.dumps(json.loads(options['data'])).encode()
+            except ValueError as e:
+                raise CommandError(f"--data is not valid JSON: {e}")
+            headers.setdefault('Content-Type', 'application/json')
+
+        self.stdout.write(f"{options['method']} {options['url']}: {total} request(s), {concurrency} concurrent")
+        latencies, statuses, elapsed = asyncio.run(self.run(
+            options['url'], options['method'], headers, body, concurrency, total, options['timeout']
+        ))
+        self.report(latencies, statuses, elapsed)
+
+    async def run(self, url, method, headers, body, concurrency, total, timeout):
+        latencies, statuses = [], Counter()
+        semaphore = asyncio.Semaphore(concurrency)
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+        async with httpx.AsyncClient(timeout=timeout, limits=limits, headers=headers) as client:
+            async def one():
+                async with semaphore:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.request(method, url, content=body)
+                        # Streaming endpoints: a request ends with its last byte
+                        await response.aread()
+                        statuses[response.status_code] += 1
+                    except httpx.HTTPError as e:
+                        statuses[type(e).__name__] += 1
+                    latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(total)))
+            return latencies, statuses, time.perf_counter() - started
+
+    def report(self, latencies, statuses, elapsed):
+        latencies.sort()
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+        self.stdout.write(f"  wall time:   {elapsed:.2f}s")
+        self.stdout.write(f"  throughput:  {len(latencies) / elapsed:.1f} req/s")
+        self.stdout.write(
+            f"  latency:     mean {statistics.fmean(latencies) * 1000:.0f}ms, "
+            f"p50 {percentile(50) * 1000:.0f}ms, p95 {percentile(95) * 1000:.0f}ms, "
+            f"p99 {percentile(99) * 1000:.0f}ms, max {latencies[-1] * 1000:.0f}ms"
+        )
+        self.stdout.write("  responses:   " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items(), key=str)))
+        failed = sum(count for status, count in statuses.items() if not (isinstance(status, int) and status < 400))
+        style = self.style.SUCCESS if not failed else self.style.WARNING
+        self.stdout.write(style(f"{len(latencies) - failed}/{len(latencies)} succeeded"))
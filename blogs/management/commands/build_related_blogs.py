@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blogs.related import rebuild_related_blogs, stored_neighbours
+
+
+class Command(BaseCommand):
+    help = "Recompute the related-posts neighbour table from all published blog embeddings"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--neighbours', type=int, default=None, help="Neighbours stored per blog")
+        parser.add_argument('--block-size', type=int, default=256, help="Blogs scored per matrix multiply")
+
+    def handle(self, *args, **options):
+        k = options['neighbours'] or stored_neighbours()
+        started = time.monotonic()
+        count = rebuild_related_blogs(k=k, block_size=max(1, options['block_size']))
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {k} neighbours for {count} blog(s) in {time.monotonic() - started:.1f}s"
+        ))
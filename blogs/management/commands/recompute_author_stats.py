@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from blogs.counters import blog_like_counter, blog_view_counter
+from blogs.models import User
+from blogs.stats import recompute_author_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the AuthorStats/AuthorCategory rollups from the blogs table (schedule it to correct drift)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help="Only these authors (default: everyone)")
+
+    def handle(self, *args, **options):
+        # Counters buffered in this process should land before counting
+        blog_view_counter.flush()
+        blog_like_counter.flush()
+
+        author_ids = None
+        if options['usernames']:
+            author_ids = User.objects.filter(username__in=options['usernames']).values_list('pk', flat=True)
+        count = recompute_author_stats(author_ids)
+        self.stdout.write(self.style.SUCCESS(f"Recomputed stats for {count} author(s)"))
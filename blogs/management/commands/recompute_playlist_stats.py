@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from blogs.counters import blog_view_counter
+from blogs.stats import refresh_playlist_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute every playlist's stored blog count and total views from its blogs"
+
+    def handle(self, *args, **options):
+        # Views buffered in this process should land before counting
+        blog_view_counter.flush()
+
+        count = refresh_playlist_stats()
+        self.stdout.write(self.style.SUCCESS(f"Recomputed stats for {count} playlist(s)"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from blogs.counters import blog_view_counter
+from blogs.models import SiteStats
+from blogs.stats import SITE_STATS_PK, recompute_site_stats
+
+FIELDS = ('active_users', 'blogs_published', 'total_views')
+
+
+class Command(BaseCommand):
+    help = "Rebuild the SiteStats rollup from the users and blogs tables (schedule it to correct drift)"
+
+    def handle(self, *args, **options):
+        # Views buffered in this process should land before counting
+        blog_view_counter.flush()
+
+        before = SiteStats.objects.filter(pk=SITE_STATS_PK).first()
+        stats = recompute_site_stats()
+        if before is not None:
+            for field in FIELDS:
+                old, new = getattr(before, field), getattr(stats, field)
+                if old != new:
+                    self.stdout.write(f"  {field}: {old} -> {new}")
+        self.stdout.write(self.style.SUCCESS(f"Site stats: {stats}"))
@@ -0,0 +1,70 @@
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+
+from blogs.models import Blog, BlogLike
+
+
+def like_drift():
+    """{blog_id: (stored likes, BlogLike rows)} for every blog where the two differ"""
+    # One grouped aggregate over the likes table
+    actual = dict(BlogLike.objects.order_by().values_list('blog').annotate(total=Count('id')))
+    drift = {}
+    for pk, likes in Blog.objects.values_list('pk', 'likes').iterator(chunk_size=2000):
+        expected = actual.get(pk, 0)
+        if likes != expected:
+            drift[pk] = (likes, expected)
+    return drift
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Blog.likes from BlogLike rows and fix any drift in the denormalised counter. "
+        "Safe while web workers run: only drift that stays put for a whole settle period is "
+        "corrected, and the correction is relative"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without writing")
+        parser.add_argument(
+            '--settle', type=float, default=None,
+            help="Seconds between the two drift measurements (default: twice COUNTER_FLUSH_INTERVAL)",
+        )
+
+    def handle(self, *args, **options):
+        # Web workers buffer like deltas (blogs.counters) that the BlogLike rows
+        # already include, and flush them within COUNTER_FLUSH_INTERVAL. Drift
+        # still there, unchanged, after longer than that is not a pending delta.
+        settle = options['settle']
+        if settle is None:
+            settle = 2 * getattr(settings, 'COUNTER_FLUSH_INTERVAL', 10)
+
+        first = like_drift()
+        if first and settle > 0:
+            self.stdout.write(f"{len(first)} blog(s) drifted; re-checking in {settle:g}s")
+            time.sleep(settle)
+            second = like_drift()
+        else:
+            second = first
+
+        by_correction = defaultdict(list)
+        for pk, (likes, expected) in second.items():
+            if first.get(pk) != (likes, expected):
+                self.stdout.write(f"  blog {pk}: still changing, skipped")
+                continue
+            by_correction[expected - likes].append(pk)
+            self.stdout.write(f"  blog {pk}: {likes} -> {expected}")
+
+        fixed = sum(len(pks) for pks in by_correction.values())
+        if by_correction and not options['dry_run']:
+            # Relative, like a counter flush: deltas flushed meanwhile are kept
+            with transaction.atomic():
+                for correction, pks in by_correction.items():
+                    Blog.objects.filter(pk__in=pks).update(likes=F('likes') + correction)
+
+        verb = "would be fixed" if options['dry_run'] else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"{fixed} blog(s) {verb}"))
@@ -0,0 +1,166 @@
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from blogs.embeddings import blog_embedding_text, embedding_fingerprint, get_embedding_provider
+from blogs.models import Blog
+from blogs.related import rebuild_related_blogs
+
+EMBEDDING_FIELDS = ['embedding', 'embedding_hash', 'embedding_model']
+
+
+class Command(BaseCommand):
+    help = "Bulk (re)build Blog embeddings with batched, parallel provider calls"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=64, help="Blogs per embedding request")
+        parser.add_argument('--workers', type=int, default=4, help="Concurrent embedding requests")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Rows fetched per DB round-trip")
+        parser.add_argument('--force', action='store_true', help="Re-embed even if the fingerprint is unchanged")
+        parser.add_argument('--published-only', action='store_true', help="Skip drafts")
+        parser.add_argument(
+            '--checkpoint',
+            default=str(Path(settings.BASE_DIR) / '.reembed_checkpoint.json'),
+            help="File used to resume an interrupted run",
+        )
+        parser.add_argument('--reset', action='store_true', help="Ignore any existing checkpoint")
+
+    def handle(self, *args, **options):
+        provider = get_embedding_provider()
+        self.checkpoint_path = Path(options['checkpoint'])
+        batch_size = max(1, options['batch_size'])
+        workers = max(1, options['workers'])
+
+        start_pk = 0 if options['reset'] else self.load_checkpoint(provider.model_name)
+        if start_pk:
+            self.stdout.write(f"Resuming after blog id {start_pk}")
+
+        queryset = (
+            Blog.objects.filter(pk__gt=start_pk)
+            .select_related('category')
+            .only(
+                'id', 'title', 'subtitle', 'excerpt', 'introduction', 'conclusion',
+                'category__name', 'embedding_hash', 'embedding_model',
+            )
+            .order_by('pk')
+        )
+        if options['published_only']:
+            queryset = queryset.filter(isPublished=True)
+
+        total = queryset.count()
+        self.stdout.write(f"Scanning {total} blog(s) with {workers} worker(s), batch size {batch_size}")
+
+        # Batches finish out of order; the checkpoint only advances past a
+        # batch once every earlier batch has been written too.
+        in_flight = {}
+        finished = {}
+        self.next_seq = 0
+        self.scanned = self.embedded = self.skipped = 0
+        self.started = time.monotonic()
+        self.model_name = provider.model_name
+        self.last_pk = None
+
+        seq = 0
+        batch = []
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            for blog in queryset.iterator(chunk_size=options['chunk_size']):
+                self.scanned += 1
+                text = blog_embedding_text(blog)
+                digest = embedding_fingerprint(text) if text else None
+                unchanged = blog.embedding_hash == digest and blog.embedding_model == provider.model_name
+                if not text or (unchanged and not options['force']):
+                    self.skipped += 1
+                    batch.append((blog.pk, None, None))
+                else:
+                    batch.append((blog.pk, text, digest))
+
+                if len(batch) >= batch_size:
+                    in_flight[executor.submit(self.embed_batch, provider, batch)] = (seq, batch)
+                    seq += 1
+                    batch = []
+                    # Bound memory and outstanding requests
+                    while len(in_flight) >= workers * 2:
+                        self.collect(in_flight, finished, FIRST_COMPLETED)
+
+            if batch:
+                in_flight[executor.submit(self.embed_batch, provider, batch)] = (seq, batch)
+
+            while in_flight:
+                self.collect(in_flight, finished, FIRST_COMPLETED)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Interrupted; progress saved to checkpoint"))
+            return
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        self.checkpoint_path.unlink(missing_ok=True)
+        if self.embedded:
+            # bulk_update skipped the signals, so rebuild the neighbour table once
+            self.stdout.write(f"Rebuilding related posts for {rebuild_related_blogs()} blog(s)")
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {self.embedded} embedded, {self.skipped} unchanged, "
+            f"{self.scanned} scanned in {elapsed:.1f}s ({self.embedded / elapsed:.1f} blogs/s)"
+        ))
+
+    def embed_batch(self, provider, batch):
+        """Runs in a worker thread: network only, no database access"""
+        texts = [text for _, text, _ in batch if text]
+        return provider.embed_documents(texts) if texts else []
+
+    def collect(self, in_flight, finished, return_when):
+        done, _ = wait(list(in_flight), return_when=return_when)
+        for future in done:
+            seq, batch = in_flight.pop(future)
+            try:
+                vectors = future.result()
+            except Exception as e:
+                self.save_checkpoint()
+                raise CommandError(f"Embedding batch {seq} failed: {e}. Re-run to resume.")
+            self.write_batch(batch, vectors)
+            finished[seq] = batch[-1][0]
+
+        # Advance the checkpoint over the contiguous prefix of finished batches
+        advanced = False
+        while self.next_seq in finished:
+            self.last_pk = finished.pop(self.next_seq)
+            self.next_seq += 1
+            advanced = True
+        if advanced:
+            self.save_checkpoint()
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            self.stdout.write(
+                f"  {self.scanned} scanned, {self.embedded} embedded "
+                f"({self.embedded / elapsed:.1f} blogs/s), checkpoint at id {self.last_pk}"
+            )
+
+    def write_batch(self, batch, vectors):
+        vectors = iter(vectors)
+        objs = [
+            Blog(pk=pk, embedding=next(vectors), embedding_hash=digest, embedding_model=self.model_name)
+            for pk, text, digest in batch
+            if text
+        ]
+        if objs:
+            # bulk_update bypasses save signals, so no embedding jobs are queued
+            Blog.objects.bulk_update(objs, EMBEDDING_FIELDS, batch_size=100)
+            self.embedded += len(objs)
+
+    def load_checkpoint(self, model_name):
+        try:
+            data = json.loads(self.checkpoint_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return 0
+        if data.get('model') != model_name:
+            return 0
+        return int(data.get('last_pk', 0))
+
+    def save_checkpoint(self):
+        if self.last_pk is None:
+            return
+        self.checkpoint_path.write_text(json.dumps({'last_pk': self.last_pk, 'model': self.model_name}))
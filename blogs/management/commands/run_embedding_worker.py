@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blogs.jobs import claim_jobs, process_jobs
+
+
+class Command(BaseCommand):
+    help = "Process queued blog embedding jobs in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=32, help="Jobs claimed per batch")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument('--lease', type=int, default=300, help="Seconds before a running job is considered abandoned")
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit instead of polling")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.stdout.write(f"Embedding worker started (batch size {batch_size})")
+
+        embedded = 0
+        try:
+            while True:
+                jobs = claim_jobs(batch_size=batch_size, lease_seconds=options['lease'])
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+
+                count = process_jobs(jobs)
+                embedded += count
+                self.stdout.write(f"Processed {len(jobs)} job(s), embedded {count} blog(s)")
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping embedding worker")
+
+        self.stdout.write(self.style.SUCCESS(f"Done. Embedded {embedded} blog(s)"))
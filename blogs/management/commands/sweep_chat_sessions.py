@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blogs.Views.chatapp.sessions import get_session_manager
+
+
+class Command(BaseCommand):
+    help = "Evict idle (CHAT_SESSION_TTL) and least recently used (CHAT_SESSION_MAX) chat sessions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=60.0, help="Seconds between sweeps")
+        parser.add_argument('--once', action='store_true', help="Sweep once and exit instead of looping")
+
+    def handle(self, *args, **options):
+        manager = get_session_manager()
+        try:
+            while True:
+                evicted = manager.sweep()
+                metrics = manager.metrics()
+                self.stdout.write(
+                    f"Evicted {evicted} session(s); resident: {metrics['sessions']} session(s), "
+                    f"{metrics['bytes']} byte(s) [{metrics['backend']}]"
+                )
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping chat session sweeper")
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.9 on 2026-10-16 23:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blogs", "0006_blog_embedding"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blog",
+            name="embedding_hash",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=64
+            ),
+        ),
+        migrations.AddField(
+            model_name="blog",
+            name="embedding_model",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=100
+            ),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Converts Blog.embedding from a JSON list of floats to a packed VectorField.
+
+import blogs.fields
+from django.db import migrations
+
+
+def json_to_binary(apps, schema_editor):
+    Blog = apps.get_model("blogs", "Blog")
+    batch = []
+    rows = Blog.objects.filter(embedding__isnull=False).only("id", "embedding")
+    for blog in rows.iterator(chunk_size=500):
+        if not blog.embedding:
+            continue
+        blog.embedding_vector = blog.embedding
+        batch.append(blog)
+        if len(batch) >= 500:
+            Blog.objects.bulk_update(batch, ["embedding_vector"])
+            batch = []
+    if batch:
+        Blog.objects.bulk_update(batch, ["embedding_vector"])
+
+
+def binary_to_json(apps, schema_editor):
+    Blog = apps.get_model("blogs", "Blog")
+    batch = []
+    rows = Blog.objects.filter(embedding_vector__isnull=False).only(
+        "id", "embedding_vector"
+    )
+    for blog in rows.iterator(chunk_size=500):
+        blog.embedding = [float(x) for x in blog.embedding_vector]
+        batch.append(blog)
+        if len(batch) >= 500:
+            Blog.objects.bulk_update(batch, ["embedding"])
+            batch = []
+    if batch:
+        Blog.objects.bulk_update(batch, ["embedding"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blogs", "0008_embeddingjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blog",
+            name="embedding_vector",
+            field=blogs.fields.VectorField(blank=True, null=True),
+        ),
+        migrations.RunPython(json_to_binary, binary_to_json),
+        migrations.RemoveField(
+            model_name="blog",
+            name="embedding",
+        ),
+        migrations.RenameField(
+            model_name="blog",
+            old_name="embedding_vector",
+            new_name="embedding",
+        ),
+        migrations.AlterField(
+            model_name="blog",
+            name="embedding",
+            field=blogs.fields.VectorField(
+                blank=True, help_text="Mistral embeddings (1024 dim)", null=True
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.9 on 2026-10-16 23:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blogs", "0009_blog_embedding_binary"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="blog",
+            index=models.Index(
+                condition=models.Q(("isPublished", True)),
+                fields=["-publishedDate", "-created_at"],
+                name="blog_published_feed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="blog",
+            index=models.Index(
+                condition=models.Q(("isPublished", True)),
+                fields=["author", "-publishedDate", "-created_at"],
+                name="blog_author_published_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="blog",
+            index=models.Index(
+                condition=models.Q(("isPublished", True)),
+                fields=["category", "-publishedDate", "-created_at"],
+                name="blog_category_published_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="blog",
+            index=models.Index(
+                fields=["author", "-created_at"], name="blog_author_created_idx"
+            ),
+        ),
+    ]
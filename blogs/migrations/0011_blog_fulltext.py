@@ -0,0 +1,32 @@
+# Creates the SQLite FTS5 table mirroring blog text and backfills it.
+
+from django.db import migrations
+
+from blogs.fulltext import blog_fts, blog_fts_values
+
+
+def create_blog_fts(apps, schema_editor):
+    if not blog_fts.available(schema_editor.connection):
+        return
+    blog_fts.create(schema_editor)
+    Blog = apps.get_model("blogs", "Blog")
+    rows = Blog.objects.only(
+        "id", "title", "subtitle", "excerpt", "introduction", "sections", "conclusion"
+    )
+    for blog in rows.iterator(chunk_size=500):
+        blog_fts.upsert(blog.pk, blog_fts_values(blog), using=schema_editor.connection)
+
+
+def drop_blog_fts(apps, schema_editor):
+    blog_fts.drop(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blogs", "0010_blog_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_blog_fts, drop_blog_fts),
+    ]
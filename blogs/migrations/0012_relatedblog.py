@@ -0,0 +1,54 @@
+# Generated by Django 6.0.9 on 2026-10-16 23:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blogs", "0011_blog_fulltext"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RelatedBlog",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField()),
+                ("score", models.FloatField()),
+                (
+                    "blog",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="neighbours",
+                        to="blogs.blog",
+                    ),
+                ),
+                (
+                    "related",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="neighbour_of",
+                        to="blogs.blog",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["blog", "rank"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("blog", "rank"), name="relatedblog_blog_rank_uniq"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.9 on 2026-10-16 23:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blogs", "0012_relatedblog"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SiteStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("active_users", models.PositiveIntegerField(default=0)),
+                ("blogs_published", models.PositiveIntegerField(default=0)),
+                ("total_views", models.BigIntegerField(default=0)),
+                ("recomputed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name_plural": "site stats",
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 6.0.9 on 2026-10-16 23:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blogs", "0013_sitestats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuthorStats",
+            fields=[
+                (
+                    "author",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="author_stats",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("blog_count", models.PositiveIntegerField(default=0)),
+                ("total_views", models.BigIntegerField(default=0)),
+                ("total_likes", models.BigIntegerField(default=0)),
+                ("recomputed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name_plural": "author stats",
+            },
+        ),
+        migrations.CreateModel(
+            name="AuthorCategory",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("blog_count", models.PositiveIntegerField(default=0)),
+                (
+                    "author",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="category_counts",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="author_counts",
+                        to="blogs.category",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("author", "category"),
+                        name="authorcategory_author_category_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
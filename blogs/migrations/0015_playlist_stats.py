@@ -0,0 +1,50 @@
+# Generated by Django 6.0.9 on 2026-10-16 23:41
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_playlist_stats(apps, schema_editor):
+    Playlist = apps.get_model("blogs", "Playlist")
+    Membership = Playlist.blogs.through
+    members = (
+        Membership.objects.filter(playlist=OuterRef("pk")).order_by().values("playlist")
+    )
+    Playlist.objects.update(
+        blog_count=Coalesce(
+            Subquery(members.annotate(total=Count("pk")).values("total")), 0
+        ),
+        total_views=Coalesce(
+            Subquery(members.annotate(total=Sum("blog__views")).values("total")), 0
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blogs", "0014_authorstats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="playlist",
+            name="blog_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="playlist",
+            name="total_views",
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="playlist",
+            index=models.Index(
+                condition=models.Q(("is_public", True)),
+                fields=["-total_views", "-id"],
+                name="playlist_public_views_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_playlist_stats, migrations.RunPython.noop),
+    ]
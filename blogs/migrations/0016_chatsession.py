@@ -0,0 +1,38 @@
+# Generated by Django 6.0.9 on 2026-10-16 23:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blogs", "0015_playlist_stats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChatSession",
+            fields=[
+                (
+                    "session_id",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("data", models.BinaryField()),
+                ("version", models.PositiveIntegerField(default=1)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chat_sessions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+    ]
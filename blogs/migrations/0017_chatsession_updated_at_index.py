@@ -0,0 +1,18 @@
+# Generated by Django 6.0.9 on 2026-10-16 23:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blogs", "0016_chatsession"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="chatsession",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -2,7 +2,10 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from PIL import Image
 from django.utils.text import slugify
+from django.utils import timezone
 import datetime
+from blogs.fields import VectorField
+from blogs.fulltext import blog_fts
 
 class User(AbstractUser):
     """
@@ -92,6 +95,63 @@ class Category(models.Model):
         return self.name
 
 
+class BlogQuerySet(models.QuerySet):
+    # Columns rendered by blog cards (lists, profiles, playlists, search results)
+    CARD_FIELDS = (
+        'id', 'title', 'subtitle', 'slug', 'excerpt', 'thumbnail',
+        'isPublished', 'publishedDate', 'views', 'likes', 'created_at', 'updated_at',
+        'category', 'category__name', 'category__slug',
+        'author', 'author__username', 'author__first_name', 'author__last_name',
+    )
+
+    def published(self):
+        return self.filter(isPublished=True)
+
+    def cards(self):
+        """Slim projection for list cards: skips sections, intro/conclusion and the embedding"""
+        return self.select_related('category', 'author').only(*self.CARD_FIELDS)
+
+    # Most full-text matches ranked for a list (deeper pages come back empty)
+    SEARCH_LIMIT = 500
+
+    def search(self, text):
+        """
+        Full-text filter backed by the FTS5 index: ordered by BM25 relevance,
+        best first, with each row's raw FTS ``search_snippet`` annotated (pass
+        it through ``highlight_snippet`` to render). Falls back to an
+        unranked icontains filter without FTS5.
+        """
+        hits = blog_fts.search(text, limit=self.SEARCH_LIMIT, restrict=self.order_by().values('pk'))
+        if hits is not None:
+            if not hits:
+                return self.none()
+            return self.filter(pk__in=[pk for pk, _, _ in hits]).annotate(
+                search_rank=models.Case(
+                    *[models.When(pk=pk, then=rank) for rank, (pk, _, _) in enumerate(hits)],
+                    output_field=models.IntegerField(),
+                ),
+                search_snippet=models.Case(
+                    *[models.When(pk=pk, then=models.Value(snippet)) for pk, _, snippet in hits],
+                    output_field=models.TextField(),
+                ),
+            ).order_by('search_rank', '-id')
+        return self.filter(
+            models.Q(title__icontains=text) |
+            models.Q(subtitle__icontains=text) |
+            models.Q(excerpt__icontains=text)
+        )
+
+    def with_embedding(self):
+        """Undo the default deferral of the embedding column"""
+        return self.defer(None)
+
+
+class BlogManager(models.Manager.from_queryset(BlogQuerySet)):
+    def get_queryset(self):
+        # The embedding is only read by search/indexing code, never rendered
+        return super().get_queryset().defer('embedding')
+
+
 class Blog(models.Model):
     title = models.CharField(max_length=200)
     subtitle = models.CharField(max_length=300, blank=True, null=True)
@@ -124,22 +184,124 @@ class Blog(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
-    # Store embeddings as vector/list
-    embedding = models.JSONField(blank=True, null=True, help_text="Mistral embeddings (1024 dim)")
+    # Store embeddings as packed binary (float32 by default, see VectorField)
+    embedding = VectorField(blank=True, null=True, help_text="Mistral embeddings (1024 dim)")
+    # Fingerprint of the embedded text and the model that produced the vector,
+    # used to skip re-embedding when nothing relevant changed
+    embedding_hash = models.CharField(max_length=64, blank=True, default="", editable=False)
+    embedding_model = models.CharField(max_length=100, blank=True, default="", editable=False)
+
+    objects = BlogManager()
+
+    # Written only by targeted updates (blogs.signals, blogs.jobs), never
+    # by saving a loaded blog: the vector and its fingerprint go together
+    EMBEDDING_FIELDS = ('embedding', 'embedding_hash', 'embedding_model')
+    # Incremented write-behind with F() deltas (blogs.counters); a save of a
+    # loaded blog would overwrite the flushes since it was loaded
+    COUNTER_FIELDS = ('views', 'likes')
+
+    class Meta:
+        indexes = [
+            # Partial indexes over published rows, ordered like every public feed
+            models.Index(
+                fields=['-publishedDate', '-created_at'],
+                condition=models.Q(isPublished=True),
+                name='blog_published_feed_idx',
+            ),
+            models.Index(
+                fields=['author', '-publishedDate', '-created_at'],
+                condition=models.Q(isPublished=True),
+                name='blog_author_published_idx',
+            ),
+            models.Index(
+                fields=['category', '-publishedDate', '-created_at'],
+                condition=models.Q(isPublished=True),
+                name='blog_category_published_idx',
+            ),
+            # Manage view: all of an author's blogs, newest first
+            models.Index(fields=['author', '-created_at'], name='blog_author_created_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        self._publication_changed = False
         if self.isPublished and not self.publishedDate:
             self.publishedDate = datetime.datetime.now()
+            # Read by post_save receivers that track what is publicly visible
+            self._publication_changed = True
         elif not self.isPublished:
+            if self.publishedDate:
+                self._publication_changed = True
             self.publishedDate = None
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.EMBEDDING_FIELDS
+                and field.name not in self.COUNTER_FIELDS and field.attname not in deferred
+            ]
         super().save(*args, **kwargs)
 
     def __str__(self):
         return self.slug
 
 
+class EmbeddingJob(models.Model):
+    """
+    Durable queue entry asking a worker to (re)embed one blog.
+    Processed by ``manage.py run_embedding_worker``; finished jobs are deleted.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='embedding_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    locked_by = models.CharField(max_length=64, blank=True, default="")
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='embedjob_status_run_idx'),
+        ]
+
+    def __str__(self):
+        return f"Embed blog {self.blog_id} ({self.status})"
+
+
+class RelatedBlog(models.Model):
+    """
+    Precomputed nearest neighbour of a published blog by embedding similarity.
+    Rebuilt by ``manage.py build_related_blogs`` and refreshed incrementally
+    when a vector changes (see blogs.related).
+    """
+    blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='neighbours')
+    related = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='neighbour_of')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['blog', 'rank']
+        constraints = [
+            # Doubles as the index behind the detail page's "related posts" query
+            models.UniqueConstraint(fields=['blog', 'rank'], name='relatedblog_blog_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.blog_id} -> {self.related_id} (#{self.rank})"
+
+
 class BlogLike(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='blog_likes')
     blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='blog_likes')
@@ -160,9 +322,25 @@ class Playlist(models.Model):
     thumbnail = models.ImageField(upload_to='playlist_thumbnails/', blank=True, null=True)
     blogs = models.ManyToManyField(Blog, related_name='playlists', blank=True)
     is_public = models.BooleanField(default=True)
+    # Denormalised from the member blogs for cards and the top-playlists
+    # ranking; maintained by signals (see blogs.stats)
+    blog_count = models.PositiveIntegerField(default=0, editable=False)
+    total_views = models.BigIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    ROLLUP_FIELDS = ('blog_count', 'total_views')
+
+    class Meta:
+        indexes = [
+            # Top public playlists by views, read straight off the index
+            models.Index(
+                fields=['-total_views', '-id'],
+                condition=models.Q(is_public=True),
+                name='playlist_public_views_idx',
+            ),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.slug:
             base_slug = slugify(self.name)
@@ -186,6 +364,14 @@ class Playlist(models.Model):
         else:
              self._process_thumbnail = True
 
+        # The rollups are written by blogs.stats only; a full save of a loaded
+        # playlist must not overwrite them with the values it was loaded with
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.ROLLUP_FIELDS
+            ]
+
         super().save(*args, **kwargs)
 
         # Optimize thumbnail if it exists
@@ -204,3 +390,73 @@ class Playlist(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class SiteStats(models.Model):
+    """
+    Single-row rollup of the home page statistics. Kept current by signal
+    receivers (see blogs.stats) and fully recomputed by
+    ``manage.py recompute_site_stats`` to correct any drift.
+    """
+    active_users = models.PositiveIntegerField(default=0)
+    blogs_published = models.PositiveIntegerField(default=0)
+    total_views = models.BigIntegerField(default=0)
+    recomputed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name_plural = "site stats"
+
+    def __str__(self):
+        return f"{self.active_users} users, {self.blogs_published} blogs, {self.total_views} views"
+
+
+class AuthorStats(models.Model):
+    """
+    Per-author rollup of published blogs for profile pages, maintained like
+    SiteStats (see blogs.stats) and rebuilt by ``manage.py recompute_author_stats``.
+    """
+    author = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='author_stats')
+    blog_count = models.PositiveIntegerField(default=0)
+    total_views = models.BigIntegerField(default=0)
+    total_likes = models.BigIntegerField(default=0)
+    recomputed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name_plural = "author stats"
+
+    def __str__(self):
+        return f"{self.author_id}: {self.blog_count} blogs"
+
+
+class AuthorCategory(models.Model):
+    """Number of published blogs an author has in a category"""
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='category_counts')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='author_counts')
+    blog_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['author', 'category'], name='authorcategory_author_category_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.author_id} / {self.category_id}: {self.blog_count}"
+
+
+class ChatSession(models.Model):
+    """
+    Persisted state of a blog-generation chat (see
+    blogs.Views.chatapp.sessions.DatabaseSessionManager). ``version`` is
+    bumped by every write and checked by the next one, so two workers can't
+    silently overwrite each other's turn.
+    """
+    session_id = models.CharField(max_length=64, primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='chat_sessions')
+    data = models.BinaryField()
+    version = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last activity; indexed for the idle-TTL/LRU sweep
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.session_id} (v{self.version})"
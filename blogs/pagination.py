@@ -0,0 +1,141 @@
+"""
+Keyset (cursor) pagination.
+
+Instead of ``OFFSET n`` (which makes the database walk and discard ``n``
+rows) the next page starts right after the last row of the previous one:
+``WHERE key < last_key ORDER BY key DESC LIMIT per_page``. With an index
+on the ordering columns every page, however deep, costs the same as page 1.
+
+The cursor is an opaque URL-safe token holding the last row's key values.
+Ordering columns must be non-null and the last one must be unique (``id``).
+
+Keyset pages can't jump to page N, so there is no exact page count. When a
+``count_timeout`` is given the paginator exposes an approximate total: one
+COUNT per distinct query, cached for that many seconds.
+"""
+import base64
+import hashlib
+import json
+import math
+from dataclasses import dataclass
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class KeysetPage:
+    """Quacks like django.core.paginator.Page for the parts templates use"""
+    object_list: list
+    next_cursor: str = None
+    number: int = 1
+    paginator: "KeysetPaginator" = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.number > 1
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginate ``queryset`` by ``ordering``, e.g. ``('-created_at', '-id')``.
+    """
+
+    def __init__(self, queryset, ordering, per_page, count_timeout=None):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.count_timeout = count_timeout
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.model_fields = [queryset.model._meta.get_field(name) for name in self.fields]
+
+    @property
+    def count(self):
+        """Approximate number of rows (cached), or None without ``count_timeout``"""
+        if self.count_timeout is None:
+            return None
+        if not hasattr(self, '_count'):
+            sql, params = self.queryset.order_by().query.sql_with_params()
+            digest = hashlib.md5(f"{sql}|{params!r}".encode()).hexdigest()
+            self._count = cache.get_or_set(
+                f"keyset-count:{digest}", self.queryset.order_by().count, self.count_timeout
+            )
+        return self._count
+
+    @property
+    def num_pages(self):
+        count = self.count
+        if count is None:
+            return None
+        return max(1, math.ceil(count / self.per_page))
+
+    # ------------------------------------------------------------------
+    # Cursor encoding
+    # ------------------------------------------------------------------
+    def encode_cursor(self, obj, number):
+        values = [field.value_to_string(obj) for field in self.model_fields]
+        raw = json.dumps({'k': values, 'p': number}, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            values = [
+                field.to_python(value) for field, value in zip(self.model_fields, data['k'], strict=True)
+            ]
+            return values, int(data.get('p', 1))
+        except (ValueError, TypeError, KeyError, ValidationError) as e:
+            raise InvalidCursor(f"Invalid cursor: {e}")
+
+    # ------------------------------------------------------------------
+    # Filtering
+    # ------------------------------------------------------------------
+    def after(self, values):
+        """
+        Rows strictly after ``values`` in the ordering, written as
+        ``a <= x AND (a < x OR (b <= y AND (b < y OR ...)))`` so the
+        leading column bounds an index range scan.
+        """
+        condition = None
+        for name, value in reversed(list(zip(self.ordering, values))):
+            column = name.lstrip('-')
+            strict, inclusive = ('lt', 'lte') if name.startswith('-') else ('gt', 'gte')
+            beyond = Q(**{f'{column}__{strict}': value})
+            if condition is None:
+                condition = beyond
+            else:
+                condition = Q(**{f'{column}__{inclusive}': value}) & (beyond | condition)
+        return condition
+
+    def page(self, cursor=None):
+        queryset = self.queryset.order_by(*self.ordering)
+        number = 1
+        if cursor:
+            values, previous = self.decode_cursor(cursor)
+            queryset = queryset.filter(self.after(values))
+            number = previous + 1
+
+        # One extra row tells us whether there is a next page, without a COUNT
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        next_cursor = self.encode_cursor(rows[-1], number) if has_next else None
+        return KeysetPage(rows, next_cursor, number, self)
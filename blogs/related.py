@@ -0,0 +1,142 @@
+"""
+Precomputed "related posts" from blog embeddings.
+
+``rebuild_related_blogs`` computes every published blog's nearest neighbours
+with a blocked matrix multiply over the normalised embedding matrix, so
+memory stays at ``block_size x N`` scores no matter how big the catalogue is.
+``refresh_related_blogs`` is the incremental path used when a few vectors
+change: it only recomputes the rows whose neighbour lists can be affected,
+scoring against the in-process ``BlogVectorIndex`` instead of reloading
+every embedding.
+"""
+import logging
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from blogs.models import Blog, RelatedBlog
+from blogs.vector_index import blog_vector_index, load_published_vectors
+
+logger = logging.getLogger(__name__)
+
+
+def stored_neighbours():
+    """Neighbours kept per blog; more than the page shows so drafts can drop out"""
+    return getattr(settings, "RELATED_BLOGS_STORED", 10)
+
+
+def top_neighbours(rows, ids, matrix, k):
+    """
+    Yield ``(blog_id, [(related_id, score), ...])`` for the given matrix rows,
+    best match first, excluding the blog itself.
+    """
+    if not len(rows) or k <= 0:
+        return
+    scores = matrix[rows] @ matrix.T
+    # A blog is never related to itself
+    scores[np.arange(len(rows)), rows] = -np.inf
+
+    k = min(k, matrix.shape[0] - 1)
+    if k <= 0:
+        for row in rows:
+            yield int(ids[row]), []
+        return
+
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+    for i, row in enumerate(rows):
+        yield int(ids[row]), [(int(ids[j]), float(s)) for j, s in zip(top[i], top_scores[i])]
+
+
+def _neighbour_rows(neighbours):
+    return [
+        RelatedBlog(blog_id=blog_id, related_id=related_id, rank=rank, score=score)
+        for blog_id, related in neighbours
+        for rank, (related_id, score) in enumerate(related, start=1)
+    ]
+
+
+def rebuild_related_blogs(k=None, block_size=256):
+    """Recompute the whole neighbour table; returns the number of blogs covered"""
+    k = k or stored_neighbours()
+    ids, matrix = load_published_vectors()
+
+    rows = []
+    for start in range(0, len(ids), block_size):
+        block = np.arange(start, min(start + block_size, len(ids)))
+        rows.extend(_neighbour_rows(top_neighbours(block, ids, matrix, k)))
+
+    with transaction.atomic():
+        RelatedBlog.objects.all().delete()
+        RelatedBlog.objects.bulk_create(rows, batch_size=500)
+
+    logger.info(f"Related blogs rebuilt for {len(ids)} blogs ({len(rows)} rows)")
+    return len(ids)
+
+
+def _current_vectors(changed):
+    """
+    The in-process vector index with the ``changed`` blogs re-read from the
+    database: the embedding worker writes vectors with ``update()``, which
+    never reaches the index through signals. Only those rows are decoded;
+    the rest of the index is loaded at most once per TTL.
+    """
+    stored = (
+        Blog.objects.filter(pk__in=changed)
+        .values_list('pk', 'isPublished', 'embedding')
+    )
+    missing = set(changed)
+    for blog_id, published, embedding in stored:
+        missing.discard(blog_id)
+        if published and embedding is not None:
+            blog_vector_index.upsert(blog_id, embedding)
+        else:
+            blog_vector_index.remove(blog_id)
+    for blog_id in missing:
+        blog_vector_index.remove(blog_id)
+    return blog_vector_index.snapshot()
+
+
+def refresh_related_blogs(blog_ids, k=None):
+    """
+    Incrementally update the table after the vectors of ``blog_ids`` changed
+    (or they were published). Recomputed rows are the changed blogs, every
+    blog that listed one of them, and every blog whose weakest stored
+    neighbour is now beaten by one of them.
+    """
+    k = k or stored_neighbours()
+    changed = set(blog_ids)
+    if not changed:
+        return 0
+
+    ids, matrix, positions = _current_vectors(changed)
+    changed_rows = [positions[pk] for pk in changed if pk in positions]
+
+    affected = set(changed)
+    affected.update(
+        RelatedBlog.objects.filter(related_id__in=changed).values_list('blog_id', flat=True)
+    )
+
+    if changed_rows:
+        # Best similarity of every blog to any changed blog
+        similarity = (matrix @ matrix[changed_rows].T).max(axis=1)
+        thresholds = np.full(len(ids), -np.inf, dtype=np.float32)
+        for blog_id, score in RelatedBlog.objects.filter(rank=k).values_list('blog_id', 'score'):
+            if blog_id in positions:
+                thresholds[positions[blog_id]] = score
+        affected.update(int(ids[row]) for row in np.flatnonzero(similarity > thresholds))
+
+    rows = np.asarray(sorted(positions[pk] for pk in affected if pk in positions), dtype=np.int64)
+    neighbours = list(top_neighbours(rows, ids, matrix, k))
+
+    with transaction.atomic():
+        # Unpublished/vector-less blogs in ``affected`` just lose their rows
+        RelatedBlog.objects.filter(blog_id__in=affected).delete()
+        RelatedBlog.objects.bulk_create(_neighbour_rows(neighbours), batch_size=500)
+
+    return len(neighbours)
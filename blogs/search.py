@@ -0,0 +1,105 @@
+"""
+Hybrid blog search: BM25 keyword matches fused with embedding similarity.
+
+Each phase produces an ordered list of blog ids and reciprocal-rank fusion
+(RRF) merges them, so BM25 scores never have to be calibrated against
+cosine similarities.
+"""
+import logging
+
+from asgiref.sync import sync_to_async
+
+from blogs.embeddings import get_embedding_provider
+from blogs.fulltext import blog_fts, highlight_snippet
+from blogs.models import Blog
+from blogs.vector_index import blog_vector_index
+
+logger = logging.getLogger(__name__)
+
+# Standard RRF damping constant; larger values flatten the head of each list
+RRF_K = 60
+
+# Each phase ranks at least this many candidates so fusion has overlap to work with
+MIN_CANDIDATES = 50
+
+
+def reciprocal_rank_fusion(*rankings, k=RRF_K):
+    """
+    Fuse ordered id lists into ``[(id, score)]`` with
+    ``score(id) = sum(1 / (k + rank))`` over every list containing it.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, pk in enumerate(ranking, start=1):
+            scores[pk] = scores.get(pk, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class BlogSearch:
+    """One search request over the published blogs, optionally in one category"""
+
+    def __init__(self, query, limit=5, offset=0, category=None):
+        self.query = query
+        self.limit = limit
+        self.offset = offset
+        self.category = category
+        self.queryset = Blog.objects.published()
+        if category:
+            self.queryset = self.queryset.filter(category__slug=category)
+        self.window = max(MIN_CANDIDATES, 2 * (offset + limit))
+        self.snippets = {}
+
+    def keyword_ranking(self):
+        """Blog ids ordered by BM25 over the full-text index"""
+        hits = blog_fts.search(self.query, limit=self.window, restrict=self.queryset.values('pk'))
+        if hits is None:
+            # No FTS5 available: unranked substring matches, newest first
+            matches = self.queryset.search(self.query).order_by('-publishedDate', '-created_at')
+            return list(matches.values_list('pk', flat=True)[:self.window])
+
+        self.snippets = {pk: highlight_snippet(snippet) for pk, _, snippet in hits}
+        return [pk for pk, _, _ in hits]
+
+    def vector_ranking(self):
+        """Blog ids ordered by cosine similarity to the embedded query"""
+        try:
+            query_vector = get_embedding_provider().embed_query(self.query)
+        except Exception as e:
+            logger.error(f"Error embedding search query: {e}")
+            return []
+        return self.vector_matches(query_vector)
+
+    async def akeyword_ranking(self):
+        return await sync_to_async(self.keyword_ranking)()
+
+    async def avector_ranking(self):
+        """vector_ranking for async views: the query is embedded without holding a thread"""
+        try:
+            query_vector = await get_embedding_provider().aembed_query(self.query)
+        except Exception as e:
+            logger.error(f"Error embedding search query: {e}")
+            return []
+        return await sync_to_async(self.vector_matches)(query_vector)
+
+    def vector_matches(self, query_vector):
+        """Blog ids nearest to ``query_vector`` (within the category, if any)"""
+        allowed_ids = None
+        if self.category:
+            allowed_ids = self.queryset.values_list('pk', flat=True)
+        matches = blog_vector_index.search(query_vector, k=self.window, allowed_ids=allowed_ids)
+        # Nearest neighbours always exist; only similar enough ones are matches
+        min_similarity = get_embedding_provider().min_similarity
+        return [pk for pk, score in matches if score >= min_similarity]
+
+    def page(self, ranking):
+        """
+        Slice ``[(id, score)]`` to the requested page and load the cards,
+        returning ``(blogs, scores, has_more)``. One match past the page is
+        loaded too: ``has_more`` means a visible match follows this page.
+        """
+        window = ranking[self.offset:self.offset + self.limit + 1]
+        scores = dict(window)
+        # The vector index may lag behind other processes, so re-check visibility
+        blogs = self.queryset.filter(pk__in=scores.keys()).cards()
+        blogs = sorted(blogs, key=lambda b: -scores[b.pk])
+        return blogs[:self.limit], scores, len(blogs) > self.limit
@@ -1,9 +1,30 @@
-from django.db.models.signals import pre_save
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
-from blogs.models import Blog
-from django.conf import settings
-from langchain_mistralai import MistralAIEmbeddings
+from blogs.models import Blog, Category, FAQ, Playlist, RelatedBlog, Testimonial, User
+from blogs.caching import bump, card_namespace
+from blogs.counters import counters_flushed
+from blogs.stats import (
+    AUTHOR_STATS_FIELDS,
+    add_author_counts,
+    add_playlist_views,
+    adjust_author_stats,
+    adjust_site_stats,
+    blog_contribution,
+    refresh_playlist_stats,
+    stored_contribution,
+)
+from blogs.vector_index import blog_vector_index
+from blogs.fulltext import blog_fts, blog_fts_values
+from blogs.jobs import embedding_queue_enabled, enqueue_blog_embedding
+from blogs.related import refresh_related_blogs
+from blogs.embeddings import (
+    EMBEDDED_BLOG_FIELDS,
+    blog_embedding_text,
+    embedding_fingerprint,
+    get_embedding_provider,
+)
 import logging
+from collections import defaultdict
 
 logger = logging.getLogger(__name__)
 
@@ -12,50 +33,313 @@ def create_blog_embedding(sender, instance, **kwargs):
     """
     Generate embeddings for Blog before saving.
     Fields used: Title, Subtitle, Category, Excerpt, Introduction, Conclusion
+
+    With EMBEDDING_QUEUE_ENABLED the blog is only flagged here and an
+    EmbeddingJob is queued after the save (see enqueue_embedding_job);
+    otherwise the vector is computed here and written by write_blog_embedding.
     """
     # Check if essential fields are present
     if not instance.title:
         return
 
-    # Check if embedding already exists and content hasn't changed significantly? 
-    # For now, we regenerate if any of the key fields changed. 
-    # But pre_save doesn't easily give old instance unless we fetch it.
-    
-    # In a production app, we should check specifically if fields changed to save API calls.
-    # Here, for simplicity/correctness according to user request, we generate it.
-    
+    # Saves limited to counters/flags (views, likes, isPublished, ...) can't change the text
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not EMBEDDED_BLOG_FIELDS.intersection(update_fields):
+        return
+
     try:
-        # Construct text for embedding
-        # "Title Subtitle Category Excerpt Introduction Conclusion"
-        category_name = instance.category.name if instance.category else ""
+        text_to_embed = blog_embedding_text(instance)
         
-        parts = [
-            instance.title or "",
-            instance.subtitle or "",
-            category_name,
-            instance.excerpt or "",
-            instance.introduction or "",
-            instance.conclusion or ""
-        ]
-        
-        text_to_embed = " ".join([p for p in parts if p])
-        
-        if not text_to_embed.strip():
+        if not text_to_embed:
             return
 
-        # Initialize Embeddings model
-        embeddings = MistralAIEmbeddings(
-            api_key=settings.MISTRAL_API_KEY,
-            model="mistral-embed" 
-        )
-        
-        # Generate embedding
-        # MistralAIEmbeddings.embed_query returns List[float]
-        vector = embeddings.embed_query(text_to_embed)
+        # Provider is configured in settings.EMBEDDING_PROVIDER and shared per process
+        provider = get_embedding_provider()
+
+        # Only re-embed when the embedded text or the embedding model changed.
+        # Compare with the stored fingerprint: the instance's may predate a
+        # write by the worker or by another request
+        stored = (instance.embedding_hash, instance.embedding_model)
+        if not instance._state.adding:
+            stored = (
+                Blog.objects.filter(pk=instance.pk).values_list('embedding_hash', 'embedding_model').first()
+                or stored
+            )
+        digest = embedding_fingerprint(text_to_embed)
+        if stored == (digest, provider.model_name):
+            return
+
+        # Default: hand the work to the background worker and keep the request fast
+        if embedding_queue_enabled():
+            instance._embedding_stale = True
+            return
         
-        # Save to instance
-        instance.embedding = vector
+        # Synchronous mode: stored after the save (see write_blog_embedding)
+        instance._new_embedding = (provider.embed_document(text_to_embed), digest, provider.model_name)
         
     except Exception as e:
         logger.error(f"Error generating embedding for blog {instance.title}: {e}")
         # Don't stop the save if embedding fails, but log it
+
+
+@receiver(post_save, sender=Blog)
+def write_blog_embedding(sender, instance, **kwargs):
+    """
+    Store the vector computed by create_blog_embedding with a targeted update,
+    like the embedding worker: the embedding column is deferred by default,
+    so the instance save itself would leave it out.
+    """
+    new_embedding = instance.__dict__.pop('_new_embedding', None)
+    if new_embedding is None:
+        return
+    Blog.objects.filter(pk=instance.pk).update(
+        embedding=new_embedding[0],
+        embedding_hash=new_embedding[1],
+        embedding_model=new_embedding[2],
+    )
+    # The receivers below read the new vector off the instance
+    instance.embedding, instance.embedding_hash, instance.embedding_model = new_embedding
+    instance._embedding_changed = True
+
+
+@receiver(post_save, sender=Blog)
+def enqueue_embedding_job(sender, instance, **kwargs):
+    """Queue the embedding flagged by create_blog_embedding (needs the pk, hence post_save)"""
+    if getattr(instance, '_embedding_stale', False):
+        instance._embedding_stale = False
+        enqueue_blog_embedding(instance.pk)
+
+
+@receiver(post_save, sender=Blog)
+def update_blog_vector_index(sender, instance, **kwargs):
+    """Keep the in-process vector index in sync with published blogs"""
+    if not instance.isPublished:
+        blog_vector_index.remove(instance.pk)
+        return
+
+    # The embedding is deferred by default; if it wasn't loaded it wasn't changed
+    # either, so only fetch it when the index is missing this blog
+    if 'embedding' in instance.get_deferred_fields() and not blog_vector_index.needs_vector(instance.pk):
+        return
+
+    if instance.embedding is not None:
+        blog_vector_index.upsert(instance.pk, instance.embedding)
+    else:
+        blog_vector_index.remove(instance.pk)
+
+
+@receiver(post_delete, sender=Blog)
+def remove_blog_from_vector_index(sender, instance, **kwargs):
+    blog_vector_index.remove(instance.pk)
+
+
+@receiver(post_save, sender=Blog)
+def refresh_related_posts(sender, instance, **kwargs):
+    """
+    Refresh the precomputed neighbours when a vector or the publication state
+    changed. In queue mode the embedding worker does it after its write.
+    """
+    embedding_changed = getattr(instance, '_embedding_changed', False)
+    publication_changed = getattr(instance, '_publication_changed', False)
+    if not (embedding_changed or publication_changed):
+        return
+    # _publication_changed is reset by Blog.save itself
+    instance._embedding_changed = False
+
+    if embedding_queue_enabled():
+        enqueue_blog_embedding(instance.pk)
+        return
+    try:
+        refresh_related_blogs([instance.pk])
+    except Exception as e:
+        logger.error(f"Error refreshing related blogs for blog {instance.pk}: {e}")
+
+
+@receiver(pre_delete, sender=Blog)
+def remember_blog_neighbour_of(sender, instance, **kwargs):
+    # Their RelatedBlog rows pointing here are cascade-deleted with the blog
+    instance._neighbour_of = list(RelatedBlog.objects.filter(related=instance).values_list('blog_id', flat=True))
+
+
+@receiver(post_delete, sender=Blog)
+def refresh_neighbours_of_deleted_blog(sender, instance, **kwargs):
+    """Give the blogs that listed the deleted one a full neighbour list again"""
+    blog_ids = instance.__dict__.pop('_neighbour_of', None)
+    if not blog_ids:
+        return
+    if embedding_queue_enabled():
+        # Their text is unchanged, so the worker only refreshes their neighbours
+        for blog_id in blog_ids:
+            enqueue_blog_embedding(blog_id)
+        return
+    try:
+        refresh_related_blogs(blog_ids)
+    except Exception as e:
+        logger.error(f"Error refreshing related blogs after deleting blog {instance.pk}: {e}")
+
+
+# Blog columns mirrored into the FTS5 index (see blogs.fulltext)
+SEARCHABLE_BLOG_FIELDS = frozenset(['title', 'subtitle', 'excerpt', 'introduction', 'sections', 'conclusion'])
+
+
+@receiver(post_save, sender=Blog)
+def update_blog_fulltext(sender, instance, update_fields=None, **kwargs):
+    """Mirror the searchable text of a blog into the full-text index"""
+    if update_fields is not None and not SEARCHABLE_BLOG_FIELDS.intersection(update_fields):
+        return
+    try:
+        blog_fts.upsert(instance.pk, blog_fts_values(instance))
+    except Exception as e:
+        logger.error(f"Error updating full-text index for blog {instance.pk}: {e}")
+
+
+@receiver(post_delete, sender=Blog)
+def remove_blog_from_fulltext(sender, instance, **kwargs):
+    try:
+        blog_fts.delete(instance.pk)
+    except Exception as e:
+        logger.error(f"Error removing blog {instance.pk} from full-text index: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Fragment cache invalidation (see blogs.caching)
+# ---------------------------------------------------------------------------
+@receiver(post_save, sender=Blog)
+@receiver(post_delete, sender=Blog)
+def invalidate_blog_fragments(sender, instance, **kwargs):
+    bump('blogs', card_namespace(instance.pk))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_fragments(sender, instance, **kwargs):
+    bump('categories')
+
+
+@receiver(post_save, sender=FAQ)
+@receiver(post_delete, sender=FAQ)
+def invalidate_faq_fragments(sender, instance, **kwargs):
+    bump('faqs')
+
+
+@receiver(post_save, sender=Testimonial)
+@receiver(post_delete, sender=Testimonial)
+def invalidate_testimonial_fragments(sender, instance, **kwargs):
+    bump('testimonials')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_fragments(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which no fragment renders
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    bump('users')
+
+
+# ---------------------------------------------------------------------------
+# Site, author and playlist statistics rollups (see blogs.stats)
+# ---------------------------------------------------------------------------
+@receiver(post_save, sender=User)
+def count_new_user(sender, instance, created, **kwargs):
+    if created:
+        adjust_site_stats(active_users=1)
+
+
+@receiver(post_delete, sender=User)
+def uncount_deleted_user(sender, instance, **kwargs):
+    adjust_site_stats(active_users=-1)
+
+
+@receiver(pre_save, sender=Blog)
+def remember_blog_contribution(sender, instance, update_fields=None, **kwargs):
+    """Stash what the stored row adds to the rollups, for update_blog_stats to diff"""
+    if update_fields is not None and not AUTHOR_STATS_FIELDS.intersection(update_fields):
+        return
+    instance._stored_contribution = None if instance._state.adding else stored_contribution(instance.pk)
+
+
+@receiver(post_save, sender=Blog)
+def update_blog_stats(sender, instance, update_fields=None, **kwargs):
+    """Swap the blog's old contribution to the site/author rollups for its new one"""
+    if not hasattr(instance, '_stored_contribution'):
+        return
+    old = instance.__dict__.pop('_stored_contribution')
+    new = blog_contribution(instance)
+    # Counters the save left out (see Blog.save) keep their stored values
+    unsaved = [field for field in Blog.COUNTER_FIELDS if update_fields is not None and field not in update_fields]
+    if new is not None and unsaved:
+        if old is not None:
+            stored = old._asdict()
+        else:
+            stored = Blog.objects.filter(pk=instance.pk).values(*unsaved).get()
+        new = new._replace(**{field: stored[field] for field in unsaved})
+    if old == new:
+        return
+    adjust_site_stats(
+        blogs_published=(new is not None) - (old is not None),
+        total_views=(new.views if new else 0) - (old.views if old else 0),
+    )
+    adjust_author_stats(old, -1)
+    adjust_author_stats(new, 1)
+
+
+@receiver(pre_delete, sender=Blog)
+def remember_deleted_blog_contribution(sender, instance, **kwargs):
+    # The instance may predate flushed views/likes; take the stored row
+    instance._stored_contribution = stored_contribution(instance.pk)
+
+
+@receiver(post_delete, sender=Blog)
+def uncount_deleted_blog(sender, instance, **kwargs):
+    old = instance.__dict__.pop('_stored_contribution', None)
+    if old is not None:
+        adjust_site_stats(blogs_published=-1, total_views=-old.views)
+        adjust_author_stats(old, -1)
+
+
+@receiver(counters_flushed)
+def add_flushed_counts(sender, model, field, deltas, **kwargs):
+    """Fold flushed view/like increments of published blogs into the rollups"""
+    if model is not Blog or field not in ('views', 'likes'):
+        return
+    published = Blog.objects.published().filter(pk__in=list(deltas)).values_list('pk', 'author_id')
+    by_author = defaultdict(int)
+    for pk, author_id in published:
+        by_author[author_id] += deltas[pk]
+    if field == 'views':
+        adjust_site_stats(total_views=sum(by_author.values()))
+        # Playlists rank by the views of all their blogs
+        add_playlist_views(deltas)
+    add_author_counts(field, by_author)
+
+
+@receiver(m2m_changed, sender=Playlist.blogs.through)
+def refresh_playlist_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    """Recount the playlists whose blogs changed (from either side of the relation)"""
+    if action == 'pre_clear' and reverse:
+        # blog.playlists.clear(): the rows are gone by post_clear
+        instance._cleared_playlists = list(instance.playlists.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        playlist_ids = [instance.pk]
+    elif action == 'post_clear':
+        playlist_ids = instance.__dict__.pop('_cleared_playlists', [])
+    else:
+        playlist_ids = pk_set
+    refresh_playlist_stats(playlist_ids)
+
+
+@receiver(pre_delete, sender=Blog)
+def remember_blog_playlists(sender, instance, **kwargs):
+    # Memberships are cascade-deleted without m2m_changed
+    instance._member_of = list(instance.playlists.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Blog)
+def refresh_playlists_of_deleted_blog(sender, instance, **kwargs):
+    playlist_ids = instance.__dict__.pop('_member_of', None)
+    if playlist_ids:
+        refresh_playlist_stats(playlist_ids)
@@ -0,0 +1,258 @@
+"""
+Site statistics rollup.
+
+The home page used to count users, count published blogs and sum their
+views on every render. Those totals now live in the single ``SiteStats``
+row: signal receivers apply small ``F()`` deltas when users or blogs are
+created, deleted, (un)published or when buffered views are flushed, and
+``recompute_site_stats`` rebuilds the row from scratch (run it periodically,
+e.g. from cron, to absorb writes that bypass signals such as
+``QuerySet.update``).
+
+Profile pages get the same treatment per author: ``AuthorStats`` holds the
+published blog count, views and likes, and ``AuthorCategory`` the number of
+published blogs per category. Blog saves are diffed against the stored row
+(``blog_contribution``) so publishing, unpublishing, moving a blog to another
+category or author and deleting it all reduce to "remove the old
+contribution, add the new one".
+
+Playlists store their blog count and summed views: membership changes
+recount the affected playlists, flushed views are added in place, and
+``top_playlists`` reads the ranking off a partial index.
+"""
+import logging
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from blogs.models import AuthorCategory, AuthorStats, Blog, Category, Playlist, SiteStats, User
+
+logger = logging.getLogger(__name__)
+
+SITE_STATS_PK = 1
+
+
+def compute_site_stats():
+    """Exact totals straight from the source tables"""
+    published = Blog.objects.published().order_by().aggregate(count=Count('id'), views=Sum('views'))
+    return {
+        'active_users': User.objects.count(),
+        'blogs_published': published['count'],
+        'total_views': published['views'] or 0,
+    }
+
+
+def recompute_site_stats():
+    """Overwrite the rollup with exact totals; returns the row"""
+    stats, _ = SiteStats.objects.update_or_create(
+        pk=SITE_STATS_PK,
+        defaults={**compute_site_stats(), 'recomputed_at': timezone.now()},
+    )
+    return stats
+
+
+def site_stats():
+    """The rollup row (a primary-key read); built on first use"""
+    stats = SiteStats.objects.filter(pk=SITE_STATS_PK).first()
+    if stats is None:
+        stats = recompute_site_stats()
+    return stats
+
+
+def _add(queryset, label, **deltas):
+    deltas = {field: amount for field, amount in deltas.items() if amount}
+    if not deltas:
+        return 0
+    try:
+        # Savepoint: a failed UPDATE must not break the caller's transaction
+        with transaction.atomic():
+            return queryset.update(**{field: F(field) + amount for field, amount in deltas.items()})
+    except Exception as e:
+        # Never fail the write that triggered this; the recompute fixes drift
+        logger.error(f"Error adjusting {label} {deltas}: {e}")
+        return 0
+
+
+def adjust_site_stats(**deltas):
+    """
+    Apply ``deltas`` ({field: amount}) to the rollup. A missing row is left
+    alone: the first read recomputes it with the change already included.
+    """
+    _add(SiteStats.objects.filter(pk=SITE_STATS_PK), "site stats", **deltas)
+
+
+# ---------------------------------------------------------------------------
+# Per-author statistics
+# ---------------------------------------------------------------------------
+# Blog columns that decide what a blog adds to its author's rollup
+AUTHOR_STATS_FIELDS = frozenset(['isPublished', 'author', 'category', 'views', 'likes'])
+
+# What one published blog adds to its author's rollup
+Contribution = namedtuple('Contribution', 'author_id category_id views likes')
+
+
+def blog_contribution(blog):
+    """``Contribution`` of ``blog`` (a Blog or a dict of its columns), None when unpublished"""
+    if isinstance(blog, dict):
+        if not blog['isPublished']:
+            return None
+        return Contribution(blog['author_id'], blog['category_id'], blog['views'], blog['likes'])
+    if not blog.isPublished:
+        return None
+    return Contribution(blog.author_id, blog.category_id, blog.views, blog.likes)
+
+
+def stored_contribution(blog_id):
+    """``Contribution`` of the blog as currently stored (one indexed read)"""
+    row = (
+        Blog.objects.filter(pk=blog_id)
+        .values('isPublished', 'author_id', 'category_id', 'views', 'likes')
+        .first()
+    )
+    return blog_contribution(row) if row else None
+
+
+def adjust_author_stats(contribution, sign):
+    """Add (``sign=1``) or remove (``sign=-1``) one blog's contribution"""
+    if contribution is None:
+        return
+    author_id, category_id, views, likes = contribution
+    _add(
+        AuthorStats.objects.filter(pk=author_id), "author stats",
+        blog_count=sign, total_views=sign * views, total_likes=sign * likes,
+    )
+    if category_id is None:
+        return
+    rows = AuthorCategory.objects.filter(author_id=author_id, category_id=category_id)
+    if not _add(rows, "author categories", blog_count=sign) and sign > 0:
+        # First blog of this author in this category
+        try:
+            with transaction.atomic():
+                AuthorCategory.objects.get_or_create(
+                    author_id=author_id, category_id=category_id, defaults={'blog_count': sign}
+                )
+        except Exception as e:
+            logger.error(f"Error adding author category {author_id}/{category_id}: {e}")
+
+
+def add_author_counts(field, deltas):
+    """Apply flushed counter ``deltas`` ({author_id: amount}) to ``total_<field>``"""
+    for author_id, amount in deltas.items():
+        _add(AuthorStats.objects.filter(pk=author_id), "author stats", **{f'total_{field}': amount})
+
+
+def recompute_author_stats(author_ids=None):
+    """
+    Rebuild the rollup of ``author_ids`` (default: every user) from the blogs
+    table with two grouped aggregates; returns the number of authors.
+    """
+    users = User.objects.order_by()
+    if author_ids is not None:
+        users = users.filter(pk__in=list(author_ids))
+    ids = list(users.values_list('pk', flat=True))
+    if not ids:
+        return 0
+
+    published = Blog.objects.published().filter(author_id__in=ids).order_by()
+    totals = {
+        row['author_id']: row
+        for row in published.values('author_id').annotate(
+            count=Count('id'), views=Sum('views'), likes=Sum('likes')
+        )
+    }
+    now = timezone.now()
+    rows = []
+    for pk in ids:
+        total = totals.get(pk, {})
+        rows.append(AuthorStats(
+            author_id=pk,
+            blog_count=total.get('count', 0),
+            total_views=total.get('views') or 0,
+            total_likes=total.get('likes') or 0,
+            recomputed_at=now,
+        ))
+    categories = [
+        AuthorCategory(author_id=row['author_id'], category_id=row['category_id'], blog_count=row['count'])
+        for row in published.filter(category__isnull=False)
+        .values('author_id', 'category_id').annotate(count=Count('id'))
+    ]
+
+    with transaction.atomic():
+        AuthorStats.objects.bulk_create(
+            rows, batch_size=500, update_conflicts=True, unique_fields=['author'],
+            update_fields=['blog_count', 'total_views', 'total_likes', 'recomputed_at'],
+        )
+        AuthorCategory.objects.filter(author_id__in=ids).delete()
+        AuthorCategory.objects.bulk_create(categories, batch_size=500)
+    return len(ids)
+
+
+def author_stats(author):
+    """
+    ``AuthorStats`` of ``author``, built on first use. Fetch the user with
+    ``select_related('author_stats')`` to make this free.
+    """
+    try:
+        return author.author_stats
+    except AuthorStats.DoesNotExist:
+        recompute_author_stats([author.pk])
+        return AuthorStats.objects.get(pk=author.pk)
+
+
+def author_categories(author):
+    """Categories ``author`` has published in, by name (one indexed query)"""
+    return Category.objects.filter(
+        author_counts__author=author, author_counts__blog_count__gt=0
+    ).order_by('name')
+
+
+# ---------------------------------------------------------------------------
+# Playlist rollups
+# ---------------------------------------------------------------------------
+def refresh_playlist_stats(playlist_ids=None):
+    """
+    Recompute ``blog_count`` and ``total_views`` of ``playlist_ids`` (default:
+    every playlist) from their member blogs; returns the number of playlists.
+    """
+    playlists = Playlist.objects.order_by()
+    if playlist_ids is not None:
+        playlists = playlists.filter(pk__in=list(playlist_ids))
+    ids = list(playlists.values_list('pk', flat=True))
+    if not ids:
+        return 0
+
+    Membership = Playlist.blogs.through
+    totals = {
+        row['playlist_id']: row
+        for row in Membership.objects.filter(playlist_id__in=ids).order_by()
+        .values('playlist_id').annotate(count=Count('blog_id'), views=Sum('blog__views'))
+    }
+    rows = []
+    for pk in ids:
+        total = totals.get(pk, {})
+        rows.append(Playlist(pk=pk, blog_count=total.get('count', 0), total_views=total.get('views') or 0))
+    Playlist.objects.bulk_update(rows, ['blog_count', 'total_views'], batch_size=500)
+    return len(ids)
+
+
+def add_playlist_views(deltas):
+    """Apply flushed view ``deltas`` ({blog_id: amount}) to the playlists holding those blogs"""
+    Membership = Playlist.blogs.through
+    by_playlist = defaultdict(int)
+    for playlist_id, blog_id in Membership.objects.filter(blog_id__in=list(deltas)).values_list('playlist_id', 'blog_id'):
+        by_playlist[playlist_id] += deltas[blog_id]
+    # Like CounterBuffer.flush: one UPDATE per distinct delta
+    by_delta = defaultdict(list)
+    for playlist_id, amount in by_playlist.items():
+        by_delta[amount].append(playlist_id)
+    for amount, playlist_ids in by_delta.items():
+        _add(Playlist.objects.filter(pk__in=playlist_ids), "playlist views", total_views=amount)
+
+
+def top_playlists(limit=3):
+    """Most viewed public playlists with their owners (one indexed query)"""
+    return list(
+        Playlist.objects.filter(is_public=True).select_related('owner').order_by('-total_views', '-id')[:limit]
+    )
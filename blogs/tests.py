@@ -1,3 +1,1356 @@
-from django.test import TestCase
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unittest
+import zlib
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import F
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from langchain_core.utils.json import parse_partial_json
+
+from blogs import llm
+from blogs.api import iterate_in_loop
+from blogs.caching import attach_card_versions, check_shared_cache
+from blogs.counters import CounterBuffer
+from blogs.embeddings import (
+    HashingEmbeddingProvider,
+    MistralEmbeddingProvider,
+    blog_embedding_text,
+    embedding_fingerprint,
+    get_embedding_provider,
+)
+from blogs.fields import VectorField, decode_vector, encode_vector
+from blogs.management.commands import reembed_blogs
+from blogs.jobs import claim_jobs, enqueue_blog_embedding, fail_jobs, process_jobs, retry_delay
+from blogs.models import (
+    AuthorCategory,
+    AuthorStats,
+    Blog,
+    BlogLike,
+    Category,
+    ChatSession,
+    EmbeddingJob,
+    Playlist,
+    RelatedBlog,
+    User,
+)
+from blogs.pagination import KeysetPaginator
+from blogs.related import rebuild_related_blogs
+from blogs.stats import _add, compute_site_stats, recompute_author_stats, recompute_site_stats, site_stats
+from blogs.vector_index import BlogVectorIndex, blog_vector_index
+from blogs.Views.chatapp.service import BlogGeneratorService
+from blogs.Views.chatapp.sessions import DatabaseSessionManager, InMemorySessionManager, SessionConflict
+from blogs.Views.chatapp.state import create_empty_blog_state, window_history
+from blogs.Views import blogs as blog_views
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN output is SQLite specific")
+class HotQueryPlanTests(TestCase):
+    """
+    Every hot query in blogs/Views/blogs.py must be served by an index.
+    A plan line like ``SCAN blogs_blog`` (without ``USING INDEX``) is a full
+    table scan, and ``TEMP B-TREE FOR ORDER BY`` means the index doesn't match
+    the feed ordering.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        cls.category = Category.objects.create(name='Python')
+        for i in range(5):
+            Blog.objects.create(
+                title=f"Post {i}",
+                sections=[],
+                author=cls.author,
+                category=cls.category,
+                isPublished=bool(i % 2),
+            )
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def view_queryset(self, view_class, url, **kwargs):
+        view = view_class()
+        view.setup(self.factory.get(url), **kwargs)
+        return view.get_queryset()
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        self.assertNotRegex(plan, re.compile(r'SCAN blogs_blog(?! USING (COVERING )?INDEX)'), plan)
+        self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan)
+        self.assertRegex(plan, r'blogs_blog USING (COVERING )?INDEX')
+
+    def test_public_feed(self):
+        self.assertUsesIndex(self.view_queryset(blog_views.BlogListView, '/blogs/'))
+
+    def test_public_feed_by_category(self):
+        self.assertUsesIndex(self.view_queryset(blog_views.BlogListView, '/blogs/?category=python'))
+
+    def test_public_feed_cursor_page(self):
+        view_queryset = self.view_queryset(blog_views.BlogListView, '/blogs/')
+        paginator = KeysetPaginator(view_queryset, blog_views.BlogListView.keyset_ordering, per_page=2)
+        last = view_queryset.first()
+        queryset = view_queryset.filter(paginator.after([last.publishedDate, last.created_at, last.pk]))
+        self.assertUsesIndex(queryset)
+
+    def test_author_profile(self):
+        queryset = self.view_queryset(blog_views.UserBlogListView, '/blogs/alice/', username='alice')
+        self.assertUsesIndex(queryset)
+
+    def test_author_profile_by_category(self):
+        queryset = self.view_queryset(
+            blog_views.UserBlogListView, '/blogs/alice/?category=python', username='alice'
+        )
+        self.assertUsesIndex(queryset)
+
+    def test_author_manage_view(self):
+        queryset = self.view_queryset(blog_views.UserBlogManageView, '/blogs/alice/edit/', username='alice')
+        self.assertUsesIndex(queryset)
+
+    def test_author_published_stats(self):
+        self.assertUsesIndex(Blog.objects.filter(author=self.author, isPublished=True).values('views', 'likes'))
+
+    def test_detail_lookup(self):
+        queryset = Blog.objects.select_related('category', 'author').filter(
+            author__username='alice', slug='post-1'
+        )
+        self.assertUsesIndex(queryset)
+
+
+class BlogVectorIndexTests(SimpleTestCase):
+    def loaded_index(self, vectors):
+        index = BlogVectorIndex(ttl=0)
+        index._loaded_at = 0
+        for blog_id, vector in vectors.items():
+            index.upsert(blog_id, vector)
+        return index
+
+    def test_updates_leave_a_searched_snapshot_untouched(self):
+        index = self.loaded_index({1: [1, 0], 2: [0, 1], 3: [1, 1]})
+        # What a concurrent search() holds while scoring outside the lock
+        ids, matrix = index._ids, index._matrix
+        before_ids, before_matrix = ids.copy(), matrix.copy()
+
+        index.upsert(2, [1, 0])
+        index.remove(1)
+        index.upsert(4, [0, 1])
+
+        np.testing.assert_array_equal(ids, before_ids)
+        np.testing.assert_array_equal(matrix, before_matrix)
+        self.assertEqual(sorted(blog_id for blog_id, _ in index.search([0, 1], k=10)), [2, 3, 4])
+        self.assertEqual(index.search([0, 1], k=1)[0][0], 4)
+
+    def test_inserts_fill_spare_rows_without_copying(self):
+        index = self.loaded_index({1: [1, 0, 0]})
+        buffer = index._vectors
+        spare = len(index._id_buffer) - 1
+        held = index._matrix
+
+        for blog_id in range(2, spare + 2):
+            index.upsert(blog_id, [0, 1, blog_id])
+        self.assertIs(index._vectors, buffer)
+        self.assertEqual(len(index), spare + 1)
+
+        # Out of spare rows: one reallocation, with room to spare again
+        index.upsert(spare + 2, [0, 0, 1])
+        self.assertIsNot(index._vectors, buffer)
+        self.assertGreater(len(index._id_buffer), len(index))
+        self.assertEqual(held.shape, (1, 3))
+        self.assertEqual(index.search([0, 0, 1], k=1)[0][0], spare + 2)
+
+    def test_replaced_and_removed_rows_leave_search_and_snapshot(self):
+        index = self.loaded_index({1: [1, 0], 2: [0, 1], 3: [1, 1], 4: [1, -1]})
+
+        index.upsert(3, [1, 1])
+        self.assertEqual(index._dead, 0)
+        index.upsert(2, [1, 0])
+        index.remove(4)
+
+        results = index.search([0, 1], k=10)
+        self.assertEqual(results[0][0], 3)
+        self.assertEqual(sorted(blog_id for blog_id, _ in results), [1, 2, 3])
+        ids, matrix, positions = index.snapshot()
+        self.assertEqual(sorted(ids.tolist()), [1, 2, 3])
+        self.assertEqual(len(matrix), 3)
+        np.testing.assert_allclose(matrix[positions[2]], [1, 0])
+        self.assertEqual({blog_id: int(ids[row]) for blog_id, row in positions.items()}, {1: 1, 2: 2, 3: 3})
+
+    def test_removing_most_rows_compacts(self):
+        index = self.loaded_index({blog_id: [1, blog_id] for blog_id in range(1, 11)})
+        for blog_id in range(1, 7):
+            index.remove(blog_id)
+
+        self.assertLessEqual(2 * index._dead, index._count)
+        self.assertEqual(sorted(blog_id for blog_id, _ in index.search([1, 0], k=10)), [7, 8, 9, 10])
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "Full-text search uses SQLite FTS5")
+class HashingEmbeddingProviderTests(SimpleTestCase):
+    def test_deterministic(self):
+        text = "Gradual typing in Python"
+        first = HashingEmbeddingProvider().embed_document(text)
+        self.assertEqual(first, HashingEmbeddingProvider().embed_document(text))
+        self.assertEqual(len(first), 1024)
+
+    def test_unit_length(self):
+        vectors = HashingEmbeddingProvider(dimensions=64).embed_documents(["Python typing", "Rust lifetimes"])
+        for vector in vectors:
+            self.assertAlmostEqual(float(np.linalg.norm(vector)), 1.0, places=5)
+
+    def test_empty_text_is_the_zero_vector(self):
+        self.assertEqual(HashingEmbeddingProvider(dimensions=8).embed_document("  "), [0.0] * 8)
+
+    def test_shared_words_score_higher(self):
+        provider = HashingEmbeddingProvider()
+        query, related, unrelated = (
+            np.array(vector) for vector in provider.embed_documents(["python typing", "typing in python", "sourdough"])
+        )
+        self.assertGreater(query @ related, provider.min_similarity)
+        self.assertLess(query @ unrelated, provider.min_similarity)
+
+    def test_documents_are_sent_in_batch_size_requests(self):
+        provider = HashingEmbeddingProvider(batch_size=2)
+        texts = [f"text {i}" for i in range(5)]
+        with mock.patch.object(provider, '_embed_batch', wraps=provider._embed_batch) as embed_batch:
+            vectors = provider.embed_documents(texts)
+
+        self.assertEqual([len(call.args[0]) for call in embed_batch.call_args_list], [2, 2, 1])
+        self.assertEqual(vectors, [provider.embed_document(text) for text in texts])
+
+
+class VectorFieldTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.vector = rng.standard_normal(1024).astype(np.float32)
+
+    def test_header_and_size(self):
+        for dtype, code, payload in [("float32", 1, 4096), ("float16", 2, 2048), ("int8", 3, 4 + 1024)]:
+            raw = encode_vector(self.vector, dtype)
+            self.assertEqual(raw[:4], b"V" + bytes([code]) + b"\x00\x00")
+            self.assertEqual(len(raw), 4 + payload)
+
+    def test_float32_round_trip_is_exact(self):
+        decoded = decode_vector(encode_vector(self.vector, "float32"))
+        np.testing.assert_array_equal(decoded, self.vector)
+        # A view of the buffer, not a copy
+        self.assertFalse(decoded.flags.writeable)
+
+    def test_float16_round_trip(self):
+        decoded = decode_vector(encode_vector(self.vector, "float16"))
+        self.assertEqual(decoded.dtype, np.float32)
+        # Half precision: 11 significant bits
+        np.testing.assert_allclose(decoded, self.vector, rtol=2 ** -11, atol=1e-7)
+
+    def test_int8_round_trip_within_half_a_step(self):
+        decoded = decode_vector(encode_vector(self.vector, "int8"))
+        step = np.abs(self.vector).max() / 127
+        self.assertLessEqual(np.abs(decoded - self.vector).max(), step / 2 + 1e-6)
+
+    def test_int8_zero_vector(self):
+        np.testing.assert_array_equal(decode_vector(encode_vector(np.zeros(8), "int8")), np.zeros(8))
+
+    def test_rejects_unknown_formats(self):
+        with self.assertRaises(ValueError):
+            encode_vector(self.vector, "float64")
+        with self.assertRaises(ValueError):
+            decode_vector(b"[0.1, 0.2]")
+        with self.assertRaises(ValueError):
+            VectorField(dtype="float64")
+
+    @override_settings(VECTOR_FIELD_DTYPE="float16")
+    def test_serialisation_round_trip(self):
+        field = Blog._meta.get_field("embedding")
+
+        restored = field.to_python(field.value_to_string(Blog(embedding=self.vector)))
+        np.testing.assert_allclose(restored, self.vector, rtol=2 ** -11, atol=1e-7)
+
+
+class VectorFieldStorageTests(TestCase):
+    def test_setting_selects_the_stored_format(self):
+        author = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        blog = Blog.objects.create(title="Vectors", sections=[], author=author)
+        vector = np.linspace(-1, 1, 16, dtype=np.float32)
+
+        for dtype in ("float32", "float16", "int8"):
+            with override_settings(VECTOR_FIELD_DTYPE=dtype):
+                Blog.objects.filter(pk=blog.pk).update(embedding=vector)
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT embedding FROM blogs_blog WHERE id = %s", [blog.pk])
+                raw = bytes(cursor.fetchone()[0])
+            self.assertEqual(raw[1], {"float32": 1, "float16": 2, "int8": 3}[dtype])
+
+            stored = Blog.objects.with_embedding().get(pk=blog.pk).embedding
+            self.assertIsInstance(stored, np.ndarray)
+            np.testing.assert_allclose(stored, vector, atol=1 / 127)
+
+
+class EmbeddingBinaryMigrationTests(TransactionTestCase):
+    before = [("blogs", "0008_embeddingjob")]
+    after = [("blogs", "0009_blog_embedding_binary")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        # Back to the latest schema for the other tests
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_json_vectors_become_binary(self):
+        old_apps = self.migrate(self.before)
+        OldUser = old_apps.get_model("blogs", "User")
+        OldBlog = old_apps.get_model("blogs", "Blog")
+        author = OldUser.objects.create(username="alice", email="alice@example.com")
+        embedded = OldBlog.objects.create(
+            title="Embedded", slug="embedded", sections=[], author=author, embedding=[0.25, -0.5, 1.0]
+        )
+        empty = OldBlog.objects.create(title="Empty", slug="empty", sections=[], author=author, embedding=None)
+
+        new_apps = self.migrate(self.after)
+        NewBlog = new_apps.get_model("blogs", "Blog")
+
+        np.testing.assert_array_equal(NewBlog.objects.get(pk=embedded.pk).embedding, [0.25, -0.5, 1.0])
+        self.assertIsNone(NewBlog.objects.get(pk=empty.pk).embedding)
+
+        # And back
+        OldBlog = self.migrate(self.before).get_model("blogs", "Blog")
+        self.assertEqual(OldBlog.objects.get(pk=embedded.pk).embedding, [0.25, -0.5, 1.0])
+
+
+class BlogListSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        cls.in_title = Blog.objects.create(
+            title="Django signals explained", sections=[], author=author, isPublished=True,
+            publishedDate=timezone.now() - timedelta(days=2),
+        )
+        cls.in_body = Blog.objects.create(
+            title="Weekly notes", introduction="A short aside about django.", sections=[],
+            author=author, isPublished=True, publishedDate=timezone.now(),
+        )
+        Blog.objects.create(title="Unrelated", sections=[], author=author, isPublished=True)
+
+    def test_results_are_ranked_by_relevance_with_snippets(self):
+        response = self.client.get('/blogs/', {'q': 'django'})
+        blogs = list(response.context['blogs'])
+        self.assertEqual([blog.pk for blog in blogs], [self.in_title.pk, self.in_body.pk])
+        self.assertIn('<mark>', blogs[0].search_snippet)
+        self.assertContains(response, '<mark>Django</mark>', html=False)
+
+
+@override_settings(
+    EMBEDDING_PROVIDER={"BACKEND": "blogs.embeddings.HashingEmbeddingProvider"},
+    EMBEDDING_QUEUE_ENABLED=False,
+)
+class SearchBlogAPIPaginationTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        for title in ["Kubernetes operators", "Kubernetes networking", "Kubernetes storage"]:
+            Blog.objects.create(title=title, sections=[], author=author, isPublished=True)
+        for title in ["Sourdough baking", "Marathon training", "Watercolour basics"]:
+            Blog.objects.create(title=title, sections=[], author=author, isPublished=True)
+        blog_vector_index.reload()
+
+    def search(self, **body):
+        response = self.client.post('/api/search-blog/', body, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_has_more_only_while_matches_remain(self):
+        first = self.search(query='kubernetes', limit=2, offset=0)
+        self.assertEqual(len(first['results']), 2)
+        self.assertTrue(first['has_more'])
+
+        last = self.search(query='kubernetes', limit=2, offset=2)
+        self.assertEqual(len(last['results']), 1)
+        self.assertFalse(last['has_more'])
+
+        exact = self.search(query='kubernetes', limit=3, offset=0)
+        self.assertFalse(exact['has_more'])
+        titles = {result['title'] for result in exact['results']}
+        self.assertEqual(titles, {"Kubernetes operators", "Kubernetes networking", "Kubernetes storage"})
+
+
+class MistralLikeEmbeddingProvider(MistralEmbeddingProvider):
+    """
+    MistralEmbeddingProvider (and its min_similarity) with offline vectors in
+    its score range: every text shares one direction, so even unrelated
+    texts score well above zero.
+    """
+
+    def vector(self, text):
+        vector = np.zeros(256, dtype=np.float32)
+        vector[0] = 1.5
+        for word in re.findall(r"\w+", text.lower()):
+            vector[1 + zlib.crc32(word.encode()) % 255] += 1
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def _embed_batch(self, texts):
+        return [self.vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.vector(text)
+
+    async def aembed_query(self, text):
+        return self.vector(text)
+
+
+@override_settings(
+    EMBEDDING_PROVIDER={"BACKEND": "blogs.tests.MistralLikeEmbeddingProvider"},
+    EMBEDDING_QUEUE_ENABLED=False,
+)
+class MistralSearchPaginationTests(SearchBlogAPIPaginationTests):
+    def test_unrelated_blogs_still_score_above_zero(self):
+        provider = get_embedding_provider()
+        query = np.array(provider.embed_query("kubernetes"))
+        unrelated = np.array(provider.embed_document("Sourdough baking"))
+        self.assertGreater(query @ unrelated, 0.5)
+
+
+@override_settings(
+    EMBEDDING_PROVIDER={"BACKEND": "blogs.embeddings.HashingEmbeddingProvider"},
+    EMBEDDING_QUEUE_ENABLED=False,
+    RELATED_BLOGS_STORED=2,
+)
+class RelatedBlogRefreshTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.blogs = [
+            Blog.objects.create(title=title, sections=[], author=author, isPublished=True)
+            for title in ["Python typing", "Python packaging", "Rust lifetimes", "Rust traits"]
+        ]
+        blog_vector_index.reload()
+        rebuild_related_blogs()
+
+    def neighbours(self):
+        return list(RelatedBlog.objects.order_by('blog_id', 'rank').values_list('blog_id', 'related_id'))
+
+    def test_save_refreshes_from_the_index_without_reloading_vectors(self):
+        blog = self.blogs[2]
+        blog.title = "Python testing"
+        with mock.patch('blogs.vector_index.load_published_vectors') as load, \
+                mock.patch('blogs.related.load_published_vectors') as related_load:
+            blog.save()
+        load.assert_not_called()
+        related_load.assert_not_called()
+        self.assertMatchesRebuild()
+
+    def assertMatchesRebuild(self):
+        incremental = self.neighbours()
+        blog_vector_index.reload()
+        rebuild_related_blogs()
+        self.assertEqual(incremental, self.neighbours())
+
+    def test_delete_refreshes_the_blogs_that_listed_it(self):
+        deleted = self.blogs[0]
+        referrers = set(RelatedBlog.objects.filter(related=deleted).values_list('blog_id', flat=True))
+        self.assertTrue(referrers)
+
+        deleted.delete()
+
+        # Each of them is back to the full RELATED_BLOGS_STORED neighbours
+        for blog_id in referrers:
+            self.assertEqual(RelatedBlog.objects.filter(blog_id=blog_id).count(), 2)
+        self.assertMatchesRebuild()
+
+    @override_settings(EMBEDDING_QUEUE_ENABLED=True)
+    def test_delete_in_queue_mode_leaves_the_refresh_to_the_worker(self):
+        deleted = self.blogs[0]
+        referrers = set(RelatedBlog.objects.filter(related=deleted).values_list('blog_id', flat=True))
+
+        deleted.delete()
+
+        jobs = claim_jobs()
+        self.assertEqual({job.blog_id for job in jobs}, referrers)
+        # Unchanged text: nothing is re-embedded, only the neighbours refreshed
+        self.assertEqual(process_jobs(jobs), 0)
+        self.assertMatchesRebuild()
+
+
+@override_settings(
+    EMBEDDING_PROVIDER={"BACKEND": "blogs.embeddings.HashingEmbeddingProvider"},
+    EMBEDDING_QUEUE_ENABLED=False,
+)
+class SyncEmbeddingTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        blog_vector_index.reload()
+        self.blog = Blog.objects.create(title="Python typing", sections=[], author=author, isPublished=True)
+
+    def stored(self):
+        return Blog.objects.with_embedding().values_list('embedding', 'embedding_hash').get(pk=self.blog.pk)
+
+    def test_edit_of_a_loaded_blog_stores_the_new_vector(self):
+        # Loaded through the default manager: the embedding column is deferred
+        blog = Blog.objects.get(pk=self.blog.pk)
+        self.assertIn('embedding', blog.get_deferred_fields())
+        blog.title = "Rust lifetimes"
+        blog.save()
+
+        text = blog_embedding_text(blog)
+        embedding, digest = self.stored()
+        self.assertEqual(digest, embedding_fingerprint(text))
+        np.testing.assert_allclose(embedding, get_embedding_provider().embed_document(text), atol=1e-6)
+
+    def embed_calls(self):
+        return mock.patch.object(
+            HashingEmbeddingProvider, 'embed_document', autospec=True,
+            side_effect=HashingEmbeddingProvider.embed_document,
+        )
+
+    def test_counter_only_save_skips_embedding(self):
+        blog = Blog.objects.get(pk=self.blog.pk)
+        blog.title = "Changed, but not saved"
+        blog.views = 5
+        with self.embed_calls() as embed:
+            blog.save(update_fields=['views'])
+        embed.assert_not_called()
+
+    def test_unchanged_text_is_not_embedded_again(self):
+        blog = Blog.objects.get(pk=self.blog.pk)
+        blog.views = 5
+        with self.embed_calls() as embed:
+            blog.save()
+        embed.assert_not_called()
+
+    def test_text_change_is_embedded_again(self):
+        blog = Blog.objects.get(pk=self.blog.pk)
+        blog.subtitle = "Gradual typing in practice"
+        with self.embed_calls() as embed:
+            blog.save()
+        embed.assert_called_once()
+        self.assertEqual(self.stored()[1], embedding_fingerprint(blog_embedding_text(blog)))
+
+    def test_model_change_is_embedded_again(self):
+        Blog.objects.filter(pk=self.blog.pk).update(embedding_model="older-model")
+        blog = Blog.objects.get(pk=self.blog.pk)
+        with self.embed_calls() as embed:
+            blog.save()
+        embed.assert_called_once()
+        self.assertEqual(
+            Blog.objects.values_list('embedding_model', flat=True).get(pk=self.blog.pk),
+            get_embedding_provider().model_name,
+        )
+
+    def test_stored_fingerprint_always_matches_the_stored_text(self):
+        stale = Blog.objects.get(pk=self.blog.pk)
+        # Meanwhile the text changes and is embedded again
+        blog = Blog.objects.get(pk=self.blog.pk)
+        blog.title = "Rust lifetimes"
+        blog.save()
+
+        # Writes the old title back, so the old text must be embedded again
+        stale.save()
+
+        text = blog_embedding_text(Blog.objects.get(pk=self.blog.pk))
+        embedding, digest = self.stored()
+        self.assertEqual(digest, embedding_fingerprint(text))
+        np.testing.assert_allclose(embedding, get_embedding_provider().embed_document(text), atol=1e-6)
+
+
+@override_settings(
+    EMBEDDING_PROVIDER={"BACKEND": "blogs.embeddings.HashingEmbeddingProvider"},
+    EMBEDDING_QUEUE_ENABLED=True,
+    EMBEDDING_JOB_BACKOFF_SECONDS=30,
+    EMBEDDING_JOB_BACKOFF_MAX_SECONDS=200,
+    EMBEDDING_JOB_MAX_ATTEMPTS=3,
+)
+class EmbeddingJobTests(TestCase):
+    def setUp(self):
+        blog_vector_index.reload()
+        self.author = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.blog = Blog.objects.create(title="Python typing", sections=[], author=self.author, isPublished=True)
+
+    def expire_leases(self):
+        EmbeddingJob.objects.update(locked_at=timezone.now() - timedelta(minutes=10))
+
+    def test_save_queues_one_job_per_blog(self):
+        self.assertEqual(EmbeddingJob.objects.filter(blog=self.blog).count(), 1)
+        self.assertIsNone(enqueue_blog_embedding(self.blog.pk))
+
+        # A running job may have read the old text: queue another behind it
+        claim_jobs()
+        self.assertIsNotNone(enqueue_blog_embedding(self.blog.pk))
+
+    def test_claims_never_overlap(self):
+        Blog.objects.create(title="Rust traits", sections=[], author=self.author, isPublished=True)
+
+        first = claim_jobs(batch_size=1)
+        second = claim_jobs(batch_size=10)
+
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(second), 1)
+        self.assertNotEqual(first[0].pk, second[0].pk)
+        self.assertNotEqual(first[0].locked_by, second[0].locked_by)
+        self.assertEqual(claim_jobs(), [])
+
+    def test_abandoned_claim_is_reclaimed(self):
+        [job] = claim_jobs(lease_seconds=60)
+        self.assertEqual(claim_jobs(lease_seconds=60), [])
+
+        self.expire_leases()
+        [reclaimed] = claim_jobs(lease_seconds=60)
+
+        self.assertEqual(reclaimed.pk, job.pk)
+        self.assertNotEqual(reclaimed.locked_by, job.locked_by)
+
+    def test_retry_delay_doubles_up_to_the_cap(self):
+        self.assertEqual([retry_delay(attempts) for attempts in range(1, 6)], [30, 60, 120, 200, 200])
+
+    def test_failure_reschedules_with_backoff(self):
+        jobs = claim_jobs()
+        fail_jobs(jobs, RuntimeError("API down"))
+
+        job = EmbeddingJob.objects.get()
+        self.assertEqual((job.status, job.attempts, job.locked_by), (EmbeddingJob.STATUS_PENDING, 1, ""))
+        self.assertEqual(job.last_error, "API down")
+        self.assertAlmostEqual((job.run_after - timezone.now()).total_seconds(), 30, delta=5)
+        self.assertEqual(claim_jobs(), [])
+
+    def test_gives_up_after_max_attempts(self):
+        EmbeddingJob.objects.update(attempts=2)
+        fail_jobs(claim_jobs(), RuntimeError("API down"))
+
+        job = EmbeddingJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (EmbeddingJob.STATUS_FAILED, 3))
+        self.assertEqual(claim_jobs(), [])
+
+    def test_expired_claim_cannot_touch_a_reclaimed_job(self):
+        stale = claim_jobs(lease_seconds=60)
+        self.expire_leases()
+        reclaimed = claim_jobs(lease_seconds=60)
+
+        fail_jobs(stale, RuntimeError("timeout"))
+        process_jobs(stale)
+        job = EmbeddingJob.objects.get()
+        self.assertEqual(
+            (job.status, job.locked_by, job.attempts),
+            (EmbeddingJob.STATUS_RUNNING, reclaimed[0].locked_by, 0),
+        )
+
+        process_jobs(reclaimed)
+        self.assertFalse(EmbeddingJob.objects.exists())
+
+
+@override_settings(
+    EMBEDDING_PROVIDER={"BACKEND": "blogs.embeddings.HashingEmbeddingProvider"},
+    EMBEDDING_QUEUE_ENABLED=True,
+)
+class ReembedBlogsTests(TestCase):
+    def setUp(self):
+        blog_vector_index.reload()
+        author = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.blogs = [
+            Blog.objects.create(title=f"Blog number {i}", sections=[], author=author, isPublished=True)
+            for i in range(6)
+        ]
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint = Path(directory.name) / "checkpoint.json"
+        self.batches = []
+
+    def reembed(self, fail_on_batch=None):
+        """Run reembed_blogs in batches of 2; batch ``fail_on_batch`` fails once the one before is saved"""
+        checkpointed = threading.Event()
+        save_checkpoint = reembed_blogs.Command.save_checkpoint
+        embed_batch = HashingEmbeddingProvider._embed_batch
+
+        def record_checkpoint(command):
+            save_checkpoint(command)
+            checkpointed.set()
+
+        def embed(provider, texts):
+            self.batches.append(texts)
+            if len(self.batches) == fail_on_batch:
+                checkpointed.wait(5)
+                raise RuntimeError("API down")
+            return embed_batch(provider, texts)
+
+        out = io.StringIO()
+        with mock.patch.object(reembed_blogs.Command, 'save_checkpoint', record_checkpoint), \
+                mock.patch.object(HashingEmbeddingProvider, '_embed_batch', embed):
+            call_command('reembed_blogs', batch_size=2, workers=1, checkpoint=str(self.checkpoint), stdout=out)
+        return out.getvalue()
+
+    def embedded(self):
+        return list(Blog.objects.exclude(embedding_hash="").order_by('pk').values_list('pk', flat=True))
+
+    def test_interrupted_run_resumes_from_the_checkpoint(self):
+        with self.assertRaises(CommandError):
+            self.reembed(fail_on_batch=2)
+        # Later batches may have been written too, but the checkpoint only
+        # moves past batches with no failed one before them
+        self.assertEqual(json.loads(self.checkpoint.read_text())['last_pk'], self.blogs[1].pk)
+        self.assertLessEqual({blog.pk for blog in self.blogs[:2]}, set(self.embedded()))
+
+        self.batches = []
+        output = self.reembed()
+
+        self.assertIn(f"Resuming after blog id {self.blogs[1].pk}", output)
+        # Only blogs after the checkpoint are embedded again
+        resumed = {blog_embedding_text(blog) for blog in self.blogs[2:]}
+        self.assertLessEqual({text for batch in self.batches for text in batch}, resumed)
+        self.assertEqual(self.embedded(), [blog.pk for blog in self.blogs])
+        self.assertFalse(self.checkpoint.exists())
+
+        for blog in Blog.objects.all():
+            self.assertEqual(blog.embedding_hash, embedding_fingerprint(blog_embedding_text(blog)))
+
+    def test_unchanged_blogs_are_skipped(self):
+        self.reembed()
+        self.batches = []
+
+        output = self.reembed()
+
+        self.assertEqual(self.batches, [])
+        self.assertIn("0 embedded, 6 unchanged", output)
+
+
+class CounterBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        cls.blog = Blog.objects.create(title="Counted", sections=[], author=author, isPublished=True, views=10)
+
+    def setUp(self):
+        cache.clear()
+        # No timer thread: these tests flush explicitly
+        self.counter = CounterBuffer(Blog, 'views', flush_interval=0, max_pending=1)
+
+    def test_live_value_includes_an_increment_that_flushed(self):
+        version = self.counter.version()
+        blog = Blog.objects.get(pk=self.blog.pk)
+        # max_pending=1: the increment flushes straight away, leaving nothing pending
+        self.counter.increment(blog.pk)
+        self.assertEqual(self.counter.pending(blog.pk), 0)
+        self.assertEqual(self.counter.live(blog.pk, blog.views, version), 11)
+
+    def test_live_value_without_flush_needs_no_query(self):
+        counter = CounterBuffer(Blog, 'views', flush_interval=3600, max_pending=100)
+        version = counter.version()
+        counter.increment(self.blog.pk, 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(counter.live(self.blog.pk, 10, version), 13)
+
+    def test_detail_view_counts_each_visitor_once(self):
+        url = f'/blogs/alice/{self.blog.slug}/'
+        with mock.patch('blogs.counters.blog_view_counter', self.counter):
+            first = self.client.get(url)
+            second = self.client.get(url)
+        self.assertEqual(first.context['blog'].views, 11)
+        self.assertEqual(second.context['blog'].views, 11)
+        self.assertEqual(Blog.objects.get(pk=self.blog.pk).views, 11)
+
+
+class CounterFlushTimerTests(TransactionTestCase):
+    def test_timer_flushes_without_further_traffic(self):
+        author = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        blog = Blog.objects.create(title="Counted", sections=[], author=author, isPublished=True)
+        counter = CounterBuffer(Blog, 'views', flush_interval=0.05, max_pending=100)
+        counter.increment(blog.pk, 2)
+        for _ in range(100):
+            if Blog.objects.get(pk=blog.pk).views == 2:
+                break
+            time.sleep(0.02)
+        self.assertEqual(Blog.objects.get(pk=blog.pk).views, 2)
+        self.assertEqual(counter.pending(blog.pk), 0)
+
+
+class BlogLikeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        cls.blog = Blog.objects.create(title="Liked", sections=[], author=cls.user, isPublished=True)
+
+    def setUp(self):
+        self.counter = CounterBuffer(Blog, 'likes', flush_interval=3600, max_pending=100)
+        self.client.force_login(self.user)
+
+    def toggle(self):
+        with mock.patch('blogs.api.blog_like_counter', self.counter), \
+                mock.patch('blogs.counters.blog_like_counter', self.counter):
+            return self.client.post(f'/api/blogs/{self.blog.slug}/like/').json()
+
+    def test_toggle_after_idle_interval_counts_itself(self):
+        # Idle for longer than the flush interval: this increment flushes the buffer
+        self.counter._last_flush -= 7200
+        self.assertEqual(self.toggle(), {'liked': True, 'total_likes': 1})
+        self.assertEqual(self.counter.pending(self.blog.pk), 0)
+        self.assertEqual(Blog.objects.get(pk=self.blog.pk).likes, 1)
+
+        # Buffered this time
+        self.assertEqual(self.toggle(), {'liked': False, 'total_likes': 0})
+        self.assertEqual(self.counter.pending(self.blog.pk), -1)
+
+    def test_reconcile_fixes_settled_drift(self):
+        BlogLike.objects.create(user=self.user, blog=self.blog)
+        Blog.objects.filter(pk=self.blog.pk).update(likes=5)
+        call_command('reconcile_blog_likes', settle=0, stdout=io.StringIO())
+        self.assertEqual(Blog.objects.get(pk=self.blog.pk).likes, 1)
+
+    def test_reconcile_skips_drift_that_is_still_being_flushed(self):
+        BlogLike.objects.create(user=self.user, blog=self.blog)
+
+        def worker_flushes(seconds):
+            # A web worker's buffered +1 for that like lands during the settle period
+            Blog.objects.filter(pk=self.blog.pk).update(likes=F('likes') + 1)
+
+        with mock.patch('blogs.management.commands.reconcile_blog_likes.time.sleep', worker_flushes):
+            call_command('reconcile_blog_likes', settle=1, stdout=io.StringIO())
+        self.assertEqual(Blog.objects.get(pk=self.blog.pk).likes, 1)
+
+
+class FragmentCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_evicted_card_version_never_restarts_at_an_old_value(self):
+        blog = Blog(pk=1)
+        attach_card_versions([blog])
+        first = blog.card_version
+        # Eviction of the version keys must not bring back keys built before it
+        cache.clear()
+        attach_card_versions([blog])
+        self.assertNotEqual(blog.card_version, first)
+        self.assertFalse(blog.card_version.startswith("0."))
+
+    @override_settings(DEBUG=False, CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_per_process_cache_is_reported(self):
+        self.assertEqual([warning.id for warning in check_shared_cache(None)], ['blogs.W001'])
+
+    @override_settings(DEBUG=False, CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}})
+    def test_shared_cache_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
+
+
+class StatsAdjustmentTests(TestCase):
+    def test_failed_adjustment_keeps_the_callers_transaction_usable(self):
+        author = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        recompute_author_stats([author.pk])
+        self.assertEqual(AuthorStats.objects.get(pk=author.pk).blog_count, 0)
+        with transaction.atomic():
+            # blog_count is unsigned: the UPDATE fails its CHECK constraint
+            with self.assertLogs('blogs.stats', 'ERROR'):
+                self.assertEqual(_add(AuthorStats.objects.filter(pk=author.pk), "author stats", blog_count=-1), 0)
+            Blog.objects.create(title="Still writable", sections=[], author=author, isPublished=True)
+        self.assertEqual(AuthorStats.objects.get(pk=author.pk).blog_count, 1)
+
+
+class AuthorStatsRollupTests(TestCase):
+    """Signal-maintained rollups agree with a rebuild from the blogs table"""
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.bob = User.objects.create_user(username='bob', email='bob@example.com', password='pw')
+        self.python = Category.objects.create(name='Python')
+        self.rust = Category.objects.create(name='Rust')
+        recompute_author_stats()
+        recompute_site_stats()
+
+    def snapshot(self):
+        site = site_stats()
+        return (
+            sorted(AuthorStats.objects.values_list('author_id', 'blog_count', 'total_views', 'total_likes')),
+            # Incremental maintenance leaves emptied categories at zero; the rebuild drops them
+            sorted(AuthorCategory.objects.filter(blog_count__gt=0).values_list('author_id', 'category_id', 'blog_count')),
+            (site.blogs_published, site.total_views),
+        )
+
+    def assertMatchesRecompute(self):
+        incremental = self.snapshot()
+        recompute_author_stats()
+        recompute_site_stats()
+        self.assertEqual(incremental, self.snapshot())
+        compact = compute_site_stats()
+        self.assertEqual(incremental[2], (compact['blogs_published'], compact['total_views']))
+
+    def blog(self, **fields):
+        title = f"Post {Blog.objects.count()}"
+        return Blog.objects.create(sections=[], **{'title': title, 'author': self.alice, **fields})
+
+    def test_incremental_changes_match_recompute(self):
+        first = self.blog(category=self.python, isPublished=True, views=5, likes=1)
+        second = self.blog(category=self.python, views=3, likes=2)
+        self.blog(author=self.bob, isPublished=True, views=2)
+        self.assertMatchesRecompute()
+
+        # Publish
+        second.isPublished = True
+        second.save()
+        self.assertMatchesRecompute()
+
+        # Flushed views of a published blog
+        CounterBuffer(Blog, 'views', flush_interval=0, max_pending=1).increment(first.pk, 4)
+        self.assertMatchesRecompute()
+
+        # Category move, to another category and to none
+        first.refresh_from_db()
+        first.category = self.rust
+        first.save()
+        self.assertMatchesRecompute()
+        second.category = None
+        second.save()
+        self.assertMatchesRecompute()
+
+        # Author move
+        first.author = self.bob
+        first.save()
+        self.assertMatchesRecompute()
+
+        # Unpublish
+        first.isPublished = False
+        first.save()
+        self.assertMatchesRecompute()
+
+        # Delete, published and unpublished
+        second.delete()
+        self.assertMatchesRecompute()
+        first.delete()
+        self.assertMatchesRecompute()
+
+    def test_stale_instance_moves_use_the_stored_row(self):
+        blog = self.blog(category=self.python, isPublished=True, views=5)
+        stale = Blog.objects.get(pk=blog.pk)
+        blog.category = self.rust
+        blog.author = self.bob
+        blog.save()
+
+        # The stale copy still says alice/python; the diff starts from bob/rust
+        stale.title = "Renamed"
+        stale.save()
+        self.assertMatchesRecompute()
+
+        stale.delete()
+        self.assertMatchesRecompute()
+
+
+class BlogCounterSaveTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.blog = Blog.objects.create(title="Python typing", sections=[], author=self.author, isPublished=True)
+
+    def flush(self, views, likes):
+        # What a counter flush does while the edit form is open
+        Blog.objects.filter(pk=self.blog.pk).update(views=F('views') + views, likes=F('likes') + likes)
+
+    def rollup(self):
+        stats = AuthorStats.objects.get(pk=self.author.pk)
+        return stats.blog_count, stats.total_views, stats.total_likes
+
+    def test_full_save_keeps_flushed_counters(self):
+        loaded = Blog.objects.get(pk=self.blog.pk)
+        self.flush(5, 2)
+
+        loaded.title = "Python typing in practice"
+        loaded.save()
+
+        stored = Blog.objects.values_list('title', 'views', 'likes').get(pk=self.blog.pk)
+        self.assertEqual(stored, ("Python typing in practice", 5, 2))
+
+    def test_publishing_a_loaded_blog_counts_its_stored_counters(self):
+        Blog.objects.filter(pk=self.blog.pk).update(isPublished=False, publishedDate=None)
+        recompute_author_stats([self.author.pk])
+        loaded = Blog.objects.get(pk=self.blog.pk)
+        self.flush(7, 3)
+
+        loaded.isPublished = True
+        loaded.save()
+
+        incremental = self.rollup()
+        recompute_author_stats([self.author.pk])
+        self.assertEqual(incremental, (1, 7, 3))
+        self.assertEqual(incremental, self.rollup())
+
+
+class PlaylistRollupTests(TestCase):
+    def test_full_save_keeps_the_stored_rollups(self):
+        owner = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        blog = Blog.objects.create(title="Member", sections=[], author=owner, isPublished=True, views=7)
+        playlist = Playlist.objects.create(owner=owner, name="Reading list")
+        stale = Playlist.objects.get(pk=playlist.pk)
+
+        playlist.blogs.add(blog)
+        stale.name = "Renamed"
+        stale.save()
+
+        stored = Playlist.objects.get(pk=playlist.pk)
+        self.assertEqual((stored.name, stored.blog_count, stored.total_views), ("Renamed", 1, 7))
+
+
+@override_settings(CHAT_SESSION_BACKEND="memory")
+class ChatSessionOwnershipTests(SimpleTestCase):
+    def setUp(self):
+        self.service = BlogGeneratorService()
+        self.service.graph = mock.Mock(ainvoke=mock.AsyncMock(side_effect=lambda state: state))
+
+    def test_owner_continues_the_chat(self):
+        async_to_sync(self.service.process_message)("hello", "chat-1", user_id="1", username="alice")
+        response = async_to_sync(self.service.process_message)("again", "chat-1", user_id="1", username="alice")
+
+        self.assertNotIn(response["action"], ("forbidden", "error"))
+        self.assertEqual(len(response["messages"]), 2)
+
+    def test_another_user_cannot_continue_the_chat(self):
+        async_to_sync(self.service.process_message)("hello", "chat-1", user_id="1", username="alice")
+        self.service.graph.ainvoke.reset_mock()
+
+        response = async_to_sync(self.service.process_message)("mine now", "chat-1", user_id="2", username="bob")
+
+        self.assertEqual(response["action"], "forbidden")
+        self.service.graph.ainvoke.assert_not_called()
+        state = async_to_sync(self.service.get_session_state)("chat-1")
+        self.assertEqual([m["content"] for m in state["messages"]], ["hello"])
+
+
+class SectionStreamingTests(SimpleTestCase):
+    blog = {
+        "title": "Typing",
+        "sections": [
+            {"type": "text", "title": "Why", "content": "Fewer bugs."},
+            {"type": "bullets", "items": ["mypy", "pyright"]},
+        ],
+        "conclusion": "Try it.",
+    }
+
+    def emitted_while_streaming(self, raw):
+        """Feed ``raw`` to _emit_sections one character at a time, like model tokens"""
+        service = BlogGeneratorService.__new__(BlogGeneratorService)
+        events, emitted = [], 0
+        for end in range(1, len(raw) + 1):
+            count = len(events)
+            emitted = service._emit_sections(events.append, parse_partial_json(raw[:end]), emitted)
+            for event in events[count:]:
+                # How much of the JSON had arrived when this section went out
+                event["prefix"] = raw[:end]
+        return events, emitted
+
+    def test_each_complete_section_is_emitted_once_in_order(self):
+        events, emitted = self.emitted_while_streaming(json.dumps(self.blog))
+
+        self.assertEqual(emitted, 2)
+        self.assertEqual([(e["event"], e["index"]) for e in events], [("section", 0), ("section", 1)])
+        self.assertEqual(events[0]["section"], {"type": "text", "title": "Why", "content": "Fewer bugs."})
+        self.assertEqual(events[1]["section"], {"type": "bullets", "items": ["mypy", "pyright"]})
+        # The first section is out before the second one has finished streaming
+        self.assertNotIn("pyright", events[0]["prefix"])
+        # The last one waits for the next key
+        self.assertIn('"conclusion"', events[1]["prefix"])
+
+    def test_the_last_section_waits_until_the_array_is_closed(self):
+        raw = json.dumps({"title": "Typing", "sections": self.blog["sections"]})
+        # Cut off right after the last section's closing brace
+        events, emitted = self.emitted_while_streaming(raw[:-2])
+
+        self.assertEqual([e["index"] for e in events], [0])
+        self.assertEqual(emitted, 1)
+
+    def test_an_invalid_section_is_left_for_the_final_blog(self):
+        partial = {"sections": [{"type": "text"}, {"title": "No type"}, {"type": "note"}], "conclusion": ""}
+        events = []
+
+        emitted = BlogGeneratorService.__new__(BlogGeneratorService)._emit_sections(events.append, partial, 0)
+
+        self.assertEqual(emitted, 1)
+        self.assertEqual([e["index"] for e in events], [0])
+
+
+class AsyncJsonPostMixinTests(TestCase):
+    async_views = ['generate-blog-api', 'generate-blog-stream-api', 'search-blog-api']
+
+    def test_only_post_is_allowed(self):
+        user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.client.force_login(user)
+        for name in self.async_views:
+            for method in (self.client.get, self.client.put, self.client.delete):
+                with self.subTest(name, method=method.__name__):
+                    response = method(reverse(name))
+                    self.assertEqual(response.status_code, 405)
+                    self.assertEqual(response.json(), {'error': 'Method not allowed'})
+
+    def test_anonymous_users_are_sent_to_login(self):
+        for name in ['generate-blog-api', 'generate-blog-stream-api']:
+            with self.subTest(name), mock.patch('blogs.api.BLOG_SERVICE') as service:
+                url = reverse(name)
+                response = self.client.post(url, {"message": "Hi"}, content_type='application/json')
+                self.assertRedirects(response, f"{reverse('account_login')}?next={url}", fetch_redirect_response=False)
+                service.process_message.assert_not_called()
+                service.stream_message.assert_not_called()
+
+    def test_loop_clients_are_closed_under_wsgi(self):
+        with mock.patch('blogs.api.llm.aclose_loop_clients') as aclose:
+            self.client.get(reverse('search-blog-api'))
+        aclose.assert_awaited_once()
+
+
+class GenerateBlogStreamAPITests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        self.client.force_login(self.user)
+
+    def post(self, body):
+        return self.client.post(reverse('generate-blog-stream-api'), body, content_type='application/json')
+
+    def parse(self, response):
+        body = b"".join(response.streaming_content).decode()
+        self.assertTrue(body.endswith("\n\n"))
+        events = []
+        for frame in body[:-2].split("\n\n"):
+            name, data = frame.split("\n")
+            self.assertTrue(name.startswith("event: ") and data.startswith("data: "))
+            events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+        return events
+
+    def test_events_are_framed_as_server_sent_events(self):
+        calls = []
+
+        async def stream_message(**kwargs):
+            calls.append(kwargs)
+            yield {"event": "intent", "intent": "create"}
+            yield {"event": "token", "text": "Line one\nline two"}
+            yield {"event": "section", "index": 0, "section": {"type": "text", "content": "Hi"}}
+            yield {"event": "done", "action": "create", "blog_state": {"title": "Typing"}}
+
+        with mock.patch('blogs.api.BLOG_SERVICE.stream_message', stream_message):
+            response = self.post({"message": "Write about typing", "session_id": "chat-1"})
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(response["Cache-Control"], "no-cache")
+        self.assertEqual(response["X-Accel-Buffering"], "no")
+        self.assertEqual(self.parse(response), [
+            ("session", {"session_id": "chat-1"}),
+            ("intent", {"intent": "create"}),
+            # Newlines inside data stay JSON-escaped, so one frame is one event
+            ("token", {"text": "Line one\nline two"}),
+            ("section", {"index": 0, "section": {"type": "text", "content": "Hi"}}),
+            ("done", {
+                "action": "create", "blog_state": {"title": "Typing"},
+                "session_id": "chat-1", "blog_data": {"title": "Typing"},
+            }),
+        ])
+        self.assertEqual(calls, [{
+            "message": "Write about typing", "session_id": "chat-1",
+            "user_id": str(self.user.id), "username": "alice",
+        }])
+
+    def test_errors_end_the_stream(self):
+        async def stream_message(**kwargs):
+            yield {"event": "error", "action": "error", "error": "boom"}
+
+        with mock.patch('blogs.api.BLOG_SERVICE.stream_message', stream_message):
+            events = self.parse(self.post({"message": "Hi"}))
+
+        self.assertEqual([name for name, _ in events], ["session", "error"])
+        # A session id is made up when the client has none
+        self.assertTrue(events[0][1]["session_id"])
+
+    def test_missing_message_is_a_plain_400(self):
+        response = self.post({"session_id": "chat-1"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "Message is required"})
+
+
+@override_settings(CHAT_SESSION_TTL=60, CHAT_SESSION_MAX=2, CHAT_SESSION_SWEEP_INTERVAL=0)
+class DatabaseSessionManagerTests(TransactionTestCase):
+    def setUp(self):
+        self.manager = DatabaseSessionManager()
+        self.user = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+
+    def save(self, session_id, user_id=None):
+        state = create_empty_blog_state(session_id, user_id or str(self.user.pk))
+        async_to_sync(self.manager.save_session)(session_id, state)
+        return state
+
+    def idle(self, session_id, seconds):
+        ChatSession.objects.filter(pk=session_id).update(updated_at=timezone.now() - timedelta(seconds=seconds))
+
+    def test_expired_session_id_starts_a_new_session(self):
+        self.save("chat-1")
+        self.idle("chat-1", 120)
+        self.assertIsNone(async_to_sync(self.manager.get_session)("chat-1"))
+
+        self.save("chat-1")
+
+        state = async_to_sync(self.manager.get_session)("chat-1")
+        self.assertEqual(state["version"], 1)
+
+    def test_second_create_of_a_live_session_conflicts(self):
+        self.save("chat-1")
+        with self.assertRaises(SessionConflict):
+            self.save("chat-1")
+
+    def test_deleted_user_is_not_a_conflict(self):
+        with self.assertRaises(IntegrityError):
+            self.save("chat-1", user_id="999999")
+
+    def test_new_session_evicts_the_least_recently_used(self):
+        self.save("chat-1")
+        self.save("chat-2")
+        self.idle("chat-1", 30)
+        self.idle("chat-2", 20)
+        # Using chat-1 makes chat-2 the least recently used
+        state = async_to_sync(self.manager.get_session)("chat-1")
+        async_to_sync(self.manager.save_session)("chat-1", state)
+
+        self.save("chat-3")
+
+        self.assertEqual(set(ChatSession.objects.values_list("pk", flat=True)), {"chat-1", "chat-3"})
+
+    def test_sweep_drops_expired_sessions(self):
+        self.save("chat-1")
+        self.save("chat-2")
+        self.idle("chat-1", 120)
+
+        self.assertEqual(self.manager.sweep(), 1)
+        self.assertEqual(list(ChatSession.objects.values_list("pk", flat=True)), ["chat-2"])
+
+
+@override_settings(CHAT_SESSION_TTL=60, CHAT_SESSION_MAX=2, CHAT_SESSION_SWEEP_INTERVAL=0)
+class InMemorySessionManagerTests(SimpleTestCase):
+    def setUp(self):
+        self.manager = InMemorySessionManager()
+
+    def save(self, session_id):
+        async_to_sync(self.manager.save_session)(session_id, create_empty_blog_state(session_id))
+
+    def test_idle_session_expires(self):
+        self.save("chat-1")
+        later = time.monotonic() + 120
+        with mock.patch("blogs.Views.chatapp.sessions.time.monotonic", return_value=later):
+            self.assertIsNone(async_to_sync(self.manager.get_session)("chat-1"))
+            self.save("chat-1")
+
+    def test_least_recently_used_is_evicted(self):
+        self.save("chat-1")
+        self.save("chat-2")
+        async_to_sync(self.manager.get_session)("chat-1")
+
+        self.save("chat-3")
+
+        self.assertIsNone(async_to_sync(self.manager.get_session)("chat-2"))
+        self.assertEqual(self.manager.metrics()["sessions"], 2)
+
+
+class WindowHistoryTests(SimpleTestCase):
+    def state(self, count):
+        state = create_empty_blog_state("chat-1")
+        state["messages"] = [
+            {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i}", "timestamp": ""}
+            for i in range(count)
+        ]
+        return state
+
+    def test_short_history_is_untouched(self):
+        state = window_history(self.state(4), max_turns=2, summary_chars=100)
+        self.assertEqual(len(state["messages"]), 4)
+        self.assertEqual(state["summary"], "")
+
+    def test_old_turns_fold_into_the_summary(self):
+        state = window_history(self.state(7), max_turns=2, summary_chars=100)
+
+        self.assertEqual([m["content"] for m in state["messages"]], [f"message {i}" for i in range(3, 7)])
+        self.assertEqual(state["summary"], "user: message 0\nassistant: message 1\nuser: message 2")
+
+    def test_summary_drops_the_oldest_lines_past_its_limit(self):
+        state = self.state(3)
+        state["summary"] = "user: " + "x" * 40
+        state = window_history(state, max_turns=1, summary_chars=20)
+
+        self.assertEqual(state["summary"], "user: message 0")
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+def open_fds():
+    return len(os.listdir("/proc/self/fd"))
+
+
+@unittest.skipUnless(os.path.isdir("/proc/self/fd"), "needs /proc to count file descriptors")
+class LoopClientTests(SimpleTestCase):
+    """Short-lived (WSGI) event loops must close the LLM pools they open"""
+    calls = 20
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+
+    def setUp(self):
+        base_url = f"http://127.0.0.1:{self.server.server_port}"
+        patcher = mock.patch.dict(os.environ, {"MISTRAL_BASE_URL": base_url})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        llm.reset_clients()
+        self.addCleanup(llm.reset_clients)
+
+    async def request(self):
+        # A keep-alive connection plus a model copy bound to this loop
+        llm.chat_model()
+        response = await llm.async_http_client().get("/models")
+        return response.status_code
+
+    def assertBounded(self, baseline):
+        self.assertEqual(len(llm._loop_scopes), 0)
+        # The server closes its end once it sees the client's close
+        for _ in range(50):
+            if open_fds() <= baseline + 2:
+                break
+            time.sleep(0.02)
+        self.assertLessEqual(open_fds(), baseline + 2)
+
+    def test_async_to_sync_calls_close_their_pools(self):
+        call = llm.async_to_sync(self.request)
+        self.assertEqual(call(), 200)
+        baseline = open_fds()
+
+        for _ in range(self.calls):
+            self.assertEqual(call(), 200)
+
+        self.assertBounded(baseline)
+
+    def test_iterate_in_loop_closes_its_pools(self):
+        async def events():
+            yield await self.request()
+
+        self.assertEqual(list(iterate_in_loop(events())), [200])
+        baseline = open_fds()
+
+        for _ in range(self.calls):
+            self.assertEqual(list(iterate_in_loop(events())), [200])
+
+        self.assertBounded(baseline)
@@ -0,0 +1,277 @@
+"""
+In-process vector index over published Blog embeddings.
+
+All vectors live in one contiguous, L2-normalised float32 matrix so a cosine
+search is a single matrix-vector product followed by ``argpartition``.
+
+The matrix is over-allocated: a new vector is written into the first spare
+row and the published ``[:count]`` views grow by one, so a save costs one
+row instead of a copy of the whole matrix. A replaced or removed vector is
+only marked dead in a live mask (a replacement is appended as a new row).
+Rows inside the published views are therefore never rewritten, and a search
+can score outside the lock against the views it took. New arrays are built
+only when the spare rows run out or dead rows pile up.
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Spare rows kept past the live ones: at least this many, or half as many again
+MIN_SPARE_ROWS = 64
+
+
+def normalize_vector(vector):
+    """Return ``vector`` as a unit-length float32 array (or None if empty/zero)"""
+    if vector is None:
+        return None
+    array = np.asarray(vector, dtype=np.float32).ravel()
+    if array.size == 0:
+        return None
+    norm = np.linalg.norm(array)
+    if not norm:
+        return None
+    return array / norm
+
+
+def load_published_vectors():
+    """
+    Read every published blog's embedding as ``(ids, matrix)``: an int64 id
+    array and a contiguous, L2-normalised float32 matrix with one row per id.
+    """
+    from blogs.models import Blog
+
+    rows = (
+        Blog.objects.filter(isPublished=True, embedding__isnull=False)
+        .values_list("id", "embedding")
+        .iterator(chunk_size=500)
+    )
+
+    ids = []
+    vectors = []
+    dimension = None
+    for blog_id, embedding in rows:
+        vector = normalize_vector(embedding)
+        if vector is None:
+            continue
+        # All rows must share one dimension; skip vectors from another model
+        if dimension is None:
+            dimension = vector.shape[0]
+        elif vector.shape[0] != dimension:
+            continue
+        ids.append(blog_id)
+        vectors.append(vector)
+
+    if vectors:
+        matrix = np.ascontiguousarray(np.vstack(vectors), dtype=np.float32)
+    else:
+        matrix = np.empty((0, 0), dtype=np.float32)
+    return np.asarray(ids, dtype=np.int64), matrix
+
+
+class BlogVectorIndex:
+    """
+    Cosine-similarity index of published blogs.
+
+    The matrix is loaded lazily from the database on first use and then kept
+    up to date by the Blog save/delete signals. Because every worker process
+    holds its own copy, the index is also reloaded after
+    ``BLOG_VECTOR_INDEX_TTL`` seconds so changes made by other processes show up.
+    """
+
+    def __init__(self, ttl=None):
+        self._lock = threading.RLock()
+        self._ttl = ttl
+        self._loaded_at = None
+        self._store(np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32))
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, "BLOG_VECTOR_INDEX_TTL", 300)
+
+    @property
+    def dimension(self):
+        return self._vectors.shape[1]
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._positions)
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+    def _store(self, ids, matrix):
+        """Replace the buffers with fresh ones holding ``ids``/``matrix`` plus spare rows"""
+        count = len(ids)
+        capacity = count + max(MIN_SPARE_ROWS, count // 2)
+        self._id_buffer = np.zeros(capacity, dtype=np.int64)
+        self._id_buffer[:count] = ids
+        self._vectors = np.zeros((capacity, matrix.shape[1]), dtype=np.float32)
+        self._vectors[:count] = matrix
+        self._live = np.zeros(capacity, dtype=bool)
+        self._live[:count] = True
+        self._count = count
+        self._dead = 0
+        self._positions = {int(blog_id): row for row, blog_id in enumerate(ids)}
+        self._publish()
+
+    def _publish(self):
+        # Views over the used rows; searches take these under the lock
+        self._ids = self._id_buffer[:self._count]
+        self._matrix = self._vectors[:self._count]
+
+    def _compact(self):
+        """Move the live rows into new buffers (never in place: searches may hold the old ones)"""
+        rows = np.flatnonzero(self._live[:self._count])
+        self._store(self._id_buffer[rows], self._vectors[rows])
+
+    def _kill(self, blog_id):
+        row = self._positions.pop(blog_id)
+        self._live[row] = False
+        self._dead += 1
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def _is_stale(self):
+        if self._loaded_at is None:
+            return True
+        return self.ttl and (time.monotonic() - self._loaded_at) > self.ttl
+
+    def _ensure_loaded(self):
+        if self._is_stale():
+            with self._lock:
+                if self._is_stale():
+                    self.reload()
+
+    def reload(self):
+        """Rebuild the whole matrix from the published blogs in the database"""
+        ids, matrix = load_published_vectors()
+
+        with self._lock:
+            self._store(ids, matrix)
+            self._loaded_at = time.monotonic()
+
+        logger.info(f"Blog vector index loaded with {len(ids)} vectors")
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+    def needs_vector(self, blog_id):
+        """True if the index is loaded but doesn't hold this blog yet"""
+        return self._loaded_at is not None and blog_id not in self._positions
+
+    def upsert(self, blog_id, embedding):
+        """Insert or replace the vector of a single blog"""
+        vector = normalize_vector(embedding)
+        if vector is None:
+            self.remove(blog_id)
+            return
+
+        with self._lock:
+            # Not loaded yet: the next search will pick this row up from the DB
+            if self._loaded_at is None:
+                return
+
+            if not self._positions:
+                # Empty index: the first vector sets the dimension
+                self._store(np.asarray([blog_id], dtype=np.int64), vector.reshape(1, -1))
+                return
+
+            if vector.shape[0] != self.dimension:
+                logger.warning(
+                    f"Ignoring embedding for blog {blog_id}: dimension {vector.shape[0]} != {self.dimension}"
+                )
+                self.remove(blog_id)
+                return
+
+            row = self._positions.get(blog_id)
+            if row is not None:
+                if np.array_equal(self._vectors[row], vector):
+                    return
+                # A search may be scoring this row: retire it and append the new vector
+                self._kill(blog_id)
+
+            if self._count == len(self._id_buffer):
+                self._compact()
+            row = self._count
+            self._vectors[row] = vector
+            self._id_buffer[row] = blog_id
+            self._live[row] = True
+            self._positions[blog_id] = row
+            self._count += 1
+            self._publish()
+
+    def remove(self, blog_id):
+        """Drop a blog from the index"""
+        with self._lock:
+            if blog_id not in self._positions:
+                return
+            self._kill(blog_id)
+            # Reclaim the space once most used rows are dead
+            if 2 * self._dead > self._count:
+                self._compact()
+
+    def snapshot(self):
+        """
+        ``(ids, matrix, positions)`` of the live rows of the loaded index.
+        Dead rows are compacted away first; updates only append past these
+        views and never modify rows inside them, so they stay consistent.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            if self._dead:
+                self._compact()
+            return self._ids, self._matrix, dict(self._positions)
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+    def search(self, query_vector, k=5, allowed_ids=None):
+        """
+        Return up to ``k`` ``(blog_id, score)`` pairs ordered by cosine similarity.
+        ``allowed_ids`` restricts the candidates (e.g. blogs of one category).
+        """
+        self._ensure_loaded()
+
+        query = normalize_vector(query_vector)
+        if query is None or k <= 0:
+            return []
+
+        with self._lock:
+            ids = self._ids
+            matrix = self._matrix
+            # Rows may die while we score; the mask is the only part that changes
+            live = self._live[:self._count].copy() if self._dead else None
+
+        if len(ids) == 0 or query.shape[0] != matrix.shape[1]:
+            return []
+
+        scores = matrix @ query
+        if allowed_ids is not None:
+            allowed = np.isin(ids, np.fromiter(allowed_ids, dtype=np.int64))
+            live = allowed if live is None else live & allowed
+        if live is not None:
+            candidates = np.flatnonzero(live)
+            ids, scores = ids[candidates], scores[candidates]
+            if len(ids) == 0:
+                return []
+
+        k = min(k, len(scores))
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+
+# Process-wide index shared by the API and the signals
+blog_vector_index = BlogVectorIndex()
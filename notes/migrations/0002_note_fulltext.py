@@ -0,0 +1,29 @@
+# Creates the SQLite FTS5 table mirroring note text and backfills it.
+
+from django.db import migrations
+
+from blogs.fulltext import note_fts, note_fts_values
+
+
+def create_note_fts(apps, schema_editor):
+    if not note_fts.available(schema_editor.connection):
+        return
+    note_fts.create(schema_editor)
+    Note = apps.get_model("notes", "Note")
+    for note in Note.objects.only("id", "title", "tags", "content").iterator(chunk_size=500):
+        note_fts.upsert(note.pk, note_fts_values(note), using=schema_editor.connection)
+
+
+def drop_note_fts(apps, schema_editor):
+    note_fts.drop(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notes", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_note_fts, drop_note_fts),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.9 on 2026-10-16 23:32
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_like_count(apps, schema_editor):
+    Note = apps.get_model("notes", "Note")
+    Like = Note.likes.through
+    counts = (
+        Like.objects.filter(note=OuterRef("pk"))
+        .order_by()
+        .values("note")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    Note.objects.update(like_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notes", "0002_note_fulltext"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="note",
+            name="like_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_like_count, migrations.RunPython.noop),
+    ]
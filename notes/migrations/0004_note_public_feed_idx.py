@@ -0,0 +1,23 @@
+# Generated by Django 6.0.9 on 2026-10-16 23:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notes", "0003_note_like_count"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="note",
+            index=models.Index(
+                condition=models.Q(("is_public", True)),
+                fields=["-created_at", "-id"],
+                name="note_public_feed_idx",
+            ),
+        ),
+    ]
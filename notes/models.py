@@ -1,6 +1,16 @@
 from django.db import models
 from django.conf import settings
 
+
+class NoteQuerySet(models.QuerySet):
+    def with_viewer_like(self, user):
+        """Annotate ``liked_by_user`` for ``user`` in the same query (no per-note lookups)"""
+        if not user.is_authenticated:
+            return self.annotate(liked_by_user=models.Value(False, output_field=models.BooleanField()))
+        likes = Note.likes.through.objects.filter(note=models.OuterRef('pk'), user=user.pk)
+        return self.annotate(liked_by_user=models.Exists(likes))
+
+
 class Note(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notes')
     title = models.CharField(max_length=200)
@@ -8,6 +18,8 @@ class Note(models.Model):
     tags = models.CharField(max_length=500, blank=True, help_text="Comma-separated tags")
     
     likes = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='liked_notes', blank=True)
+    # Denormalised len(likes), kept in step by LikeNoteView and the m2m_changed signal
+    like_count = models.PositiveIntegerField(default=0, editable=False)
     
     # Optional: is_public field if we want to support private notes in the future.
     # For now, feed will likely show all notes.
@@ -16,12 +28,24 @@ class Note(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = NoteQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the public feed: (created_at, id) descending
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_public=True),
+                name='note_public_feed_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.title
 
     @property
     def total_likes(self):
-        return self.likes.count()
+        return self.like_count
 
     def get_tags_list(self):
         if not self.tags:
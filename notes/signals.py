@@ -0,0 +1,59 @@
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+from notes.models import Note
+from blogs.fulltext import note_fts, note_fts_values
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Note columns mirrored into the FTS5 index
+SEARCHABLE_NOTE_FIELDS = frozenset(['title', 'tags', 'content'])
+
+
+@receiver(post_save, sender=Note)
+def update_note_fulltext(sender, instance, update_fields=None, **kwargs):
+    """Mirror the searchable text of a note into the full-text index"""
+    if update_fields is not None and not SEARCHABLE_NOTE_FIELDS.intersection(update_fields):
+        return
+    try:
+        note_fts.upsert(instance.pk, note_fts_values(instance))
+    except Exception as e:
+        logger.error(f"Error updating full-text index for note {instance.pk}: {e}")
+
+
+@receiver(post_delete, sender=Note)
+def remove_note_from_fulltext(sender, instance, **kwargs):
+    try:
+        note_fts.delete(instance.pk)
+    except Exception as e:
+        logger.error(f"Error removing note {instance.pk} from full-text index: {e}")
+
+
+@receiver(m2m_changed, sender=Note.likes.through)
+def sync_note_like_count(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep Note.like_count right for likes changed outside LikeNoteView
+    (admin, shell, ``user.liked_notes.add(...)``), which write the m2m directly.
+    """
+    if action == 'pre_clear' and reverse:
+        # Remember which notes lose a like before the rows are gone
+        instance._cleared_note_ids = list(instance.liked_notes.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        note_ids = [instance.pk]
+    elif action == 'post_clear':
+        note_ids = getattr(instance, '_cleared_note_ids', [])
+    else:
+        note_ids = pk_set or []
+
+    if note_ids:
+        counts = (
+            sender.objects.filter(note=OuterRef('pk'))
+            .order_by().values('note').annotate(total=Count('pk')).values('total')
+        )
+        Note.objects.filter(pk__in=note_ids).update(like_count=Coalesce(Subquery(counts), 0))
@@ -1,3 +1,178 @@
+import importlib
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from blogs.models import User
+from notes.models import Note
+from notes.views import NoteFeedMixin
+
+
+class NoteLikeCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        cls.bob = User.objects.create_user(username='bob', email='bob@example.com', password='pw')
+        cls.note = Note.objects.create(user=cls.alice, title="Typing", content="Gradual typing")
+
+    def stored_count(self):
+        return Note.objects.values_list('like_count', flat=True).get(pk=self.note.pk)
+
+    def toggle(self, user):
+        self.client.force_login(user)
+        response = self.client.post(
+            reverse('like_note', kwargs={'pk': self.note.pk}), HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_like_and_unlike_keep_the_count(self):
+        self.assertEqual(self.toggle(self.bob), {'liked': True, 'count': 1})
+        self.assertEqual(self.toggle(self.alice), {'liked': True, 'count': 2})
+        self.assertEqual(self.toggle(self.bob), {'liked': False, 'count': 1})
+        self.assertEqual(self.stored_count(), self.note.likes.count())
+
+    def test_direct_m2m_changes_are_counted(self):
+        self.note.likes.add(self.alice, self.bob)
+        self.assertEqual(self.stored_count(), 2)
+
+        self.bob.liked_notes.remove(self.note)
+        self.assertEqual(self.stored_count(), 1)
+
+        self.alice.liked_notes.clear()
+        self.assertEqual(self.stored_count(), 0)
+
+        self.bob.liked_notes.add(self.note)
+        self.note.likes.clear()
+        self.assertEqual(self.stored_count(), 0)
+
+    def test_migration_backfills_the_count(self):
+        self.note.likes.add(self.alice, self.bob)
+        Note.objects.update(like_count=0)
+
+        migration = importlib.import_module('notes.migrations.0003_note_like_count')
+        migration.backfill_like_count(apps, None)
+
+        self.assertEqual(self.stored_count(), 2)
+
+    def test_with_viewer_like(self):
+        self.note.likes.add(self.bob)
+
+        liked = Note.objects.with_viewer_like(self.bob).get(pk=self.note.pk)
+        not_liked = Note.objects.with_viewer_like(self.alice).get(pk=self.note.pk)
+        anonymous = Note.objects.with_viewer_like(AnonymousUser()).get(pk=self.note.pk)
+
+        self.assertTrue(liked.liked_by_user)
+        self.assertFalse(not_liked.liked_by_user)
+        self.assertFalse(anonymous.liked_by_user)
+
+
+class NoteListQueryCountTests(TestCase):
+    """Feed and dashboard cost the same number of queries for any number of notes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        cls.bob = User.objects.create_user(username='bob', email='bob@example.com', password='pw')
+
+    def setUp(self):
+        self.client.force_login(self.alice)
+
+    def add_notes(self, count):
+        for i in range(count):
+            note = Note.objects.create(user=self.alice, title=f"Note {i}", content="Body", tags="a, b")
+            note.likes.add(self.bob)
+
+    def queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, url):
+        self.add_notes(1)
+        baseline = self.queries(url)
+        self.add_notes(9)
+        with self.assertNumQueries(baseline):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['notes']), 10)
+
+    def test_feed(self):
+        self.assertConstantQueries(reverse('note_feed'))
+
+    def test_my_notes(self):
+        self.assertConstantQueries(reverse('my_note_list'))
+
+
+@mock.patch.object(NoteFeedMixin, 'per_page', 3)
+class NoteFeedPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username='alice', email='alice@example.com', password='pw')
+        cls.notes = [
+            Note.objects.create(user=cls.alice, title=f"Note {i}", content="Body", tags="python")
+            for i in range(5)
+        ]
+        Note.objects.create(user=cls.alice, title="Private", content="Body", is_public=False)
+        cls.notes[1].likes.add(cls.alice)
+
+    def setUp(self):
+        self.client.force_login(self.alice)
+
+    def newest_first(self):
+        return [note.pk for note in sorted(self.notes, key=lambda n: (n.created_at, n.pk), reverse=True)]
+
+    def test_cursor_round_trip(self):
+        first = self.client.get(reverse('note_feed'))
+        cursor = first.context['next_cursor']
+        self.assertIsNotNone(cursor)
+
+        second = self.client.get(reverse('note_feed'), {'cursor': cursor})
+
+        pks = [note.pk for note in first.context['notes']] + [note.pk for note in second.context['notes']]
+        self.assertEqual(pks, self.newest_first())
+        # Last page
+        self.assertIsNone(second.context['next_cursor'])
+
+    def test_invalid_cursor_is_404(self):
+        self.assertEqual(self.client.get(reverse('note_feed'), {'cursor': 'garbage'}).status_code, 404)
+        self.assertEqual(self.client.get(reverse('note_feed_api'), {'cursor': 'garbage'}).status_code, 404)
+
+    def api_pages(self):
+        pages = [self.client.get(reverse('note_feed_api')).json()]
+        while pages[-1]['next_cursor']:
+            pages.append(self.client.get(reverse('note_feed_api'), {'cursor': pages[-1]['next_cursor']}).json())
+        return pages
+
+    def test_api_pages_match_the_feed(self):
+        pages = self.api_pages()
+
+        self.assertEqual(len(pages), 2)
+        self.assertEqual([result['id'] for page in pages for result in page['results']], self.newest_first())
+
+    def test_api_payload(self):
+        liked = self.notes[1]
+        results = {result['id']: result for page in self.api_pages() for result in page['results']}
+
+        self.assertEqual(results[liked.pk], {
+            'id': liked.pk,
+            'title': liked.title,
+            'url': reverse('note_detail', kwargs={'pk': liked.pk}),
+            'author_username': 'alice',
+            'tags': ['python'],
+            'like_count': 1,
+            'liked': True,
+            'created_at': liked.created_at.isoformat(),
+        })
+
+    def test_api_html_renders_each_card(self):
+        payload = self.client.get(reverse('note_feed_api')).json()
 
-# Create your tests here.
+        for result in payload['results']:
+            self.assertIn(result['url'], payload['html'])
+            self.assertIn(result['title'], payload['html'])
+        self.assertNotIn("Private", payload['html'])
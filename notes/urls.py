@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     # Public Feed (Read Only)
     path('', views.NoteFeedView.as_view(), name='note_feed'),
+    path('feed.json', views.NoteFeedAPI.as_view(), name='note_feed_api'),
 
     # My Notes Dashboard (as requested: /notes/edit)
     path('edit/', views.MyNoteListView.as_view(), name='my_note_list'),
@@ -2,27 +2,100 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, View
 from django.urls import reverse_lazy, reverse
-from django.http import HttpResponseRedirect, JsonResponse
+from django.http import Http404, HttpResponseRedirect, JsonResponse
+from django.template.loader import render_to_string
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from blogs.fulltext import note_fts, highlight_snippet
+from blogs.pagination import InvalidCursor, KeysetPaginator
 from .models import Note
 from .forms import NoteForm
 
 # --- Public Feed (Read Only) ---
 
-class NoteFeedView(LoginRequiredMixin, ListView):
+class NoteFeedMixin:
+    """Public feed paged by keyset on (created_at, id) (see note_public_feed_idx)"""
+    feed_ordering = ('-created_at', '-id')
+    per_page = 12
+
+    def feed_queryset(self):
+        # Show all notes (assuming feed is public). Default is_public=True.
+        return (
+            Note.objects.filter(is_public=True)
+            .select_related('user')
+            .with_viewer_like(self.request.user)
+        )
+
+    def feed_page(self, queryset):
+        paginator = KeysetPaginator(queryset, self.feed_ordering, self.per_page)
+        try:
+            return paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404("Invalid feed cursor")
+
+
+class NoteFeedView(LoginRequiredMixin, NoteFeedMixin, ListView):
     model = Note
     template_name = 'notes/note_feed.html'
     context_object_name = 'notes'
 
+    search_limit = 50
+
     def get_queryset(self):
-        # Show all notes (assuming feed is public). Default is_public=True.
-        # Order by newest first.
-        return Note.objects.filter(is_public=True).order_by('-created_at')
+        queryset = self.feed_queryset()
+        query = self.request.GET.get('q', '').strip()
+        if query:
+            self.page = None
+            return self.search(queryset, query)
+        # Newest first, one page at a time
+        self.page = self.feed_page(queryset)
+        return self.page.object_list
+
+    def search(self, queryset, query):
+        """BM25-ranked full-text search with highlighted snippets"""
+        hits = note_fts.search(query, limit=self.search_limit, restrict=queryset.values('pk'))
+        if hits is None:
+            return queryset.filter(
+                Q(title__icontains=query) | Q(tags__icontains=query) | Q(content__icontains=query)
+            ).order_by('-created_at')[:self.search_limit]
+
+        ranks = {pk: rank for rank, (pk, _, _) in enumerate(hits)}
+        snippets = {pk: snippet for pk, _, snippet in hits}
+        notes = sorted(queryset.filter(pk__in=ranks.keys()), key=lambda n: ranks[n.pk])
+        for note in notes:
+            note.search_snippet = highlight_snippet(snippets[note.pk])
+        return notes
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # We can add extra context if needed, e.g. for sidebar
+        context['search_query'] = self.request.GET.get('q', '').strip()
+        context['next_cursor'] = self.page.next_cursor if self.page else None
         return context
 
+
+class NoteFeedAPI(LoginRequiredMixin, NoteFeedMixin, View):
+    """Next page of the public feed as JSON (used for infinite scroll)"""
+
+    def get(self, request, *args, **kwargs):
+        page = self.feed_page(self.feed_queryset())
+        results = [
+            {
+                'id': note.pk,
+                'title': note.title,
+                'url': reverse('note_detail', kwargs={'pk': note.pk}),
+                'author_username': note.user.username,
+                'tags': note.get_tags_list(),
+                'like_count': note.like_count,
+                'liked': note.liked_by_user,
+                'created_at': note.created_at.isoformat(),
+            }
+            for note in page
+        ]
+        html = ''.join(
+            render_to_string('notes/_note_card.html', {'note': note}, request=request) for note in page
+        )
+        return JsonResponse({'results': results, 'html': html, 'next_cursor': page.next_cursor})
+
 # --- Note Detail (Read Only) ---
 
 class NoteDetailView(LoginRequiredMixin, DetailView):
@@ -30,6 +103,9 @@ class NoteDetailView(LoginRequiredMixin, DetailView):
     template_name = 'notes/note_detail.html'
     context_object_name = 'note'
 
+    def get_queryset(self):
+        return Note.objects.select_related('user').with_viewer_like(self.request.user)
+
 # --- My Notes (Editable Dashboard) ---
 
 class MyNoteListView(LoginRequiredMixin, ListView):
@@ -38,6 +114,7 @@ class MyNoteListView(LoginRequiredMixin, ListView):
     context_object_name = 'notes'
 
     def get_queryset(self):
+        # like_count is a stored column, so this renders in one query
         return Note.objects.filter(user=self.request.user).order_by('-updated_at')
 
 class NoteCreateView(LoginRequiredMixin, CreateView):
@@ -71,17 +148,29 @@ class NoteDeleteView(LoginRequiredMixin, DeleteView):
 
 class LikeNoteView(LoginRequiredMixin, View):
     def post(self, request, pk, *args, **kwargs):
-        note = get_object_or_404(Note, pk=pk)
-        if note.likes.filter(id=request.user.id).exists():
-            note.likes.remove(request.user)
-            liked = False
-        else:
-            note.likes.add(request.user)
-            liked = True
+        get_object_or_404(Note.objects.only('id'), pk=pk)
+        Like = Note.likes.through
+
+        # The like row and the stored counter change in one transaction
+        with transaction.atomic():
+            removed, _ = Like.objects.filter(note_id=pk, user_id=request.user.pk).delete()
+            if removed:
+                liked = False
+                Note.objects.filter(pk=pk).update(like_count=F('like_count') - removed)
+            else:
+                liked = True
+                try:
+                    with transaction.atomic():
+                        Like.objects.create(note_id=pk, user_id=request.user.pk)
+                    Note.objects.filter(pk=pk).update(like_count=F('like_count') + 1)
+                except IntegrityError:
+                    # A concurrent request liked it first and already counted it
+                    pass
+            count = Note.objects.filter(pk=pk).values_list('like_count', flat=True).get()
         
         # If ajax request, return json
         if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-             return JsonResponse({'liked': liked, 'count': note.total_likes})
+             return JsonResponse({'liked': liked, 'count': count})
         
         # Fallback to redirect
         return HttpResponseRedirect(request.META.get('HTTP_REFERER', reverse('note_feed')))